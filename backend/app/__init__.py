@@ -1 +1,5 @@
-# AI Agent Workflow Platform Backend 
\ No newline at end of file
+# AI Agent Workflow Platform Backend
+from app.core.env import load_env_file
+
+# 模块级配置在导入时读取环境变量，需要先于其他模块加载.env
+load_env_file()
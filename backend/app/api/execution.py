@@ -1,16 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Response, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, literal
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import aiohttp
+import asyncio
 import os
-from app.database.database import get_db
+import time
+from app.database.database import get_db, SessionLocal
 from app.models.execution import Execution, ExecutionStatus
 from app.models.workflow import Workflow
 from app.models.variable import Variable
 from app.models.execution_history import ExecutionHistory, ChatMessage, ExecutionHistoryStatus
-from app.models.schemas import ExecutionCreate, ExecutionResponse, WorkflowExecuteRequest, ContinueExecutionRequest
+from app.models.profile import ExecutionProfile
+from app.models.schemas import (
+    ExecutionCreate, ExecutionResponse, WorkflowExecuteRequest, ContinueExecutionRequest, RerunFromNodeRequest
+)
 from app.core.workflow_engine import WorkflowEngine
+from app.core.workflow_versions import graph_for_version
+from app.core.workflow_compiler import ensure_compiled, errors_of
 from app.core.variable_manager import VariableManager
+from app.core import codec
+from app.core.config_service import config_service
+from app.core.scheduler import scheduler, tenant_for, LANE_INTERACTIVE
+from app.core.metrics import EXECUTIONS_FINISHED_TOTAL, LLM_REQUEST_SECONDS
+from app.core.http_client import get_http_session, total_timeout
+from app.core.deadlines import timeout_for
+from app.core.node_processors.agent_processor import LLM_TIMEOUT_SECONDS
+from app.core.chat_context import build_chat_messages
+from app.core.task_registry import execution_tasks, wait_cancelled
+from app.core.idempotency import (
+    RequestKeyStore, IDEMPOTENCY_TTL_SECONDS, EXECUTION_MEMO_TTL_SECONDS, memo_key, request_hash
+)
+from app.models.idempotency import RequestKeyKind
 import json
 from datetime import datetime
 
@@ -20,27 +42,123 @@ router = APIRouter()
 async def execute_workflow(
     workflow_id: int,
     request: WorkflowExecuteRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    cache_control: Optional[str] = Header(None, alias="Cache-Control")
 ):
-    """开始执行工作流"""
+    """开始执行工作流
+
+    带Idempotency-Key的重复请求返回同一个执行；memoize=true时相同工作流版本和输入的请求
+    复用进行中或已完成的执行。复用时响应头X-Execution-Reused标明命中的类型。
+    """
     # 检查工作流是否存在
     workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
     if workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
+    _check_compiled(workflow, db)
+    
+    variables = request.variables or {}
+    keys = RequestKeyStore(db)
+    claims = []
+    if idempotency_key:
+        digest = request_hash(workflow, request.dict())
+        claims.append((RequestKeyKind.IDEMPOTENCY, idempotency_key, digest, IDEMPOTENCY_TTL_SECONDS))
+    if request.memoize:
+        key = memo_key(workflow, variables)
+        claims.append((RequestKeyKind.MEMO, key, key, request.memo_ttl_seconds or EXECUTION_MEMO_TTL_SECONDS))
+    refresh = request.refresh or 'no-cache' in (cache_control or '').lower()
+
+    existing = _reuse_execution(keys, workflow_id, claims, refresh, response)
+    if existing is not None:
+        return existing
     
-    # 创建执行记录
-    execution = Execution(workflow_id=workflow_id)
+    # 创建执行记录，去重键与执行在同一个事务中登记
+    # 执行固定使用当前版本，运行期间修改工作流不影响该执行
+    execution = Execution(workflow_id=workflow_id, timeout_seconds=request.timeout_seconds, node_cache=request.node_cache,
+                          workflow_version=workflow.config_hash, lane=request.lane.value)
     db.add(execution)
-    db.commit()
+    db.flush()
+    for kind, key, digest, ttl in claims:
+        keys.claim(workflow_id, kind, key, digest, execution.id, ttl)
+    try:
+        db.commit()
+    except IntegrityError:
+        # 并发的相同请求已先登记，返回它创建的执行
+        db.rollback()
+        existing = _reuse_execution(keys, workflow_id, claims, refresh, response)
+        if existing is None:
+            raise HTTPException(status_code=409, detail="A concurrent request with the same key is being processed")
+        return existing
     db.refresh(execution)
     
-    # 在后台启动工作流执行
-    engine = WorkflowEngine(db)
-    background_tasks.add_task(engine.execute_workflow, execution.id, request.variables or {})
+    # 在后台启动工作流执行（登记为可取消的任务）
+    execution_tasks.start(execution.id, workflow_id, _run_execution(
+        execution.id,
+        tenant_for(workflow_id),
+        execution.lane,
+        variables,
+        profile=request.profile,
+        profile_cprofile=request.profile_cprofile
+    ))
     
     return execution
 
+def _check_compiled(workflow: Workflow, db: Session):
+    """工作流存在编译错误时拒绝执行，避免运行到出错节点前已经产生模型调用"""
+    errors = errors_of(ensure_compiled(workflow, db))
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "Workflow has validation errors", "diagnostics": errors})
+
+def _reuse_execution(keys: RequestKeyStore, workflow_id: int, claims: list, refresh: bool,
+                     response: Response) -> Optional[Execution]:
+    """按去重键查找可复用的执行，Idempotency-Key优先，refresh只跳过记忆化"""
+    for kind, key, digest, _ in claims:
+        if kind == RequestKeyKind.MEMO and refresh:
+            continue
+        row = keys.lookup(workflow_id, kind, key)
+        if row is None:
+            continue
+        if row.request_hash != digest:
+            raise HTTPException(status_code=409, detail="Idempotency-Key was already used with a different request")
+        response.headers["X-Execution-Reused"] = kind.value
+        return keys.execution_for(row)
+    return None
+
+async def _run_execution(execution_id: int, tenant: str, lane: str, variables: dict, profile: bool = False,
+                         profile_cprofile: bool = False, start_node_id: Optional[str] = None):
+    """后台执行使用独立的会话：请求的会话在后台任务运行前已关闭，
+    继续使用会重新签出连接且不再归还，连接池很快耗尽
+
+    执行先由调度器按通道和租户排队，排队期间保持pending状态。
+    """
+    db = SessionLocal()
+    try:
+        async with scheduler.slot(tenant, lane or LANE_INTERACTIVE):
+            await WorkflowEngine(db).execute_workflow(
+                execution_id,
+                variables,
+                profile=profile,
+                profile_cprofile=profile_cprofile,
+                start_node_id=start_node_id
+            )
+    except asyncio.CancelledError:
+        # 被stop接口取消，执行状态和部分历史已由引擎记录
+        pass
+    except Exception as e:
+        print(f"Execution {execution_id} failed: {str(e)}")
+    finally:
+        db.close()
+
+async def _admitted(tenant: str, lane: str, coro):
+    """经调度器准入后运行协程"""
+    try:
+        async with scheduler.slot(tenant, lane):
+            return await coro
+    finally:
+        # 排队时被取消的协程没有开始运行，需要关闭
+        coro.close()
+
 @router.get("/{execution_id}", response_model=ExecutionResponse)
 async def get_execution(execution_id: int, db: Session = Depends(get_db)):
     """获取执行状态"""
@@ -127,9 +245,22 @@ async def continue_execution(
                     history_record.duration = (history_record.completed_at - history_record.started_at).total_seconds()
                     db.commit()
         
-        # 直接执行工作流继续，不使用后台任务
+        # 直接执行工作流继续，不使用后台任务；登记为可取消的任务
+        # 继续执行沿用原执行的通道，批量执行不会因人工审核后继续而占用交互通道
         engine = WorkflowEngine(db)
-        await engine.continue_execution(execution_id, request.variables or {})
+        task = execution_tasks.start(execution_id, execution.workflow_id, _admitted(
+            tenant_for(execution.workflow_id),
+            execution.lane or LANE_INTERACTIVE,
+            engine.continue_execution(
+                execution_id,
+                request.variables or {},
+                profile=request.profile,
+                profile_cprofile=request.profile_cprofile
+            )
+        ))
+        await asyncio.wait({task})
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
         
         # 重新获取执行状态
         db.refresh(execution)
@@ -143,6 +274,121 @@ async def continue_execution(
         print(f"DEBUG: Exception in continue API: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Continue execution failed: {str(e)}")
 
+@router.post("/{execution_id}/rerun-from/{node_id}", response_model=ExecutionResponse)
+async def rerun_from_node(
+    execution_id: int,
+    node_id: str,
+    request: RerunFromNodeRequest,
+    db: Session = Depends(get_db)
+):
+    """从指定节点重新运行：按该节点开始时的变量快照创建新执行并从该节点继续
+
+    节点之前的执行历史整体复制到新执行（INSERT ... SELECT），请求中的变量覆盖快照中的同名变量。
+    节点执行过多次时使用最后一次的快照。新执行沿用原执行的工作流版本（旧执行没有记录版本时使用当前版本）。
+    """
+    source = db.query(Execution).filter(Execution.id == execution_id).first()
+    if source is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    version = source.workflow_version
+    if version is None:
+        _check_compiled(source.workflow, db)
+        version = source.workflow.config_hash
+    if graph_for_version(db, version).node(node_id) is None:
+        raise HTTPException(status_code=400, detail=f"Node {node_id} not found in the workflow version")
+    
+    # 只能从主流程上的节点重新运行，foreach循环体、内联子工作流内的节点没有完整的变量快照
+    snapshot_record = db.query(ExecutionHistory).filter(
+        ExecutionHistory.execution_id == execution_id,
+        ExecutionHistory.node_id == node_id,
+        ExecutionHistory.parent_node_id.is_(None)
+    ).order_by(ExecutionHistory.id.desc()).first()
+    if snapshot_record is None:
+        raise HTTPException(status_code=404, detail=f"Node {node_id} was not executed in execution {execution_id}")
+    if snapshot_record.variables_snapshot is None:
+        raise HTTPException(status_code=409, detail=f"No variable snapshot recorded for node {node_id}")
+    variables = codec.loads(snapshot_record.variables_snapshot)
+    variables.update(request.variables or {})
+    
+    execution = Execution(
+        workflow_id=source.workflow_id,
+        timeout_seconds=request.timeout_seconds if request.timeout_seconds is not None else source.timeout_seconds,
+        node_cache=request.node_cache if request.node_cache is not None else source.node_cache,
+        rerun_of_execution_id=source.id,
+        rerun_from_node_id=node_id,
+        workflow_version=version,
+        lane=request.lane.value if request.lane is not None else source.lane
+    )
+    db.add(execution)
+    db.flush()
+    
+    # 变量按快照重建，保留原执行中的创建节点
+    created_by = dict(db.query(Variable.name, Variable.created_by_node).filter(Variable.execution_id == execution_id))
+    variable_manager = VariableManager(db)
+    rows = []
+    for name, value in variables.items():
+        var_type = variable_manager._infer_type(value)
+        rows.append({
+            "execution_id": execution.id,
+            "name": name,
+            "value": variable_manager._serialize_value(value, var_type),
+            "type": var_type,
+            "created_by_node": "rerun" if name in (request.variables or {}) else created_by.get(name, "start")
+        })
+    if rows:
+        db.execute(insert(Variable), rows)
+    
+    # 复制起始节点之前的执行历史（以集合SQL完成，不逐行加载）
+    columns = [c.name for c in ExecutionHistory.__table__.columns if c.name not in ("id", "execution_id")]
+    db.execute(
+        insert(ExecutionHistory).from_select(
+            ["execution_id"] + columns,
+            select(literal(execution.id), *[ExecutionHistory.__table__.c[name] for name in columns]).where(
+                ExecutionHistory.execution_id == execution_id,
+                ExecutionHistory.id < snapshot_record.id
+            ).order_by(ExecutionHistory.id)
+        )
+    )
+    db.commit()
+    db.refresh(execution)
+    
+    execution_tasks.start(execution.id, execution.workflow_id, _run_execution(
+        execution.id,
+        tenant_for(execution.workflow_id),
+        execution.lane,
+        {},
+        profile=request.profile,
+        profile_cprofile=request.profile_cprofile,
+        start_node_id=node_id
+    ))
+    
+    return execution
+
+FINISHED_STATUSES = [ExecutionStatus.COMPLETED, ExecutionStatus.FAILED, ExecutionStatus.CANCELLED]
+
+def _cancel_execution(execution: Execution, db: Session) -> Optional[asyncio.Task]:
+    """标记执行为已取消，并中断正在运行的任务（包括进行中的LLM/Jira请求）"""
+    execution.status = ExecutionStatus.CANCELLED
+    execution.completed_at = datetime.utcnow()
+    db.commit()
+    EXECUTIONS_FINISHED_TOTAL.inc(status=ExecutionStatus.CANCELLED.value)
+    return execution_tasks.cancel(execution.id)
+
+@router.post("/stop")
+async def stop_workflow_executions(workflow_id: int, db: Session = Depends(get_db)):
+    """停止某个工作流所有未结束的执行"""
+    executions = db.query(Execution).filter(
+        Execution.workflow_id == workflow_id,
+        Execution.status.notin_(FINISHED_STATUSES)
+    ).all()
+    
+    tasks = [task for task in (_cancel_execution(execution, db) for execution in executions) if task]
+    await wait_cancelled(tasks)
+    
+    return {
+        "message": f"Stopped {len(executions)} executions",
+        "cancelled_execution_ids": [execution.id for execution in executions]
+    }
+
 @router.post("/{execution_id}/stop")
 async def stop_execution(execution_id: int, db: Session = Depends(get_db)):
     """停止执行工作流"""
@@ -150,17 +396,19 @@ async def stop_execution(execution_id: int, db: Session = Depends(get_db)):
     if execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
     
-    if execution.status in [ExecutionStatus.COMPLETED, ExecutionStatus.FAILED, ExecutionStatus.CANCELLED]:
+    if execution.status in FINISHED_STATUSES:
         raise HTTPException(status_code=400, detail="Execution already finished")
     
-    execution.status = ExecutionStatus.CANCELLED
-    db.commit()
+    task = _cancel_execution(execution, db)
+    if task:
+        await wait_cancelled([task])
     
     return {"message": "Execution stopped successfully"}
 
 @router.get("/", response_model=List[ExecutionResponse])
 async def get_executions(
     workflow_id: int = None,
+    trace_id: Optional[str] = None,
     skip: int = 0, 
     limit: int = 100, 
     db: Session = Depends(get_db)
@@ -169,6 +417,8 @@ async def get_executions(
     query = db.query(Execution)
     if workflow_id:
         query = query.filter(Execution.workflow_id == workflow_id)
+    if trace_id:
+        query = query.filter(Execution.trace_id == trace_id)
     
     executions = query.offset(skip).limit(limit).all()
     return executions
@@ -180,6 +430,7 @@ async def delete_execution(execution_id: int, db: Session = Depends(get_db)):
     if execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
     
+    RequestKeyStore(db).delete_for_executions([execution_id])
     db.delete(execution)
     db.commit()
     
@@ -206,13 +457,13 @@ async def get_execution_variables(execution_id: int, db: Session = Depends(get_d
         "variables": result
     }
 
-@router.post("/{execution_id}/chat")
-async def chat_with_qwen(
-    execution_id: int,
-    request: dict,
-    db: Session = Depends(get_db)
-):
-    """与千问模型聊天"""
+QWEN_CHAT_MODEL = "qwen-turbo"
+
+def _qwen_chat_url() -> str:
+    return f"{os.getenv('QWEN_BASE_URL', 'https://dashscope.aliyuncs.com/compatible-mode/v1')}/chat/completions"
+
+def _prepare_chat(execution_id: int, request: dict, db: Session):
+    """校验聊天请求并构建发送给千问的messages"""
     execution = db.query(Execution).filter(Execution.id == execution_id).first()
     if execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
@@ -222,38 +473,28 @@ async def chat_with_qwen(
         raise HTTPException(status_code=400, detail="Message is required")
     
     # 获取千问API配置
-    qwen_token = os.getenv("QwenToken")
+    qwen_token = config_service.secret("qwen_token", "QwenToken", db=db)
     if not qwen_token:
         raise HTTPException(status_code=500, detail="QwenToken not configured")
     
-    # 获取当前执行的变量
-    variables = db.query(Variable).filter(Variable.execution_id == execution_id).all()
-    variable_manager = VariableManager(db)
-    current_variables = {}
-    
-    for var in variables:
-        current_variables[var.name] = variable_manager._deserialize_value(var.value, var.type)
-    
-    # 构建包含变量信息的系统提示
-    system_prompt = f"""你是一个AI助手，正在帮助用户处理工作流执行。
-
-当前工作流执行的变量信息：
-{json.dumps(current_variables, ensure_ascii=False, indent=2)}
-
-用户可能会在消息中使用 {{{{变量名}}}} 的格式引用变量。请将这些占位符替换为实际的变量值。
-
-例如：
-- 如果用户说"{{{{input}}}}"，而input变量的值是1，你应该理解为用户在询问数值1。
-- 如果用户说"请告诉我{{{{input}}}}是多少？"，你应该回答具体的数值。
+    # 只加载消息中引用的变量，其余变量以缓存的摘要出现在系统提示词中，并复用近期聊天记录
+    messages, processed_message, referenced_variables = build_chat_messages(
+        db, execution_id, execution.variables_version, execution.current_node, message, QWEN_CHAT_MODEL
+    )
+    headers = {
+        "Authorization": f"Bearer {qwen_token}",
+        "Content-Type": "application/json"
+    }
+    return execution, message, headers, messages, processed_message, referenced_variables
 
-请根据当前的变量值来回答用户的问题。"""
-    
-    # 处理用户消息中的变量占位符
-    processed_message = message
-    for var_name, var_value in current_variables.items():
-        placeholder = f"{{{{{var_name}}}}}"
-        if placeholder in processed_message:
-            processed_message = processed_message.replace(placeholder, str(var_value))
+@router.post("/{execution_id}/chat")
+async def chat_with_qwen(
+    execution_id: int,
+    request: dict,
+    db: Session = Depends(get_db)
+):
+    """与千问模型聊天"""
+    execution, message, headers, messages, processed_message, referenced_variables = _prepare_chat(execution_id, request, db)
     
     # 调用千问API
     try:
@@ -266,60 +507,126 @@ async def chat_with_qwen(
         )
         db.add(user_message)
         
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {qwen_token}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "qwen-turbo",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": processed_message
-                    }
-                ],
-                "temperature": 0.7
-            }
-            
-            async with session.post(
-                "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
-                headers=headers,
-                json=data
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    reply = result["choices"][0]["message"]["content"]
-                    
-                    # 保存AI回复
-                    assistant_message = ChatMessage(
-                        execution_id=execution_id,
-                        node_id=execution.current_node,
-                        role="assistant",
-                        content=reply
-                    )
-                    db.add(assistant_message)
-                    db.commit()
-                    
-                    return {
-                        "reply": reply,
-                        "success": True,
-                        "processed_message": processed_message,
-                        "variables": current_variables,
-                        "original_message": message
-                    }
-                else:
-                    error_text = await response.text()
-                    raise HTTPException(status_code=500, detail=f"Qwen API error: {error_text}")
-                    
+        data = {
+            "model": QWEN_CHAT_MODEL,
+            "messages": messages,
+            "temperature": 0.7
+        }
+        
+        async with get_http_session().post(
+            _qwen_chat_url(), headers=headers, json=data, timeout=total_timeout(timeout_for(LLM_TIMEOUT_SECONDS))
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                reply = result["choices"][0]["message"]["content"]
+                
+                # 保存AI回复
+                assistant_message = ChatMessage(
+                    execution_id=execution_id,
+                    node_id=execution.current_node,
+                    role="assistant",
+                    content=reply
+                )
+                db.add(assistant_message)
+                db.commit()
+                
+                return {
+                    "reply": reply,
+                    "success": True,
+                    "processed_message": processed_message,
+                    "variables": referenced_variables,
+                    "original_message": message
+                }
+            else:
+                error_text = await response.text()
+                raise HTTPException(status_code=500, detail=f"Qwen API error: {error_text}")
+                
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/{execution_id}/chat/stream")
+async def chat_with_qwen_stream(
+    execution_id: int,
+    request: dict,
+    db: Session = Depends(get_db)
+):
+    """与千问模型聊天（SSE流式返回）
+
+    事件格式：逐段的 data: {"delta": ...}，结束时 event: done（含完整回复），出错时 event: error。
+    流结束后保存用户消息和AI回复；客户端断开时取消上游请求且不保存。
+    """
+    execution, message, headers, messages, processed_message, referenced_variables = _prepare_chat(execution_id, request, db)
+    node_id = execution.current_node
+    data = {
+        "model": QWEN_CHAT_MODEL,
+        "messages": messages,
+        "temperature": 0.7,
+        "stream": True
+    }
+    
+    async def event_stream():
+        parts = []
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            # 客户端断开时Starlette取消此生成器，退出async with即关闭上游连接；
+            # 流式响应不设总超时，只使用会话默认的读取间隔超时
+            async with get_http_session().post(_qwen_chat_url(), headers=headers, json=data) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    yield _sse({"detail": f"Qwen API error: {error_text}"}, event="error")
+                    return
+                async for line in response.content:
+                    line = line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == "[DONE]":
+                        break
+                    chunk = json.loads(payload)
+                    choices = chunk.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield _sse({"delta": delta})
+            outcome = 'ok'
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        except Exception as e:
+            yield _sse({"detail": f"Chat error: {str(e)}"}, event="error")
+            return
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, provider='qwen', model=QWEN_CHAT_MODEL, outcome=outcome)
+        
+        # 请求会话在流开始前已关闭，保存消息使用独立会话
+        reply = "".join(parts)
+        session = SessionLocal()
+        try:
+            session.add(ChatMessage(execution_id=execution_id, node_id=node_id, role="user", content=message))
+            session.add(ChatMessage(execution_id=execution_id, node_id=node_id, role="assistant", content=reply))
+            session.commit()
+        finally:
+            session.close()
+        
+        yield _sse({
+            "reply": reply,
+            "success": True,
+            "processed_message": processed_message,
+            "variables": referenced_variables,
+            "original_message": message
+        }, event="done")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{execution_id}/history")
 async def get_execution_history(execution_id: int, db: Session = Depends(get_db)):
     """获取执行历史记录"""
@@ -345,21 +652,95 @@ async def get_execution_history(execution_id: int, db: Session = Depends(get_db)
             "duration": record.duration,
             "output": record.output,
             "error_message": record.error_message,
-            "variables_snapshot": json.loads(record.variables_snapshot) if record.variables_snapshot else {},
+            "variables_snapshot": codec.loads(record.variables_snapshot) if record.variables_snapshot else {},
         }
         
         # 如果是Agent节点，添加提示词和响应
         if record.node_type == 'agent' and record.agent_prompt and record.agent_response:
             history_item["agent_prompt"] = record.agent_prompt
             history_item["agent_response"] = record.agent_response
+            history_item["prompt_tokens"] = record.prompt_tokens
+            history_item["completion_tokens"] = record.completion_tokens
         
         # 如果是Human Control节点，添加聊天历史
         if record.node_type == 'human_control' and record.chat_history:
             history_item["chat_history"] = json.loads(record.chat_history)
         
+        # 子工作流节点，关联以子执行方式运行的执行记录
+        if record.node_type == 'subworkflow':
+            history_item["child_execution_ids"] = [
+                child_id for (child_id,) in db.query(Execution.id).filter(
+                    Execution.parent_execution_id == execution_id,
+                    Execution.parent_node_id == record.node_id
+                ).order_by(Execution.id)
+            ]
+        
+        # 从节点缓存恢复的节点，标记命中和节省的时间
+        if record.cache_hit:
+            history_item["cache_hit"] = True
+            history_item["time_saved"] = record.time_saved
+        
+        # foreach循环体、内联子工作流内的节点，标记所属节点和迭代序号
+        if record.parent_node_id:
+            history_item["parent_node_id"] = record.parent_node_id
+            history_item["iteration_index"] = record.iteration_index
+        
         result.append(history_item)
     
     return {
         "execution_id": execution_id,
         "history": result
-    } 
\ No newline at end of file
+    }
+
+@router.get("/{execution_id}/profile")
+async def get_execution_profile(execution_id: int, download: bool = False, db: Session = Depends(get_db)):
+    """获取执行的性能剖析结果（需以profile=true启动执行）"""
+    execution = db.query(Execution).filter(Execution.id == execution_id).first()
+    if execution is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    
+    profiles = db.query(ExecutionProfile).filter(
+        ExecutionProfile.execution_id == execution_id
+    ).order_by(ExecutionProfile.created_at).all()
+    if not profiles:
+        raise HTTPException(status_code=404, detail="No profile recorded for this execution")
+    
+    result = {
+        "execution_id": execution_id,
+        "profiles": [
+            {
+                "id": profile.id,
+                "phase": profile.phase,
+                "created_at": profile.created_at.isoformat(),
+                "has_cprofile": profile.cprofile_stats is not None,
+                **json.loads(profile.summary)
+            }
+            for profile in profiles
+        ]
+    }
+    
+    if download:
+        headers = {
+            'Content-Disposition': f'attachment; filename="execution_{execution_id}_profile.json"'
+        }
+        return Response(content=json.dumps(result, ensure_ascii=False, indent=2), headers=headers, media_type='application/json')
+    
+    return result
+
+@router.get("/{execution_id}/profile/cprofile")
+async def download_execution_cprofile(execution_id: int, profile_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """下载cProfile原始统计文件（可用pstats或snakeviz打开）"""
+    query = db.query(ExecutionProfile).filter(
+        ExecutionProfile.execution_id == execution_id,
+        ExecutionProfile.cprofile_stats.isnot(None)
+    )
+    if profile_id:
+        query = query.filter(ExecutionProfile.id == profile_id)
+    profile = query.order_by(ExecutionProfile.created_at.desc()).first()
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No cProfile dump recorded for this execution")
+    
+    headers = {
+        'Content-Disposition': f'attachment; filename="execution_{execution_id}_{profile.phase}.prof"'
+    }
+    return Response(content=profile.cprofile_stats, headers=headers, media_type='application/octet-stream')
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List, Dict
 from app.database.database import get_db
 from app.models.meta import Meta
+from app.core.config_service import config_service, bump_version
 from app.models.schemas import MetaCreate, MetaUpdate, MetaResponse
 
 router = APIRouter()
@@ -29,14 +30,18 @@ async def create_or_update_meta(meta: MetaCreate, db: Session = Depends(get_db))
     if existing_meta:
         # 更新现有记录
         existing_meta.value = meta.value
+        bump_version(db)
         db.commit()
+        config_service.set_local(meta.key, meta.value)
         db.refresh(existing_meta)
         return existing_meta
     else:
         # 创建新记录
         db_meta = Meta(**meta.dict())
         db.add(db_meta)
+        bump_version(db)
         db.commit()
+        config_service.set_local(meta.key, meta.value)
         db.refresh(db_meta)
         return db_meta
 
@@ -48,7 +53,9 @@ async def update_meta(key: str, meta_update: MetaUpdate, db: Session = Depends(g
         raise HTTPException(status_code=404, detail="Meta key not found")
     
     meta.value = meta_update.value
+    bump_version(db)
     db.commit()
+    config_service.set_local(key, meta_update.value)
     db.refresh(meta)
     return meta
 
@@ -60,5 +67,7 @@ async def delete_meta(key: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Meta key not found")
     
     db.delete(meta)
+    bump_version(db)
     db.commit()
+    config_service.set_local(key, None)
     return {"message": "Meta key deleted successfully"} 
\ No newline at end of file
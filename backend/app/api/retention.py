@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.database.database import get_db
+from app.models.workflow import Workflow
+from app.models.retention import RetentionPolicy, ExecutionArchive
+from app.models.schemas import (
+    RetentionPolicyUpdate, RetentionPolicyResponse, ExecutionArchiveResponse, ExecutionResponse
+)
+from app.core.retention import RetentionService
+
+router = APIRouter()
+
+@router.get("/policies", response_model=List[RetentionPolicyResponse])
+async def get_policies(db: Session = Depends(get_db)):
+    """获取所有保留策略"""
+    return db.query(RetentionPolicy).all()
+
+def _upsert_policy(db: Session, workflow_id: Optional[int], policy_update: RetentionPolicyUpdate) -> RetentionPolicy:
+    if workflow_id is None:
+        policy = db.query(RetentionPolicy).filter(RetentionPolicy.workflow_id.is_(None)).first()
+    else:
+        policy = db.query(RetentionPolicy).filter(RetentionPolicy.workflow_id == workflow_id).first()
+
+    if policy is None:
+        policy = RetentionPolicy(workflow_id=workflow_id)
+        db.add(policy)
+
+    for field, value in policy_update.dict().items():
+        setattr(policy, field, value)
+
+    db.commit()
+    db.refresh(policy)
+    return policy
+
+@router.put("/policies/default", response_model=RetentionPolicyResponse)
+async def update_default_policy(policy_update: RetentionPolicyUpdate, db: Session = Depends(get_db)):
+    """设置默认保留策略"""
+    return _upsert_policy(db, None, policy_update)
+
+@router.put("/policies/{workflow_id}", response_model=RetentionPolicyResponse)
+async def update_workflow_policy(
+    workflow_id: int,
+    policy_update: RetentionPolicyUpdate,
+    db: Session = Depends(get_db)
+):
+    """设置工作流的保留策略"""
+    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+    if workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return _upsert_policy(db, workflow_id, policy_update)
+
+@router.delete("/policies/{workflow_id}")
+async def delete_workflow_policy(workflow_id: int, db: Session = Depends(get_db)):
+    """删除工作流的保留策略（回退到默认策略）"""
+    policy = db.query(RetentionPolicy).filter(RetentionPolicy.workflow_id == workflow_id).first()
+    if policy is None:
+        raise HTTPException(status_code=404, detail="Retention policy not found")
+
+    db.delete(policy)
+    db.commit()
+    return {"message": "Retention policy deleted successfully"}
+
+@router.post("/run")
+async def run_retention(dry_run: bool = False, batch_size: int = 200, db: Session = Depends(get_db)):
+    """立即执行一轮归档清理"""
+    return RetentionService(db).run_once(batch_size=batch_size, dry_run=dry_run)
+
+@router.get("/archives", response_model=List[ExecutionArchiveResponse])
+async def get_archives(
+    workflow_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """获取已归档的执行记录"""
+    query = db.query(ExecutionArchive)
+    if workflow_id:
+        query = query.filter(ExecutionArchive.workflow_id == workflow_id)
+
+    return query.order_by(ExecutionArchive.archived_at.desc()).offset(skip).limit(limit).all()
+
+@router.post("/archives/{execution_id}/restore", response_model=ExecutionResponse)
+async def restore_archived_execution(execution_id: int, db: Session = Depends(get_db)):
+    """从归档中恢复执行记录"""
+    try:
+        return RetentionService(db).restore_execution(execution_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
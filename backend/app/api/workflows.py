@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from app.database.database import get_db
 from app.models.workflow import Workflow
+from app.models.workflow_version import WorkflowVersion
+from app.core.idempotency import RequestKeyStore
+from app.core.workflow_compiler import WorkflowCompiler, compile_workflow, errors_of
+from app.core.workflow_storage import WorkflowGraphStore, find_workflows_using
 from app.models.schemas import (
     WorkflowCreate, WorkflowUpdate, WorkflowResponse,
-    WorkflowExportData, WorkflowImportRequest, WorkflowImportResponse
+    WorkflowExportData, WorkflowImportRequest, WorkflowImportResponse,
+    WorkflowValidateRequest, WorkflowValidateResponse, WorkflowVersionResponse
 )
 import json
 from datetime import datetime
@@ -19,12 +24,41 @@ async def get_workflows(
     db: Session = Depends(get_db)
 ):
     """获取工作流列表"""
-    workflows = db.query(Workflow).offset(skip).limit(limit).all()
+    workflows = db.query(Workflow).options(
+        selectinload(Workflow.nodes), selectinload(Workflow.edges)
+    ).offset(skip).limit(limit).all()
+    if WorkflowGraphStore(db).refresh(workflows):
+        db.commit()
+    return workflows
+
+@router.get("/search", response_model=List[WorkflowResponse])
+async def search_workflows(
+    node_type: Optional[str] = None,
+    model_type: Optional[str] = None,
+    model_name: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """查找包含指定类型节点或使用指定模型的工作流"""
+    if not (node_type or model_type or model_name):
+        raise HTTPException(status_code=400, detail="Specify node_type, model_type or model_name")
+    workflows = find_workflows_using(db, node_type=node_type, model_type=model_type, model_name=model_name)
+    if WorkflowGraphStore(db).refresh(workflows):
+        db.commit()
     return workflows
 
+def _reject_if_errors(diagnostics: list, strict: bool):
+    """strict模式下存在错误时拒绝保存"""
+    errors = errors_of(diagnostics)
+    if strict and errors:
+        raise HTTPException(status_code=422, detail={"message": "Workflow has validation errors", "diagnostics": errors})
+
 @router.post("/", response_model=WorkflowResponse)
-async def create_workflow(workflow: WorkflowCreate, db: Session = Depends(get_db)):
-    """创建新工作流"""
+async def create_workflow(workflow: WorkflowCreate, strict: bool = False, db: Session = Depends(get_db)):
+    """创建新工作流
+
+    保存时编译工作流，诊断信息随响应返回；有错误的工作流仍会保存（草稿），
+    但不能执行。strict=true时有错误直接拒绝保存。
+    """
     # 验证config是否为有效的JSON
     try:
         json.loads(workflow.config)
@@ -33,10 +67,31 @@ async def create_workflow(workflow: WorkflowCreate, db: Session = Depends(get_db
     
     db_workflow = Workflow(**workflow.dict())
     db.add(db_workflow)
+    db.flush()
+    WorkflowGraphStore(db).save(db_workflow, workflow.config)
+    result = compile_workflow(db_workflow, db)
+    if strict and not result.ok:
+        db.rollback()
+    _reject_if_errors(result.diagnostics, strict)
     db.commit()
     db.refresh(db_workflow)
     return db_workflow
 
+@router.post("/validate", response_model=WorkflowValidateResponse)
+async def validate_workflow(request: WorkflowValidateRequest, workflow_id: Optional[int] = None,
+                            db: Session = Depends(get_db)):
+    """校验工作流配置（不保存）"""
+    result = WorkflowCompiler(db, workflow_id).compile(request.config)
+    return {"valid": result.ok, "diagnostics": result.diagnostics}
+
+@router.get("/versions/{content_hash}", response_model=WorkflowVersionResponse)
+async def get_workflow_version(content_hash: str, db: Session = Depends(get_db)):
+    """获取不可变的工作流版本（执行记录中的workflow_version）"""
+    version = db.query(WorkflowVersion).filter(WorkflowVersion.content_hash == content_hash).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Workflow version not found")
+    return version
+
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 async def get_workflow(
     workflow_id: int, 
@@ -46,6 +101,8 @@ async def get_workflow(
     workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
+    if WorkflowGraphStore(db).refresh([workflow]):
+        db.commit()
     
     return workflow
 
@@ -53,9 +110,10 @@ async def get_workflow(
 async def update_workflow(
     workflow_id: int, 
     workflow_update: WorkflowUpdate, 
+    strict: bool = False,
     db: Session = Depends(get_db)
 ):
-    """更新工作流"""
+    """更新工作流（修改配置时重新编译，见create_workflow）"""
     workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
@@ -67,11 +125,21 @@ async def update_workflow(
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON config")
     
-    # 更新字段
+    # 更新字段（配置拆分保存到节点表和连线表）
     update_data = workflow_update.dict(exclude_unset=True)
+    update_data.pop("config", None)
     for field, value in update_data.items():
         setattr(workflow, field, value)
     
+    if workflow_update.config is not None:
+        WorkflowGraphStore(db).save(workflow, workflow_update.config)
+        result = compile_workflow(workflow, db)
+        if strict and not result.ok:
+            db.rollback()
+        _reject_if_errors(result.diagnostics, strict)
+    else:
+        WorkflowGraphStore(db).refresh([workflow])
+    
     db.commit()
     db.refresh(workflow)
     return workflow
@@ -83,6 +151,7 @@ async def delete_workflow(workflow_id: int, db: Session = Depends(get_db)):
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
+    RequestKeyStore(db).delete_for_workflow(workflow_id)
     db.delete(workflow)
     db.commit()
     return {"message": "Workflow deleted successfully"}
@@ -94,9 +163,12 @@ async def export_workflow(workflow_id: int, db: Session = Depends(get_db)):
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    # 解析config JSON
+    if WorkflowGraphStore(db).refresh([workflow]):
+        db.commit()
+    
+    # 解析config JSON（含编辑器布局）
     try:
-        config_dict = json.loads(workflow.config)
+        config_dict = json.loads(workflow.editor_config)
     except json.JSONDecodeError:
         config_dict = {}
     
@@ -151,6 +223,9 @@ async def import_workflow(
         )
         
         db.add(db_workflow)
+        db.flush()
+        WorkflowGraphStore(db).save(db_workflow, config_json)
+        compile_workflow(db_workflow, db)
         db.commit()
         db.refresh(db_workflow)
         
@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.variable import Variable
+from app.models.execution_history import ChatMessage
+from app.core.variable_manager import VariableManager
+from app.core.tokens import count_tokens, truncate_middle
+
+# 变量占位符 {{name}} / {{ name }}
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+# 未引用变量摘要的token上限、每个变量的预览长度
+SUMMARY_TOKENS = int(os.getenv("CHAT_CONTEXT_SUMMARY_TOKENS", "800"))
+PREVIEW_CHARS = 80
+# 被引用变量单个值的token上限
+REFERENCED_VALUE_TOKENS = int(os.getenv("CHAT_CONTEXT_VALUE_TOKENS", "2000"))
+# 复用的历史聊天记录token上限
+HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "2000"))
+# 缓存的系统提示词前缀个数
+PREFIX_CACHE_SIZE = 256
+
+SYSTEM_PROMPT_HEADER = """你是一个AI助手，正在帮助用户处理工作流执行。
+
+用户可能会在消息中使用 {{变量名}} 的格式引用变量，消息中的占位符已被替换为实际的变量值。
+请根据当前的变量值来回答用户的问题。"""
+
+
+class PrefixCache:
+    """按 (执行ID, 变量版本) 缓存系统提示词前缀，变量变化后版本号递增，旧条目自然失效"""
+
+    def __init__(self, max_entries: int = PREFIX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, int]) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple[int, int], value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+prefix_cache = PrefixCache()
+
+
+def referenced_names(message: str) -> Set[str]:
+    return set(PLACEHOLDER_PATTERN.findall(message))
+
+
+def _variable_summary(db: Session, execution_id: int, model: str) -> str:
+    """所有变量的简要目录：名称、类型、大小和开头预览，只读取值的前缀"""
+    rows = db.query(
+        Variable.name,
+        Variable.type,
+        func.length(Variable.value),
+        func.substr(Variable.value, 1, PREVIEW_CHARS)
+    ).filter(Variable.execution_id == execution_id).order_by(Variable.name).all()
+    if not rows:
+        return "当前执行没有变量。"
+
+    lines = []
+    used = 0
+    for name, var_type, size, preview in rows:
+        if isinstance(preview, bytes):
+            # 二进制编码（msgpack）的值无法按前缀预览
+            preview = "[binary]"
+        preview = (preview or "").replace("\n", " ")
+        if size and size > PREVIEW_CHARS:
+            preview += "…"
+        line = f"- {name} ({var_type.value}, {size or 0}字符): {preview}"
+        used += count_tokens(line, model)
+        if used > SUMMARY_TOKENS:
+            lines.append(f"- …另有{len(rows) - len(lines)}个变量未列出")
+            break
+        lines.append(line)
+    return "当前工作流执行的变量（仅预览，完整值请在消息中用 {{变量名}} 引用）：\n" + "\n".join(lines)
+
+
+def system_prompt_prefix(db: Session, execution_id: int, variables_version: int, model: str) -> str:
+    key = (execution_id, variables_version or 0)
+    prefix = prefix_cache.get(key)
+    if prefix is None:
+        prefix = SYSTEM_PROMPT_HEADER + "\n\n" + _variable_summary(db, execution_id, model)
+        prefix_cache.put(key, prefix)
+    return prefix
+
+
+def load_referenced_variables(db: Session, execution_id: int, names: Set[str]) -> Dict[str, Any]:
+    """只读取并反序列化消息中引用到的变量"""
+    if not names:
+        return {}
+    variable_manager = VariableManager(db)
+    rows = db.query(Variable).filter(Variable.execution_id == execution_id, Variable.name.in_(names)).all()
+    return {row.name: variable_manager._deserialize_value(row.value, row.type) for row in rows}
+
+
+def substitute(message: str, values: Dict[str, Any], model: str) -> str:
+    """一次遍历替换所有占位符，未知变量保持原样，过长的值截断中间"""
+    def replace(match):
+        name = match.group(1)
+        if name not in values:
+            return match.group(0)
+        value = values[name]
+        text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        return truncate_middle(text, REFERENCED_VALUE_TOKENS, model)
+    return PLACEHOLDER_PATTERN.sub(replace, message)
+
+
+def recent_history(db: Session, execution_id: int, node_id: Optional[str], model: str) -> List[Dict[str, str]]:
+    """从最新的聊天记录往前取，直到达到token上限"""
+    query = db.query(ChatMessage.role, ChatMessage.content).filter(ChatMessage.execution_id == execution_id)
+    query = query.filter(ChatMessage.node_id == node_id) if node_id is not None else query.filter(ChatMessage.node_id.is_(None))
+
+    history = []
+    used = 0
+    for role, content in query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).yield_per(50):
+        used += count_tokens(content, model)
+        if used > HISTORY_TOKENS:
+            break
+        history.append({"role": role, "content": content})
+    history.reverse()
+    return history
+
+
+def build_chat_messages(db: Session, execution_id: int, variables_version: int, node_id: Optional[str],
+                        message: str, model: str) -> Tuple[List[Dict[str, str]], str, Dict[str, Any]]:
+    """构建聊天请求的messages，返回 (messages, 替换后的消息, 引用到的变量)"""
+    values = load_referenced_variables(db, execution_id, referenced_names(message))
+    processed_message = substitute(message, values, model)
+    messages = [{"role": "system", "content": system_prompt_prefix(db, execution_id, variables_version, model)}]
+    messages.extend(recent_history(db, execution_id, node_id, model))
+    messages.append({"role": "user", "content": processed_message})
+    return messages, processed_message, values
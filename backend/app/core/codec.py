@@ -0,0 +1,113 @@
+import json
+import os
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时回退到标准库json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack为可选依赖，未安装时回退到标准库json
+    msgpack = None
+
+# 二进制编码的格式标记，与压缩数据一样以\x00开头，不会与JSON文本冲突；
+# JSON文本不带标记，stdlib和orjson写入的数据互相可读，旧数据无需迁移
+MSGPACK_MARKER = b"\x00MP1"
+
+CODECS = ("json", "orjson", "msgpack")
+
+
+class Codec:
+    """存储值（变量、历史快照、节点缓存）的编解码器，默认使用标准库json"""
+
+    name = "json"
+
+    def dumps(self, value: Any, default: Optional[Callable] = None) -> Union[str, bytes]:
+        return json.dumps(value, ensure_ascii=False, default=default)
+
+    def loads_text(self, text: Union[str, bytes]) -> Any:
+        return json.loads(text)
+
+
+class OrjsonCodec(Codec):
+    """orjson编码，输出仍是JSON文本；orjson不支持的值（超过64位的整数等）回退到标准库"""
+
+    name = "orjson"
+
+    def dumps(self, value: Any, default: Optional[Callable] = None) -> Union[str, bytes]:
+        try:
+            return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            return super().dumps(value, default)
+
+    def loads_text(self, text: Union[str, bytes]) -> Any:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # 标准库写入的NaN/Infinity等orjson不接受
+            return super().loads_text(text)
+
+
+class MsgpackCodec(Codec):
+    """msgpack编码，输出带格式标记的二进制数据（SQLite文本列可以直接保存）"""
+
+    name = "msgpack"
+
+    def dumps(self, value: Any, default: Optional[Callable] = None) -> Union[str, bytes]:
+        try:
+            return MSGPACK_MARKER + msgpack.packb(value, use_bin_type=True, default=default)
+        except (TypeError, ValueError, OverflowError):
+            return super().dumps(value, default)
+
+
+def _codec_from_env() -> Codec:
+    name = os.getenv("VALUE_CODEC", "json").lower()
+    if name == "orjson" and orjson is not None:
+        return OrjsonCodec()
+    if name == "msgpack" and msgpack is not None:
+        return MsgpackCodec()
+    return Codec()
+
+
+_codec = _codec_from_env()
+
+
+def configure_codec(name: str):
+    """运行时切换编解码器（用于基准测试）"""
+    global _codec
+    name = name.lower()
+    if name not in CODECS:
+        raise ValueError(f"Unsupported codec: {name}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("orjson codec requires the 'orjson' package")
+    if name == "msgpack" and msgpack is None:
+        raise ValueError("msgpack codec requires the 'msgpack' package")
+    _codec = {"json": Codec, "orjson": OrjsonCodec, "msgpack": MsgpackCodec}[name]()
+
+
+def get_codec() -> Codec:
+    return _codec
+
+
+def dumps(value: Any, default: Optional[Callable] = None) -> Union[str, bytes]:
+    """按当前配置编码存储值"""
+    return _codec.dumps(value, default)
+
+
+def loads(data: Union[str, bytes, None]) -> Any:
+    """解码存储值，按格式标记识别编码，与当前配置无关"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data)
+        if data.startswith(MSGPACK_MARKER):
+            if msgpack is None:
+                raise RuntimeError("msgpack encoded data found but 'msgpack' is not installed")
+            return msgpack.unpackb(data[len(MSGPACK_MARKER):], raw=False, strict_map_key=False)
+        data = data.decode("utf-8")
+    return _codec.loads_text(data)
+
+
+def fast_responses() -> bool:
+    """API响应是否使用orjson渲染（配置了非默认编解码器且已安装orjson）"""
+    return _codec.name != "json" and orjson is not None
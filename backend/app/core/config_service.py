@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.database.database import SessionLocal
+from app.models.meta import Meta, MetaVersion
+
+# 检查其他进程是否修改了配置的间隔（秒），0表示每次读取都检查版本
+CONFIG_VERSION_CHECK_SECONDS = float(os.getenv("CONFIG_VERSION_CHECK_SECONDS", "5"))
+
+# 版本计数所在的行
+VERSION_ROW_ID = 1
+
+
+def _ensure_version_row(db: Session):
+    """版本计数行不存在时插入（已存在则忽略），并发的第一次修改不会因主键冲突失败"""
+    values = {"id": VERSION_ROW_ID, "version": 0, "updated_at": datetime.utcnow()}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # 方言模块在第一次修改配置时才导入，不计入启动耗时
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        db.execute(insert(MetaVersion).values(**values).on_conflict_do_nothing(index_elements=[MetaVersion.id]))
+        return
+    if db.get(MetaVersion, VERSION_ROW_ID) is None:
+        try:
+            with db.begin_nested():
+                db.add(MetaVersion(**values))
+        except IntegrityError:
+            pass
+
+
+def bump_version(db: Session):
+    """Meta修改后调用，在同一事务中把版本计数加一（不提交）"""
+    _ensure_version_row(db)
+    db.query(MetaVersion).filter(MetaVersion.id == VERSION_ROW_ID).update(
+        {MetaVersion.version: MetaVersion.version + 1, MetaVersion.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+
+
+class ConfigService:
+    """Meta配置（API Key等）的进程内缓存
+
+    第一次读取时加载全部Meta，之后读取不访问数据库。本进程通过api/meta修改配置时
+    直接更新缓存；其他进程的修改通过版本计数发现，最多每CONFIG_VERSION_CHECK_SECONDS秒
+    查询一次版本，版本变化时重新加载。
+    """
+
+    def __init__(self, check_interval: float = CONFIG_VERSION_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self._values: Optional[Dict[str, str]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def get(self, key: str, default: str = '', db: Optional[Session] = None) -> str:
+        value = self._snapshot(db).get(key)
+        return value if value else default
+
+    def secret(self, key: str, env_var: str, db: Optional[Session] = None) -> str:
+        """优先使用Meta中的配置，没有时使用环境变量"""
+        return self.get(key, db=db) or os.getenv(env_var, '')
+
+    def all(self, db: Optional[Session] = None) -> Dict[str, str]:
+        return dict(self._snapshot(db))
+
+    def set_local(self, key: str, value: Optional[str]):
+        """本进程修改Meta并提交后更新缓存（value为None表示已删除）"""
+        with self._lock:
+            if self._values is None:
+                return
+            if value is None:
+                self._values.pop(key, None)
+            else:
+                self._values[key] = value
+            # 本进程的修改已经反映在缓存中，下次检查时不需要因版本变化重新加载
+            self._version = None if self._version is None else self._version + 1
+
+    def invalidate(self):
+        """丢弃缓存，下次读取时重新加载"""
+        with self._lock:
+            self._values = None
+            self._version = None
+
+    def _snapshot(self, db: Optional[Session] = None) -> Dict[str, str]:
+        """缓存的配置，需要检查版本时使用调用方的会话查询（没有时使用独立会话）"""
+        now = time.monotonic()
+        values = self._values
+        if values is not None and now - self._checked_at < self.check_interval:
+            return values
+        with self._lock:
+            owns_session = db is None
+            if owns_session:
+                db = SessionLocal()
+            try:
+                version = db.query(MetaVersion.version).filter(MetaVersion.id == VERSION_ROW_ID).scalar() or 0
+                if self._values is None or version != self._version:
+                    self._values = {key: value for key, value in db.query(Meta.key, Meta.value)}
+                    self._version = version
+                    self.reloads += 1
+            except SQLAlchemyError:
+                # 数据库不可用时沿用已加载的配置（尚未加载时视为空），下次读取时重试
+                return self._values if self._values is not None else {}
+            finally:
+                if owns_session:
+                    db.close()
+            self._checked_at = now
+            return self._values
+
+
+config_service = ConfigService()
@@ -0,0 +1,65 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# 未配置时执行的默认时限（秒），0表示不限制
+DEFAULT_EXECUTION_TIMEOUT = float(os.getenv("EXECUTION_TIMEOUT_SECONDS", "0"))
+
+# 判断截止时间是否已到时允许的计时误差（秒）
+CLOCK_TOLERANCE = 0.05
+
+# 当前生效的截止时间（time.monotonic()），嵌套时只会收紧；
+# 子任务（foreach迭代、子执行）创建时复制上下文，截止时间随之传递
+_deadline: ContextVar[Optional[float]] = ContextVar('deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """截止时间已过"""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """在seconds秒后截止（不会放宽外层的截止时间），seconds为空或<=0时不设置"""
+    if not seconds or seconds <= 0:
+        yield _deadline.get()
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """距离截止时间的秒数，没有截止时间时返回None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def timeout_for(default: float) -> float:
+    """下游调用的超时：不超过剩余时间，剩余时间耗尽时抛出DeadlineExceeded"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the call started")
+    return min(default, left)
+
+
+def check_deadline():
+    """剩余时间已耗尽时抛出DeadlineExceeded
+
+    下游请求失败（通常是按剩余时间设置的超时触发）后调用，
+    把截止时间导致的失败交给引擎处理，而不是当作普通的请求错误。
+    """
+    left = remaining()
+    if left is not None and left <= CLOCK_TOLERANCE:
+        raise DeadlineExceeded("Deadline exceeded")
@@ -0,0 +1,15 @@
+import importlib
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+# 依次查找的.env文件：项目根目录、backend目录
+ENV_FILES = (BACKEND_DIR.parent / '.env', BACKEND_DIR / '.env')
+
+
+def load_env_file() -> bool:
+    """加载找到的第一个.env文件（不覆盖已有的环境变量），都不存在时不导入python-dotenv"""
+    for path in ENV_FILES:
+        if path.exists():
+            importlib.import_module("dotenv").load_dotenv(path)
+            return True
+    return False
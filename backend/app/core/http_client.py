@@ -0,0 +1,31 @@
+import asyncio
+from typing import Optional
+from app.core.lazy_imports import lazy_module
+
+# 第一次发起请求时才导入aiohttp
+aiohttp = lazy_module("aiohttp")
+
+_session: Optional["aiohttp.ClientSession"] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_session() -> "aiohttp.ClientSession":
+    """进程内共享的aiohttp会话（复用连接池），与当前事件循环绑定"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60))
+        _session_loop = loop
+    return _session
+
+
+def total_timeout(seconds: float) -> "aiohttp.ClientTimeout":
+    """单次请求的总超时；会话默认只限制读取间隔，适用于流式响应"""
+    return aiohttp.ClientTimeout(total=seconds, sock_connect=10)
+
+
+async def close_http_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session
+from app.models.execution import Execution, ExecutionStatus
+from app.models.workflow import Workflow
+from app.models.idempotency import ExecutionRequestKey, RequestKeyKind
+
+# Idempotency-Key的有效期（秒）
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# 执行结果记忆化的默认有效期（秒）
+EXECUTION_MEMO_TTL_SECONDS = int(os.getenv("EXECUTION_MEMO_TTL_SECONDS", "3600"))
+
+# 记忆化命中时可以复用的执行状态：进行中的执行直接合并，失败/取消的执行重新运行
+MEMO_REUSABLE_STATUSES = {
+    ExecutionStatus.PENDING, ExecutionStatus.RUNNING, ExecutionStatus.PAUSED, ExecutionStatus.COMPLETED
+}
+
+
+def canonical_json(value: Any) -> str:
+    """规范化的JSON：键排序、无多余空白，相同的输入得到相同的文本"""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def workflow_version(workflow: Workflow) -> str:
+    """工作流版本：编译时登记的版本哈希（调用前需先ensure_compiled），配置修改后记忆化结果自动失效"""
+    return workflow.config_hash
+
+
+def memo_key(workflow: Workflow, variables: Dict[str, Any]) -> str:
+    """记忆化键：工作流版本 + 规范化的输入变量"""
+    return _sha256(workflow_version(workflow) + "\n" + canonical_json(variables or {}))
+
+
+def request_hash(workflow: Workflow, request: Dict[str, Any]) -> str:
+    """请求内容的哈希，用于发现同一Idempotency-Key被用于不同的请求"""
+    return _sha256(workflow_version(workflow) + "\n" + canonical_json(request))
+
+
+class RequestKeyStore:
+    """执行请求去重键的查询与登记"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def lookup(self, workflow_id: int, kind: RequestKeyKind, key: str,
+               now: Optional[datetime] = None) -> Optional[ExecutionRequestKey]:
+        """查询仍然有效的键（未过期且执行记录仍存在），无效的键返回None"""
+        now = now or datetime.utcnow()
+        row = self._get(workflow_id, kind, key)
+        if row is None or row.expires_at <= now:
+            return None
+        execution = self.db.query(Execution).filter(Execution.id == row.execution_id).first()
+        if execution is None:
+            return None
+        if kind == RequestKeyKind.MEMO and execution.status not in MEMO_REUSABLE_STATUSES:
+            return None
+        return row
+
+    def execution_for(self, row: ExecutionRequestKey) -> Execution:
+        return self.db.query(Execution).filter(Execution.id == row.execution_id).first()
+
+    def claim(self, workflow_id: int, kind: RequestKeyKind, key: str, digest: str,
+              execution_id: int, ttl_seconds: int):
+        """把键指向新的执行（不提交），已有的失效键直接覆盖
+
+        唯一约束保证并发的相同请求只有一个能提交成功，失败方回滚后重新查询。
+        """
+        now = datetime.utcnow()
+        row = self._get(workflow_id, kind, key)
+        if row is None:
+            row = ExecutionRequestKey(workflow_id=workflow_id, kind=kind, key=key)
+            self.db.add(row)
+        row.request_hash = digest
+        row.execution_id = execution_id
+        row.created_at = now
+        row.expires_at = now + timedelta(seconds=ttl_seconds)
+
+    def delete_for_executions(self, execution_ids):
+        """删除指向这些执行的键（执行被删除或归档时）"""
+        if not execution_ids:
+            return 0
+        return self.db.query(ExecutionRequestKey).filter(
+            ExecutionRequestKey.execution_id.in_(list(execution_ids))
+        ).delete(synchronize_session=False)
+
+    def delete_for_workflow(self, workflow_id: int):
+        return self.db.query(ExecutionRequestKey).filter(
+            ExecutionRequestKey.workflow_id == workflow_id
+        ).delete(synchronize_session=False)
+
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        """删除过期的键"""
+        now = now or datetime.utcnow()
+        count = self.db.query(ExecutionRequestKey).filter(
+            ExecutionRequestKey.expires_at <= now
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return count
+
+    def _get(self, workflow_id: int, kind: RequestKeyKind, key: str) -> Optional[ExecutionRequestKey]:
+        return self.db.query(ExecutionRequestKey).filter(
+            ExecutionRequestKey.workflow_id == workflow_id,
+            ExecutionRequestKey.kind == kind,
+            ExecutionRequestKey.key == key
+        ).first()
@@ -0,0 +1,35 @@
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule:
+    """模块代理，首次访问属性时才导入真正的模块
+
+    openai、aiohttp等SDK导入较慢（openai约0.4秒），只在实际请求模型或Jira时才需要，
+    延迟导入可以缩短服务启动和测试的时间。
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, Deque, Optional
+
+# 运行模式
+MODE_LIVE = "live"  # 直接调用真实服务
+MODE_RECORD = "record"  # 调用真实服务并把请求/响应/耗时追加写入磁带文件
+MODE_REPLAY = "replay"  # 不访问网络，按磁带内容回放
+
+_current_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_cassette_scope", default=None)
+
+
+class CassetteMiss(Exception):
+    """回放模式下磁带中没有匹配的请求"""
+
+
+def request_key(provider: str, model: str, request: Dict[str, Any]) -> str:
+    """请求指纹：提供方、模型和请求体（键排序后）的哈希"""
+    payload = json.dumps({"provider": provider, "model": model, "request": request}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def cassette_scope(execution_id: Optional[int], node_id: Optional[str]):
+    """标记当前LLM调用所属的执行和节点，记录时写入磁带，便于按执行回放"""
+    token = _current_scope.set({"execution_id": execution_id, "node_id": node_id})
+    try:
+        yield
+    finally:
+        _current_scope.reset(token)
+
+
+class LLMCassette:
+    """LLM请求的录制与回放
+
+    磁带为JSONL文件，每行一次请求：指纹、提供方、模型、请求体、归一化的响应
+    ({status, content, usage} 或 {error})、耗时以及所属执行/节点。
+    回放时同一指纹的多条记录按录制顺序依次返回，耗时按latency_scale缩放（0表示不等待）。
+    """
+
+    def __init__(self, mode: str = MODE_LIVE, path: Optional[str] = None, latency_scale: float = 1.0,
+                 execution_id: Optional[int] = None):
+        self.mode = mode
+        self.path = Path(path) if path else None
+        self.latency_scale = latency_scale
+        self.execution_id = execution_id
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Deque[Dict[str, Any]]]] = None
+
+    def _load(self) -> Dict[str, Deque[Dict[str, Any]]]:
+        """读取磁带；指定execution_id时只回放该执行录制的请求"""
+        entries: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        if self.path is None or not self.path.exists():
+            raise CassetteMiss(f"Cassette file not found: {self.path}")
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if self.execution_id is not None and entry.get("execution_id") != self.execution_id:
+                    continue
+                entries[entry["key"]].append(entry)
+        return entries
+
+    def _append(self, entry: Dict[str, Any]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _next_entry(self, key: str, provider: str, model: str) -> Dict[str, Any]:
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            recorded = self._entries.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No recorded {provider}/{model} response for request {key[:12]}")
+            # 最后一条保留，重复请求时继续返回
+            return recorded.popleft() if len(recorded) > 1 else recorded[0]
+
+    async def call(self, provider: str, model: str, request: Dict[str, Any],
+                   fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """执行一次LLM请求
+
+        fetch返回归一化的响应 {status, content, usage}；请求异常在录制时记为 {error}，
+        回放时重新抛出，与真实调用的行为一致。
+        """
+        if self.mode == MODE_REPLAY:
+            entry = self._next_entry(request_key(provider, model, request), provider, model)
+            delay = entry.get("latency_seconds", 0.0) * self.latency_scale
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if "error" in entry["response"]:
+                raise Exception(entry["response"]["error"])
+            return entry["response"]
+
+        if self.mode != MODE_RECORD:
+            return await fetch()
+
+        started = time.perf_counter()
+        error = None
+        try:
+            response = await fetch()
+        except Exception as e:
+            error = e
+            response = {"error": str(e)}
+        scope = _current_scope.get() or {}
+        self._append({
+            "key": request_key(provider, model, request),
+            "provider": provider,
+            "model": model,
+            "request": request,
+            "response": response,
+            "latency_seconds": time.perf_counter() - started,
+            "recorded_at": datetime.utcnow().isoformat(),
+            "execution_id": scope.get("execution_id"),
+            "node_id": scope.get("node_id"),
+        })
+        if error is not None:
+            raise error
+        return response
+
+
+def _cassette_from_env() -> LLMCassette:
+    execution_id = os.getenv("LLM_REPLAY_EXECUTION_ID")
+    return LLMCassette(
+        mode=os.getenv("LLM_MODE", MODE_LIVE).lower(),
+        path=os.getenv("LLM_CASSETTE", "./cassettes/llm.jsonl"),
+        latency_scale=float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0")),
+        execution_id=int(execution_id) if execution_id else None,
+    )
+
+
+cassette = _cassette_from_env()
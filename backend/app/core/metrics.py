@@ -0,0 +1,250 @@
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app.models.execution import Execution, ExecutionStatus
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类，按标签值保存子序列"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in sorted(items):
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [各分桶计数..., +Inf计数, 总和]
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[key] = series
+            series[index] += 1
+            series[-1] += value
+
+    def totals(self) -> Tuple[int, float]:
+        """所有标签组合的观测次数与总和"""
+        with self._lock:
+            series = list(self._values.values())
+        return sum(sum(s[:-1]) for s in series), sum(s[-1] for s in series)
+
+    @contextmanager
+    def time(self, **labels):
+        """计时上下文管理器"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_sample(self, key, series) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """进程内指标注册表"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+NODE_EXECUTION_SECONDS = REGISTRY.register(Histogram(
+    "workflow_node_execution_seconds", "Node processor execution time", ["node_type", "status"]))
+EXECUTIONS_FINISHED_TOTAL = REGISTRY.register(Counter(
+    "workflow_executions_finished_total", "Executions reaching a final status", ["status"]))
+EXECUTIONS_CURRENT = REGISTRY.register(Gauge(
+    "workflow_executions_current", "Executions currently in a non-final status (queued=pending)", ["status"]))
+LLM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "llm_request_seconds", "LLM provider request latency", ["provider", "model", "outcome"], buckets=LLM_BUCKETS))
+LLM_TOKENS_TOTAL = REGISTRY.register(Counter(
+    "llm_tokens_total", "LLM tokens reported by the provider", ["provider", "model", "kind"]))
+JIRA_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "jira_request_seconds", "Jira markdown service request latency", ["outcome"], buckets=LLM_BUCKETS))
+DB_COMMIT_SECONDS = REGISTRY.register(Histogram(
+    "db_commit_seconds", "SQLAlchemy session commit latency (including flush)"))
+TEMPLATE_RENDER_SECONDS = REGISTRY.register(Histogram(
+    "template_render_seconds", "Jinja2 template render time including variable loading"))
+PROMPT_TRUNCATIONS_TOTAL = REGISTRY.register(Counter(
+    "llm_prompt_truncations_total", "Agent prompts reduced to fit the token budget", ["strategy"]))
+NODE_CACHE_LOOKUPS_TOTAL = REGISTRY.register(Counter(
+    "node_cache_lookups_total", "Node result cache lookups", ["node_type", "outcome"]))
+NODE_CACHE_SECONDS_SAVED = REGISTRY.register(Counter(
+    "node_cache_seconds_saved_total", "Original execution time of nodes restored from the cache", ["node_type"]))
+EVENT_LOOP_LAG_SECONDS = REGISTRY.register(Histogram(
+    "event_loop_lag_seconds", "Delay of the event loop in waking a periodic timer", buckets=LOOP_LAG_BUCKETS))
+SCHEDULER_QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "scheduler_queue_wait_seconds", "Time executions waited for admission", ["lane"], buckets=LLM_BUCKETS))
+SCHEDULER_EXECUTIONS = REGISTRY.register(Gauge(
+    "scheduler_executions", "Top-level executions queued for or holding a scheduler slot", ["lane", "state"]))
+
+# 非终态执行在/metrics中展示的状态
+CURRENT_STATUSES = {"pending": "queued", "running": "running", "paused": "paused"}
+
+
+def record_llm_usage(provider: str, model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    """记录LLM返回的token用量"""
+    if prompt_tokens:
+        LLM_TOKENS_TOTAL.inc(prompt_tokens, provider=provider, model=model, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS_TOTAL.inc(completion_tokens, provider=provider, model=model, kind="completion")
+
+
+def update_execution_gauges(db: Session):
+    """抓取时从数据库统计运行中/暂停/排队的执行数（多进程部署下也准确）"""
+    counts = dict(
+        db.query(Execution.status, func.count(Execution.id))
+        .filter(Execution.status.in_([ExecutionStatus.PENDING, ExecutionStatus.RUNNING, ExecutionStatus.PAUSED]))
+        .group_by(Execution.status)
+        .all()
+    )
+    for status, label in CURRENT_STATUSES.items():
+        EXECUTIONS_CURRENT.set(counts.get(ExecutionStatus(status), 0), status=label)
+
+
+async def monitor_event_loop_lag(interval_seconds: float):
+    """周期性测量事件循环的调度延迟（定时器实际唤醒时间与预期的差值）"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval_seconds)
+        EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - started - interval_seconds, 0.0))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def _before_commit(session):
+    session.info["metrics_commit_started"] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop("metrics_commit_started", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def _after_rollback(session):
+    session.info.pop("metrics_commit_started", None)
+
+
+_db_instrumented = False
+
+
+def install_db_instrumentation():
+    """为所有Session注册提交耗时统计"""
+    global _db_instrumented
+    if _db_instrumented:
+        return
+    event.listen(Session, "before_commit", _before_commit)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    _db_instrumented = True
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from jinja2 import meta
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.variable_manager import VariableManager, JINJA_ENV
+from app.core.metrics import NODE_CACHE_LOOKUPS_TOTAL, NODE_CACHE_SECONDS_SAVED
+from app.core import codec
+from app.models.variable import VariableType
+from app.models.node_cache import NodeResultCache
+
+# 缓存结果的有效期（秒）
+NODE_CACHE_TTL_SECONDS = int(os.getenv("NODE_CACHE_TTL_SECONDS", "604800"))
+# 查找时比较的候选条目数（同一节点配置下读取的变量集合可能不同）
+NODE_CACHE_CANDIDATES = int(os.getenv("NODE_CACHE_CANDIDATES", "8"))
+
+# 默认缓存的节点类型：输出只取决于配置和读取的变量
+CACHEABLE_NODE_TYPES = {"agent"}
+# 可以通过节点配置cache=true开启缓存的类型（结果依赖外部数据，默认不缓存）
+OPT_IN_NODE_TYPES = {"agent", "jira"}
+
+# 当前执行是否启用节点缓存，子执行（子工作流）继承父执行的设置
+_enabled: ContextVar[bool] = ContextVar('node_cache_enabled', default=False)
+
+
+@contextmanager
+def node_cache_scope(enabled: bool):
+    """在作用域内启用节点缓存（只能开启，不会关闭外层已开启的缓存）"""
+    token = _enabled.set(_enabled.get() or bool(enabled))
+    try:
+        yield
+    finally:
+        _enabled.reset(token)
+
+
+@lru_cache(maxsize=512)
+def template_names(template_str: str) -> Tuple[str, ...]:
+    """模板引用的变量名（模板内部定义的变量除外）"""
+    return tuple(sorted(meta.find_undeclared_variables(JINJA_ENV.parse(template_str))))
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _node_config(node: Dict[str, Any]) -> Dict[str, Any]:
+    config = node.get('data', {}).get('config', {})
+    if isinstance(config, str):
+        try:
+            config = json.loads(config)
+        except json.JSONDecodeError:
+            return {}
+    return config or {}
+
+
+def node_key(node: Dict[str, Any]) -> str:
+    """节点ID、类型和配置的哈希（显示名称和超时设置不影响输出，不计入）"""
+    config = {k: v for k, v in _node_config(node).items() if k not in ('label', 'timeoutSeconds', 'cache')}
+    return _sha256(_canonical({'id': node.get('id'), 'type': node.get('type'), 'config': config}))
+
+
+def inputs_hash(read_names: List[str], variables: Dict[str, Any]) -> str:
+    return _sha256(_canonical([[name, variables.get(name)] for name in read_names]))
+
+
+class RecordingVariableManager(VariableManager):
+    """记录节点读取和写入的变量，读写仍交给原来的变量管理器"""
+    
+    def __init__(self, inner: VariableManager):
+        super().__init__(inner.db)
+        self.inner = inner
+        self.jinja_env = inner.jinja_env
+        self.reads: Dict[str, Any] = {}
+        self.writes: List[Tuple[str, Any, str]] = []
+    
+    def _record_read(self, name: str, value: Any):
+        # 节点自己写入后再读取的变量不属于输入
+        if name not in self.reads and not any(w[0] == name for w in self.writes):
+            self.reads[name] = value
+    
+    async def set_variable(self, execution_id: int, name: str, value: Any, var_type: VariableType, created_by_node: str):
+        await self.inner.set_variable(execution_id, name, value, var_type, created_by_node)
+        self.writes.append((name, value, VariableType(var_type).value))
+    
+    async def get_variable(self, execution_id: int, name: str) -> Optional[Any]:
+        value = await self.inner.get_variable(execution_id, name)
+        self._record_read(name, value)
+        return value
+    
+    async def get_all_variables(self, execution_id: int) -> Dict[str, Any]:
+        variables = await self.inner.get_all_variables(execution_id)
+        for name, value in variables.items():
+            self._record_read(name, value)
+        return variables
+    
+    async def _template_variables(self, execution_id: int, template_str: str) -> Dict[str, Any]:
+        # 只记录模板实际引用的变量，其它变量变化不影响渲染结果
+        variables = await self.inner.get_all_variables(execution_id)
+        for name in template_names(template_str):
+            self._record_read(name, variables.get(name))
+        return variables
+
+
+class NodeCache:
+    """节点结果缓存
+
+    节点执行时记录读取的变量集合；查找时按节点配置取出候选条目，
+    用当前变量的取值重新计算各条目读取集合的哈希，一致即命中，
+    重放节点写入的变量并返回原来的结果。
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def applies_to(self, node: Dict[str, Any]) -> bool:
+        """当前执行启用缓存且节点类型可缓存（节点配置cache可单独开关）"""
+        if not _enabled.get():
+            return False
+        setting = _node_config(node).get('cache')
+        if setting is None:
+            return node.get('type') in CACHEABLE_NODE_TYPES
+        return bool(setting) and node.get('type') in OPT_IN_NODE_TYPES
+    
+    async def lookup(self, node: Dict[str, Any], execution_id: int,
+                     variable_manager: VariableManager) -> Optional[Dict[str, Any]]:
+        """命中时写入缓存的变量并返回结果，未命中返回None"""
+        now = datetime.utcnow()
+        candidates = self.db.query(NodeResultCache).filter(
+            NodeResultCache.node_key == node_key(node),
+            NodeResultCache.expires_at > now
+        ).order_by(NodeResultCache.last_used_at.desc()).limit(NODE_CACHE_CANDIDATES).all()
+        if not candidates:
+            NODE_CACHE_LOOKUPS_TOTAL.inc(node_type=node['type'], outcome='miss')
+            return None
+        
+        variables = await variable_manager.get_all_variables(execution_id)
+        for entry in candidates:
+            if inputs_hash(json.loads(entry.read_names), variables) != entry.inputs_hash:
+                continue
+            for name, value, var_type in codec.loads(entry.writes):
+                await variable_manager.set_variable(execution_id, name, value, VariableType(var_type), node['id'])
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_used_at = now
+            self.db.commit()
+            
+            result = codec.loads(entry.result)
+            # 命中时没有调用模型，不计token用量
+            if result.get('prompt_tokens') is not None:
+                result['prompt_tokens'] = 0
+                result['completion_tokens'] = 0
+            result['cache_hit'] = True
+            result['time_saved'] = entry.duration
+            NODE_CACHE_LOOKUPS_TOTAL.inc(node_type=node['type'], outcome='hit')
+            NODE_CACHE_SECONDS_SAVED.inc(entry.duration or 0, node_type=node['type'])
+            return result
+        NODE_CACHE_LOOKUPS_TOTAL.inc(node_type=node['type'], outcome='miss')
+        return None
+    
+    def store(self, node: Dict[str, Any], recorder: RecordingVariableManager, result: Dict[str, Any], duration: float):
+        """保存成功且可缓存的结果（处理器返回cacheable=False时不保存）"""
+        if result.get('status', 'success') != 'success' or not result.get('cacheable', True):
+            return
+        read_names = sorted(recorder.reads)
+        key = node_key(node)
+        digest = inputs_hash(read_names, recorder.reads)
+        now = datetime.utcnow()
+        values = {
+            'read_names': json.dumps(read_names),
+            'writes': codec.dumps(recorder.writes, default=str),
+            'result': codec.dumps(result, default=str),
+            'duration': duration,
+            'created_at': now,
+            'last_used_at': now,
+            'expires_at': now + timedelta(seconds=NODE_CACHE_TTL_SECONDS),
+        }
+        entry = self.db.query(NodeResultCache).filter(
+            NodeResultCache.node_key == key, NodeResultCache.inputs_hash == digest
+        ).first()
+        if entry is None:
+            self.db.add(NodeResultCache(node_key=key, inputs_hash=digest, hits=0, **values))
+        else:
+            for name, value in values.items():
+                setattr(entry, name, value)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # 并发执行的相同节点已写入同一条目
+            self.db.rollback()
+    
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        """删除过期的缓存条目"""
+        now = now or datetime.utcnow()
+        count = self.db.query(NodeResultCache).filter(
+            NodeResultCache.expires_at <= now
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return count
@@ -1,31 +1,34 @@
 import json
 import asyncio
 import os
-import aiohttp
-from pathlib import Path
+import time
 from typing import Dict, Any
 from sqlalchemy.orm import Session
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
 from app.core.node_processors.base_processor import BaseNodeProcessor
 from app.core.variable_manager import VariableManager
 from app.models.agent import Agent
-from app.models.meta import Meta
+from app.core.metrics import LLM_REQUEST_SECONDS, PROMPT_TRUNCATIONS_TOTAL, record_llm_usage
+from app.core.tracing import tracer, SPAN_KIND_CLIENT
+from app.core.profiler import profile_section
+from app.core.llm_cassette import cassette, cassette_scope, MODE_REPLAY
+from app.core.tokens import SummaryFailed, count_tokens, fit_prompt, resolve_budget
+from app.core.deadlines import DeadlineExceeded, check_deadline, timeout_for
+from app.core.lazy_imports import lazy_module
+from app.core.config_service import config_service
+from app.core.scheduler import scheduler
+from app.core.http_client import get_http_session, total_timeout
 
-# 加载根目录的.env文件
-# 获取当前文件的路径，然后向上找到项目根目录
-current_file = Path(__file__)
-project_root = current_file.parent.parent.parent.parent.parent  # backend/app/core/node_processors/ -> ai_workflow根目录
-env_path = project_root / '.env'
+# 模型SDK在第一次调用时才导入（.env在导入app包时由app.core.env加载）
+openai = lazy_module("openai")
 
-# 检查.env文件是否存在并加载
-if env_path.exists():
-    load_dotenv(env_path)
-    print(f"✓ 成功加载环境变量文件: {env_path}")
-else:
-    print(f"⚠️  环境变量文件不存在: {env_path}")
-    # 尝试从默认位置加载
-    load_dotenv()
+# 单次LLM请求的超时上限（秒），实际超时不超过节点/执行的剩余时间
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+# 节点未指定modelName时使用的模型
+DEFAULT_MODEL_NAMES = {'qwen': 'qwen-turbo', 'openai': 'gpt-3.5-turbo'}
+
+# 模型调用失败时返回的提示文本前缀
+ERROR_RESPONSE_PREFIXES = ("[错误]", "[千问API错误]", "[千问API调用失败]", "[OpenAI API调用失败]", "[OpenAI返回空响应]")
 
 class AgentNodeProcessor(BaseNodeProcessor):
     """Agent节点处理器"""
@@ -56,21 +59,38 @@ class AgentNodeProcessor(BaseNodeProcessor):
                     'error': 'No prompt specified in node configuration'
                 }
             
-            # 使用Jinja2渲染提示词
-            rendered_prompt = await variable_manager.render_template(execution_id, prompt_template)
-            
             if model_type == 'qwen':
-                # 调用千问API
-                response = await self._call_qwen_api(rendered_prompt, node_config.get('modelName', 'qwen-turbo'))
+                call_api, model_name = self._call_qwen_api, node_config.get('modelName', DEFAULT_MODEL_NAMES['qwen'])
             elif model_type == 'openai':
-                # 调用OpenAI API
-                response = await self._call_openai_api(rendered_prompt, node_config.get('modelName', 'gpt-3.5-turbo'))
+                call_api, model_name = self._call_openai_api, node_config.get('modelName', DEFAULT_MODEL_NAMES['openai'])
             else:
                 return {
                     'status': 'error',
                     'error': f'Unsupported model type: {model_type}'
                 }
             
+            # 使用Jinja2渲染提示词
+            rendered_prompt = await variable_manager.render_template(execution_id, prompt_template)
+            
+            # 本节点所有LLM调用（含摘要）的token用量
+            usage = {'prompt_tokens': 0, 'completion_tokens': 0}
+            
+            async def summarizer(text: str, limit: int) -> str:
+                summary = await call_api(text, model_name, max_tokens=limit, usage=usage)
+                if summary.startswith(ERROR_RESPONSE_PREFIXES):
+                    # 错误信息不能当作摘要拼进提示词
+                    raise SummaryFailed(summary)
+                return summary
+            
+            with cassette_scope(execution_id, node['id']):
+                # 提示词超出预算时按节点配置的策略压缩
+                prompt_budget, max_tokens, strategy = resolve_budget(node_config, model_name)
+                rendered_prompt, truncated = await fit_prompt(rendered_prompt, prompt_budget, strategy, model_name, summarizer)
+                if truncated:
+                    PROMPT_TRUNCATIONS_TOTAL.inc(strategy=strategy)
+                
+                response = await call_api(rendered_prompt, model_name, max_tokens=max_tokens, usage=usage)
+            
             # 保存响应为变量
             output_variable = node_config.get('outputVariable', f"{node['id']}_output")
             await variable_manager.set_variable(
@@ -86,6 +106,11 @@ class AgentNodeProcessor(BaseNodeProcessor):
                 'next_node': None,  # 由引擎根据边连接查找下一个节点
                 'prompt': rendered_prompt,
                 'response': response,
+                'prompt_tokens': usage['prompt_tokens'],
+                'completion_tokens': usage['completion_tokens'],
+                'prompt_truncated': strategy if truncated else None,
+                # 调用失败时响应是错误提示，不能放入节点缓存
+                'cacheable': not response.startswith(ERROR_RESPONSE_PREFIXES),
                 'output': f"Agent executed successfully. Output saved to variable '{output_variable}'"
             }
             
@@ -137,24 +162,25 @@ class AgentNodeProcessor(BaseNodeProcessor):
                 'output': f"Agent executed successfully. Output saved to variable '{output_variable}'"
             }
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {
                 'status': 'error',
                 'error': f"Agent node processing error: {str(e)}"
             }
     
-    async def _call_qwen_api(self, prompt: str, model_name: str = 'qwen-turbo') -> str:
-        """调用千问API"""
+    async def _call_qwen_api(self, prompt: str, model_name: str = 'qwen-turbo', max_tokens: int = 2000,
+                             usage: Dict[str, int] = None) -> str:
+        """调用千问API，传入usage时累加本次调用的token数"""
         try:
-            # 从环境变量获取Token
-            # qwen_token = os.getenv('QwenToken')
-            qwen_token = "sk-6675f39e30ba44dcabbc605e0e9820c2"
-            if not qwen_token:
-                available_env_vars = [key for key in os.environ.keys() if 'qwen' in key.lower()]
-                return f"[错误] 未配置QwenToken环境变量。当前环境中的相关变量: {available_env_vars}"
-            
-            # 千问API配置
-            base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+            # 全局设置中的qwen_token优先，没有时使用QwenToken环境变量
+            qwen_token = config_service.secret('qwen_token', 'QwenToken', db=self.db)
+            if not qwen_token and cassette.mode != MODE_REPLAY:
+                return "[错误] 未配置千问API Key，请在全局设置中配置或设置QwenToken环境变量"
+            
+            # 千问API配置（可通过QWEN_BASE_URL指向兼容的本地服务）
+            base_url = os.getenv('QWEN_BASE_URL', 'https://dashscope.aliyuncs.com/compatible-mode/v1')
             headers = {
                 "Authorization": f"Bearer {qwen_token}",
                 "Content-Type": "application/json"
@@ -170,71 +196,115 @@ class AgentNodeProcessor(BaseNodeProcessor):
                     }
                 ],
                 "temperature": 0.7,
-                "max_tokens": 2000
+                "max_tokens": max_tokens
             }
             
-            # 发送请求
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
+            async def fetch():
+                async with get_http_session().post(
                     f"{base_url}/chat/completions",
                     headers=headers,
                     json=data,
-                    timeout=aiohttp.ClientTimeout(total=30)
+                    timeout=total_timeout(timeout_for(LLM_TIMEOUT_SECONDS))
                 ) as response:
                     if response.status == 200:
                         result = await response.json()
-                        return result['choices'][0]['message']['content']
+                        return {
+                            'status': 200,
+                            'content': result['choices'][0]['message']['content'],
+                            'usage': result.get('usage') or {}
+                        }
+                    return {'status': response.status, 'content': await response.text()}
+            
+            # 发送请求（录制/回放模式下经由磁带）
+            started = time.perf_counter()
+            outcome = 'error'
+            with tracer.span("llm.chat", {'llm.provider': 'qwen', 'llm.model': model_name}, kind=SPAN_KIND_CLIENT) as llm_span, \
+                    profile_section('network'):
+                try:
+                    result = await cassette.call('qwen', model_name, data, fetch)
+                    if result['status'] == 200:
+                        outcome = 'ok'
+                        self._record_usage('qwen', model_name, prompt, result, usage)
+                        return result['content']
                     else:
-                        error_text = await response.text()
-                        return f"[千问API错误] HTTP {response.status}: {error_text}"
+                        return f"[千问API错误] HTTP {result['status']}: {result['content']}"
+                except asyncio.CancelledError:
+                    outcome = 'cancelled'
+                    raise
+                finally:
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, provider='qwen', model=model_name, outcome=outcome)
+                    llm_span.set_attribute('llm.outcome', outcome)
                         
         except Exception as e:
+            check_deadline()
             return f"[千问API调用失败] {str(e)}"
     
-    async def _call_openai_api(self, prompt: str, model_name: str = 'gpt-3.5-turbo') -> str:
-        """调用OpenAI API"""
+    async def _call_openai_api(self, prompt: str, model_name: str = 'gpt-3.5-turbo', max_tokens: int = 2000,
+                               usage: Dict[str, int] = None) -> str:
+        """调用OpenAI API，传入usage时累加本次调用的token数"""
         try:
-            # 首先从数据库获取API Key
-            openai_api_key = self._get_openai_api_key()
+            # 全局设置中的openai_token优先，没有时使用OPENAI_API_KEY环境变量
+            openai_api_key = config_service.secret('openai_token', 'OPENAI_API_KEY', db=self.db)
             
-            # 如果数据库中没有，再从环境变量获取（向后兼容）
-            if not openai_api_key:
-                openai_api_key = os.getenv('OPENAI_API_KEY')
-                
-            if not openai_api_key:
+            # 回放模式不访问网络，无需API Key
+            if not openai_api_key and cassette.mode != MODE_REPLAY:
                 return f"[错误] 未配置OpenAI API Key，请在全局设置中配置或设置OPENAI_API_KEY环境变量"
             
-            # 创建OpenAI客户端
-            client = AsyncOpenAI(api_key=openai_api_key)
-            
-            # 调用OpenAI API
-            response = await client.chat.completions.create(
-                model=model_name,
-                messages=[
+            data = {
+                "messages": [
                     {
                         "role": "user",
                         "content": prompt
                     }
                 ],
-                temperature=0.7,
-                max_tokens=2000,
-                timeout=30.0
-            )
+                "temperature": 0.7,
+                "max_tokens": max_tokens
+            }
+            
+            async def fetch():
+                client = openai.AsyncOpenAI(api_key=openai_api_key)
+                response = await client.chat.completions.create(model=model_name, timeout=timeout_for(LLM_TIMEOUT_SECONDS), **data)
+                usage = {}
+                if response.usage:
+                    usage = {
+                        'prompt_tokens': response.usage.prompt_tokens,
+                        'completion_tokens': response.usage.completion_tokens
+                    }
+                return {'status': 200, 'content': response.choices[0].message.content, 'usage': usage}
             
-            return response.choices[0].message.content or "[OpenAI返回空响应]"
+            # 调用OpenAI API（录制/回放模式下经由磁带）
+            started = time.perf_counter()
+            outcome = 'error'
+            with tracer.span("llm.chat", {'llm.provider': 'openai', 'llm.model': model_name}, kind=SPAN_KIND_CLIENT) as llm_span, \
+                    profile_section('network'):
+                try:
+                    result = await cassette.call('openai', model_name, data, fetch)
+                    outcome = 'ok'
+                except asyncio.CancelledError:
+                    outcome = 'cancelled'
+                    raise
+                finally:
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, provider='openai', model=model_name, outcome=outcome)
+                    llm_span.set_attribute('llm.outcome', outcome)
+            
+            self._record_usage('openai', model_name, prompt, result, usage)
+            
+            return result['content'] or "[OpenAI返回空响应]"
             
         except Exception as e:
+            check_deadline()
             return f"[OpenAI API调用失败] {str(e)}"
     
-    def _get_openai_api_key(self) -> str:
-        """从数据库获取OpenAI API Key"""
-        try:
-            if not self.db:
-                return ''
-            meta = self.db.query(Meta).filter(Meta.key == 'openai_token').first()
-            return meta.value if meta else ''
-        except Exception:
-            return ''
+    def _record_usage(self, provider: str, model_name: str, prompt: str, result: Dict[str, Any], usage: Dict[str, int]):
+        """记录token用量：优先使用服务返回的usage，没有时按本地计数估算；同时计入租户的token配额"""
+        reported = result.get('usage') or {}
+        record_llm_usage(provider, model_name, reported.get('prompt_tokens'), reported.get('completion_tokens'))
+        prompt_tokens = reported.get('prompt_tokens') or count_tokens(prompt, model_name)
+        completion_tokens = reported.get('completion_tokens') or count_tokens(result.get('content') or '', model_name)
+        scheduler.charge_tokens(prompt_tokens + completion_tokens)
+        if usage is not None:
+            usage['prompt_tokens'] += prompt_tokens
+            usage['completion_tokens'] += completion_tokens
     
     async def _call_llm(self, agent: Agent, prompt: str) -> str:
         """调用LLM (兼容旧的Agent配置)"""
@@ -40,5 +40,8 @@ class BaseNodeProcessor(ABC):
                 # 如果指定了输出键，检查边的标签
                 if output_key and edge.get('sourceHandle') != output_key:
                     continue
+                # 错误分支只在节点出错时使用
+                if not output_key and edge.get('sourceHandle') == 'error':
+                    continue
                 return edge.get('target')
         return None 
\ No newline at end of file
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple
+from sqlalchemy.orm import Session
+from app.core.node_processors.base_processor import BaseNodeProcessor
+from app.core.variable_manager import VariableManager, ScopedVariableManager
+from app.core.tracing import tracer
+
+# foreach节点的输出端口
+BODY_HANDLE = "body"  # 循环体，每个元素执行一次
+EACH_HANDLE = "each"  # 流式模式下每完成一个元素立即执行
+DONE_HANDLE = "done"  # 全部完成后继续
+
+
+class ForeachNodeProcessor(BaseNodeProcessor):
+    """循环节点处理器
+
+    遍历JSON列表变量，对每个元素在独立的变量作用域中执行body端口连出的子图，
+    最多maxConcurrency个迭代并发执行；按原顺序把每次迭代的结果收集到输出列表变量。
+    开启streamResults时，每完成一个迭代就更新输出变量，并在后台执行each端口连出的子图
+    （与其他迭代一起受maxConcurrency限制），全部完成后才走done端口。
+    每个迭代使用独立的数据库会话，并发迭代的提交和回滚互不影响。
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @contextmanager
+    def _isolated_engine(self, db: Session):
+        """绑定同一数据库的独立会话及使用它的引擎，用于一次迭代"""
+        iteration_db = Session(bind=db.get_bind(), autoflush=False)
+        try:
+            yield self.engine.__class__(iteration_db)
+        finally:
+            iteration_db.close()
+
+    async def process(
+        self,
+        node: Dict[str, Any],
+        execution_id: int,
+        variable_manager: VariableManager,
+        db: Session
+    ) -> Dict[str, Any]:
+        """处理循环节点"""
+        try:
+            node_config = node.get('data', {}).get('config', {})
+            if isinstance(node_config, str):
+                node_config = json.loads(node_config)
+
+            list_variable = node_config.get('listVariable')
+            if not list_variable:
+                return {
+                    'status': 'error',
+                    'error': 'No list variable specified in foreach configuration'
+                }
+            items = await variable_manager.get_variable(execution_id, list_variable)
+            if isinstance(items, str):
+                try:
+                    items = json.loads(items)
+                except json.JSONDecodeError:
+                    pass
+            if not isinstance(items, list):
+                return {
+                    'status': 'error',
+                    'error': f"Variable '{list_variable}' is not a JSON list"
+                }
+
+            workflow_config = self.engine.workflow_config
+            body_start = self._find_next_node(workflow_config, node['id'], BODY_HANDLE)
+            if not body_start:
+                return {
+                    'status': 'error',
+                    'error': 'Foreach node has no body connection'
+                }
+            each_start = self._find_next_node(workflow_config, node['id'], EACH_HANDLE)
+
+            item_variable = node_config.get('itemVariable') or 'item'
+            index_variable = node_config.get('indexVariable') or 'index'
+            result_variable = node_config.get('resultVariable')
+            output_variable = node_config.get('outputVariable') or f"{node['id']}_results"
+            max_concurrency = max(int(node_config.get('maxConcurrency') or 4), 1)
+            stream_results = bool(node_config.get('streamResults'))
+            continue_on_error = bool(node_config.get('continueOnError'))
+
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def run_iteration(index: int, item: Any) -> Tuple[int, Any, ScopedVariableManager]:
+                async with semaphore:
+                    scope = ScopedVariableManager(variable_manager, {item_variable: item, index_variable: index})
+                    with tracer.span("foreach.iteration", {'node.id': node['id'], 'iteration.index': index}), \
+                            self._isolated_engine(db) as engine:
+                        try:
+                            await engine.execute_subgraph(
+                                execution_id, body_start, scope, parent_node_id=node['id'], iteration_index=index
+                            )
+                        except Exception as e:
+                            if not continue_on_error:
+                                raise
+                            return index, {'error': str(e)}, scope
+                    # 未指定resultVariable时取本迭代最后写入的变量
+                    name = result_variable or scope.last_written
+                    return index, scope.local_variables.get(name) if name else None, scope
+
+            async def run_each(index: int, scope: ScopedVariableManager):
+                async with semaphore:
+                    with self._isolated_engine(db) as engine:
+                        await engine.execute_subgraph(
+                            execution_id, each_start, scope, parent_node_id=node['id'], iteration_index=index
+                        )
+
+            results: List[Any] = [None] * len(items)
+            failed = 0
+            tasks = [asyncio.create_task(run_iteration(index, item)) for index, item in enumerate(items)]
+            each_tasks: List[asyncio.Task] = []
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    index, value, scope = await next_done
+                    results[index] = value
+                    if isinstance(value, dict) and set(value) == {'error'}:
+                        failed += 1
+                    if stream_results:
+                        await variable_manager.set_variable(
+                            execution_id, output_variable, results, variable_manager._infer_type(results), node['id']
+                        )
+                        if each_start:
+                            scope.local_variables['result'] = value
+                            each_tasks.append(asyncio.create_task(run_each(index, scope)))
+                await asyncio.gather(*each_tasks)
+            finally:
+                # 出错时取消尚未完成的迭代
+                pending = tasks + each_tasks
+                for task in pending:
+                    if not task.done():
+                        task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+            await variable_manager.set_variable(
+                execution_id, output_variable, results, variable_manager._infer_type(results), node['id']
+            )
+
+            return {
+                'status': 'success',
+                'next_node': None,
+                'output_branch': DONE_HANDLE,
+                'output': f"Foreach completed {len(items)} iterations ({failed} failed). Results saved to variable '{output_variable}'"
+            }
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': f"Foreach node processing error: {str(e)}"
+            }
@@ -1,37 +1,63 @@
 import json
-import aiohttp
+import os
+import time
+import asyncio
 from typing import Dict, Any, List
 from sqlalchemy.orm import Session
 from app.core.node_processors.base_processor import BaseNodeProcessor
 from app.core.variable_manager import VariableManager
-from app.models.meta import Meta
+from app.models.variable import VariableType
+from app.core.metrics import JIRA_REQUEST_SECONDS
+from app.core.tracing import tracer, SPAN_KIND_CLIENT
+from app.core.profiler import profile_section
+from app.core.deadlines import DeadlineExceeded, check_deadline, timeout_for
+from app.core.lazy_imports import lazy_module
+from app.core.config_service import config_service
+
+aiohttp = lazy_module("aiohttp")
+
+# 单次Jira请求的超时上限（秒），实际超时不超过节点/执行的剩余时间
+JIRA_TIMEOUT_SECONDS = float(os.getenv("JIRA_TIMEOUT_SECONDS", "30"))
 
 class JiraProcessor(BaseNodeProcessor):
     """Jira节点处理器 - 调用外部Jira API获取Epic信息"""
     
     def __init__(self, db: Session, variable_manager: VariableManager):
-        super().__init__(db, variable_manager)
+        self.db = db
+        self.variable_manager = variable_manager
     
-    async def process(self, node_id: str, config: Dict[str, Any], execution_id: int) -> Dict[str, Any]:
+    async def process(
+        self, 
+        node: Dict[str, Any], 
+        execution_id: int, 
+        variable_manager: VariableManager,
+        db: Session
+    ) -> Dict[str, Any]:
         """
         处理Jira节点
         
         Args:
-            node_id: 节点ID
-            config: 节点配置，包含jiraSource和jiraKeys
+            node: 节点配置，data.config包含jiraSource和jiraKeys
             execution_id: 执行ID
+            variable_manager: 变量管理器
+            db: 数据库会话
             
         Returns:
             包含处理结果的字典
         """
         try:
+            # 获取节点配置
+            config = node.get('data', {}).get('config', {})
+            if isinstance(config, str):
+                config = json.loads(config)
+            
             # 获取配置参数
             jira_source = config.get('jiraSource', 'wpb').lower()
             jira_keys_str = config.get('jiraKeys', '')
             
             if not jira_keys_str.strip():
                 return {
-                    'success': False,
+                    'status': 'error',
                     'error': 'Epic Key列表不能为空'
                 }
             
@@ -40,15 +66,15 @@ class JiraProcessor(BaseNodeProcessor):
             
             if not jira_keys:
                 return {
-                    'success': False,
+                    'status': 'error',
                     'error': 'Epic Key列表格式错误'
                 }
             
             # 获取Jira Token
-            jira_token = self._get_jira_token()
+            jira_token = config_service.get('jira_token', db=self.db)
             if not jira_token:
                 return {
-                    'success': False,
+                    'status': 'error',
                     'error': '未配置Jira API Key，请在全局设置中配置'
                 }
             
@@ -58,39 +84,34 @@ class JiraProcessor(BaseNodeProcessor):
             if result['success']:
                 # 将结果保存到变量中
                 output_variable = config.get('outputVariable', 'jira_output')
-                self.variable_manager.set_variable(
-                    execution_id=execution_id,
-                    name=output_variable,
-                    value=result['data'],
-                    var_type='string',
-                    created_by_node=node_id
+                await variable_manager.set_variable(
+                    execution_id,
+                    output_variable,
+                    result['data'],
+                    VariableType.STRING,
+                    node['id']
                 )
                 
                 return {
-                    'success': True,
+                    'status': 'success',
+                    'next_node': None,  # 由引擎根据边连接查找下一个节点
                     'output': f'成功获取了{len(jira_keys)}个Epic的信息',
                     'data': result['data']
                 }
             else:
                 return {
-                    'success': False,
+                    'status': 'error',
                     'error': result['error']
                 }
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {
-                'success': False,
+                'status': 'error',
                 'error': f'Jira节点处理失败: {str(e)}'
             }
     
-    def _get_jira_token(self) -> str:
-        """从数据库获取Jira Token"""
-        try:
-            meta = self.db.query(Meta).filter(Meta.key == 'jira_token').first()
-            return meta.value if meta else ''
-        except Exception:
-            return ''
-    
     async def _call_jira_api(self, jira_keys: List[str], jira_source: str, jira_token: str) -> Dict[str, Any]:
         """
         调用外部Jira API
@@ -112,32 +133,46 @@ class JiraProcessor(BaseNodeProcessor):
                 "jiraToken": jira_token
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    json=payload,
-                    headers={'Content-Type': 'application/json'},
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.text()
-                        return {
-                            'success': True,
-                            'data': data
-                        }
-                    else:
-                        error_text = await response.text()
-                        return {
-                            'success': False,
-                            'error': f'Jira API调用失败 (状态码: {response.status}): {error_text}'
-                        }
+            started = time.perf_counter()
+            outcome = 'error'
+            with tracer.span("jira.markdown", {'jira.source': jira_source, 'jira.keys': len(jira_keys)}, kind=SPAN_KIND_CLIENT) as jira_span, \
+                    profile_section('network'):
+                try:
+                    async with aiohttp.ClientSession() as session:
+                        async with session.post(
+                            url,
+                            json=payload,
+                            headers={'Content-Type': 'application/json'},
+                            timeout=aiohttp.ClientTimeout(total=timeout_for(JIRA_TIMEOUT_SECONDS))
+                        ) as response:
+                            if response.status == 200:
+                                data = await response.text()
+                                outcome = 'ok'
+                                return {
+                                    'success': True,
+                                    'data': data
+                                }
+                            else:
+                                error_text = await response.text()
+                                return {
+                                    'success': False,
+                                    'error': f'Jira API调用失败 (状态码: {response.status}): {error_text}'
+                                }
+                except asyncio.CancelledError:
+                    outcome = 'cancelled'
+                    raise
+                finally:
+                    JIRA_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+                    jira_span.set_attribute('jira.outcome', outcome)
                         
         except aiohttp.ClientError as e:
+            check_deadline()
             return {
                 'success': False,
                 'error': f'网络请求失败: {str(e)}'
             }
         except Exception as e:
+            check_deadline()
             return {
                 'success': False,
                 'error': f'调用Jira API时发生错误: {str(e)}'
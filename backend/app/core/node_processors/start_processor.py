@@ -31,9 +31,11 @@ class StartNodeProcessor(BaseNodeProcessor):
             else:
                 initial_variables = initial_variables_str or {}
             
-            # 设置初始变量
+            # 设置初始变量（启动执行时传入的同名变量优先，如子工作流的输入）
             if initial_variables:
                 for key, value in initial_variables.items():
+                    if await variable_manager.get_variable(execution_id, key) is not None:
+                        continue
                     await variable_manager.set_variable(
                         execution_id, 
                         key, 
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.node_processors.base_processor import BaseNodeProcessor
+from app.core.variable_manager import VariableManager, ScopedVariableManager
+from app.core.workflow_compiler import ensure_compiled, errors_of
+from app.core.workflow_versions import graph_for_version
+from app.core.task_registry import execution_tasks
+from app.models.workflow import Workflow
+from app.models.execution import Execution, ExecutionStatus
+from app.models.variable import Variable
+
+MODE_INLINE = "inline"  # 在当前执行中运行，节点历史记录在父执行下
+MODE_CHILD = "child"  # 创建子执行，拥有独立的变量和历史
+
+# 子工作流最大嵌套深度
+MAX_DEPTH = 8
+# 记忆化结果的缓存个数
+MEMO_CACHE_SIZE = 256
+
+# 当前调用链上的工作流ID，用于检测递归调用
+_call_stack: ContextVar[Tuple[int, ...]] = ContextVar('subworkflow_call_stack', default=())
+
+
+@contextmanager
+def workflow_call_scope(workflow_id: int):
+    """把顶层执行的工作流放入调用链（子执行已由调用方放入），A调用A或A→B→A在第一次回到A时即被发现"""
+    call_stack = _call_stack.get()
+    if call_stack and call_stack[-1] == workflow_id:
+        yield
+        return
+    token = _call_stack.set(call_stack + (workflow_id,))
+    try:
+        yield
+    finally:
+        _call_stack.reset(token)
+
+
+class MemoCache:
+    """按 (工作流版本哈希, 输入, 映射回父执行的子变量) 缓存子工作流的输出"""
+
+    def __init__(self, max_entries: int = MEMO_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple[str, str, str], value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+memo_cache = MemoCache()
+
+
+def _mapping(value: Any) -> Dict[str, str]:
+    if isinstance(value, str):
+        value = json.loads(value) if value.strip() else {}
+    return dict(value or {})
+
+
+class SubworkflowNodeProcessor(BaseNodeProcessor):
+    """子工作流节点处理器
+
+    按ID调用另一个工作流的当前版本，复用其缓存的编译图。inputMapping把父执行的变量（或Jinja2模板）
+    映射为子工作流的输入，outputMapping把子工作流的变量映射回父执行。
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def process(
+        self,
+        node: Dict[str, Any],
+        execution_id: int,
+        variable_manager: VariableManager,
+        db: Session
+    ) -> Dict[str, Any]:
+        """处理子工作流节点"""
+        try:
+            node_config = node.get('data', {}).get('config', {})
+            if isinstance(node_config, str):
+                node_config = json.loads(node_config)
+
+            workflow_id = node_config.get('workflowId')
+            if not workflow_id:
+                return {
+                    'status': 'error',
+                    'error': 'No workflow specified in sub-workflow configuration'
+                }
+            workflow = db.query(Workflow).filter(Workflow.id == int(workflow_id)).first()
+            if not workflow:
+                return {
+                    'status': 'error',
+                    'error': f"Sub-workflow {workflow_id} not found"
+                }
+
+            errors = errors_of(ensure_compiled(workflow, db))
+            if errors:
+                return {
+                    'status': 'error',
+                    'error': f"Sub-workflow {workflow.id} has validation errors: {errors[0]['message']}"
+                }
+
+            call_stack = _call_stack.get()
+            if workflow.id in call_stack:
+                return {
+                    'status': 'error',
+                    'error': f"Recursive sub-workflow call detected: workflow {workflow.id}"
+                }
+            if len(call_stack) >= MAX_DEPTH:
+                return {
+                    'status': 'error',
+                    'error': f"Sub-workflow nesting exceeds {MAX_DEPTH} levels"
+                }
+
+            mode = node_config.get('mode') or MODE_CHILD
+            input_mapping = _mapping(node_config.get('inputMapping'))
+            output_mapping = _mapping(node_config.get('outputMapping')) or {f"{node['id']}_output": 'final_output'}
+
+            inputs = {}
+            for child_name, source in input_mapping.items():
+                if isinstance(source, str) and '{{' in source:
+                    inputs[child_name] = await variable_manager.render_template(execution_id, source)
+                else:
+                    inputs[child_name] = await variable_manager.get_variable(execution_id, source)
+
+            memo_key = None
+            outputs = None
+            if node_config.get('memoize'):
+                # 缓存只保存outputMapping用到的子变量，映射不同的节点不能共用
+                memo_key = (
+                    workflow.config_hash,
+                    json.dumps(inputs, sort_keys=True, default=str),
+                    json.dumps(sorted(set(output_mapping.values())))
+                )
+                outputs = memo_cache.get(memo_key)
+
+            child_execution_id = None
+            memoized = outputs is not None
+            if not memoized:
+                token = _call_stack.set(call_stack + (workflow.id,))
+                try:
+                    if mode == MODE_INLINE:
+                        child_variables = await self._run_inline(node, execution_id, workflow, inputs, variable_manager)
+                    else:
+                        child_execution_id, child_variables = await self._run_child(node, execution_id, workflow, inputs, db)
+                finally:
+                    _call_stack.reset(token)
+                outputs = {child_name: child_variables.get(child_name) for child_name in set(output_mapping.values())}
+                if memo_key is not None:
+                    memo_cache.put(memo_key, outputs)
+
+            for parent_name, child_name in output_mapping.items():
+                value = outputs.get(child_name)
+                await variable_manager.set_variable(
+                    execution_id, parent_name, value, variable_manager._infer_type(value), node['id']
+                )
+
+            if memoized:
+                output = f"Sub-workflow {workflow.id} result reused from cache"
+            elif child_execution_id:
+                output = f"Sub-workflow {workflow.id} completed as child execution {child_execution_id}"
+            else:
+                output = f"Sub-workflow {workflow.id} completed inline"
+            return {
+                'status': 'success',
+                'next_node': None,
+                'output': output,
+                'child_execution_id': child_execution_id
+            }
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': f"Sub-workflow node processing error: {str(e)}"
+            }
+
+    async def _run_inline(self, node: Dict[str, Any], execution_id: int, workflow: Workflow,
+                          inputs: Dict[str, Any], variable_manager: VariableManager) -> Dict[str, Any]:
+        """在当前执行中运行子工作流，变量只存在于独立的作用域中"""
+        graph = graph_for_version(self.engine.db, workflow.config_hash)
+        if not graph.start_node:
+            raise Exception(f"No start node found in workflow {workflow.id}")
+        scope = ScopedVariableManager(variable_manager, inputs, inherit=False)
+        await self.engine.execute_subgraph(
+            execution_id, graph.start_node['id'], scope, parent_node_id=node['id'], iteration_index=None,
+            workflow_config=graph
+        )
+        return scope.local_variables
+
+    async def _run_child(self, node: Dict[str, Any], execution_id: int, workflow: Workflow,
+                         inputs: Dict[str, Any], db: Session) -> Tuple[int, Dict[str, Any]]:
+        """创建子执行并运行到结束，返回子执行ID和其变量"""
+        child = Execution(
+            workflow_id=workflow.id,
+            status=ExecutionStatus.PENDING,
+            parent_execution_id=execution_id,
+            parent_node_id=node['id'],
+            workflow_version=workflow.config_hash
+        )
+        db.add(child)
+        db.commit()
+
+        # 在独立的任务中运行，子执行设置的上下文（当前图等）不影响父执行；
+        # 子执行可以单独停止，父执行被取消时一并取消子执行
+        child_engine = self.engine.__class__(db)
+        task = execution_tasks.start(child.id, workflow.id, child_engine.execute_workflow(child.id, inputs))
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            await asyncio.wait({task})
+            raise
+        if not task.cancelled() and task.exception() is not None:
+            raise Exception(f"Child execution {child.id} failed: {str(task.exception())}")
+
+        db.refresh(child)
+        if child.status == ExecutionStatus.PAUSED:
+            raise Exception(f"Child execution {child.id} paused; human control is not supported in sub-workflows")
+        if child.status != ExecutionStatus.COMPLETED:
+            raise Exception(f"Child execution {child.id} ended with status {child.status.value}: {child.error_message}")
+
+        variable_manager = child_engine.variable_manager
+        rows = db.query(Variable).filter(Variable.execution_id == child.id).all()
+        return child.id, {row.name: variable_manager._deserialize_value(row.value, row.type) for row in rows}
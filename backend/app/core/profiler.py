@@ -0,0 +1,330 @@
+import asyncio
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.models.profile import ExecutionProfile
+
+# 细分耗时的类别
+CATEGORIES = ("db", "network", "jinja")
+
+_current_profiler: ContextVar[Optional["ExecutionProfiler"]] = ContextVar("current_profiler", default=None)
+# 当前任务正在剖析的节点和类别计时栈；并发的foreach迭代各自在自己的任务中计时
+_current_frame: ContextVar[Optional["_Frame"]] = ContextVar("profiler_frame", default=None)
+# 当前任务中最外层计时CPU的任务，嵌套的节点不重复计入执行的CPU总时间
+_cpu_timing_task: ContextVar[Optional[asyncio.Task]] = ContextVar("profiler_cpu_timing_task", default=None)
+
+# tracemalloc和cProfile是进程级的，多个执行同时剖析时共用：
+# 第一个剖析开始时启动tracemalloc，最后一个结束时停止；同一时间只有一个执行使用cProfile
+_active_profilers = 0
+_owns_tracemalloc = False
+_cprofile_in_use = False
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+class _Frame:
+    """一个任务中正在剖析的节点（node为空表示节点之外）及其类别计时栈"""
+
+    __slots__ = ("profiler", "node", "task", "stack", "previous", "active")
+
+    def __init__(self, profiler: "ExecutionProfiler", node: Optional[Dict[str, Any]],
+                 previous: Optional["_Frame"] = None):
+        self.profiler = profiler
+        self.node = node
+        self.task = _current_task()
+        self.stack: List[List[Any]] = []  # [类别, 开始时间]
+        self.previous = previous
+        self.active = node is not None
+
+
+class _CpuTimed:
+    """等待协程并累计它自身每一步的CPU时间
+
+    事件循环线程上同时运行着其他协程，thread_time在两次await之间的差值才只属于这个协程。
+    """
+
+    def __init__(self, profiler: "ExecutionProfiler", coro):
+        self.profiler = profiler
+        self.coro = coro
+        self.frame = profiler._frame()
+
+    def __await__(self):
+        task = _current_task()
+        outermost = _cpu_timing_task.get() is not task
+        token = _cpu_timing_task.set(task) if outermost else None
+        iterator = self.coro.__await__()
+        message, error = None, None
+        try:
+            while True:
+                started = time.thread_time()
+                try:
+                    signal = iterator.throw(error) if error is not None else iterator.send(message)
+                except StopIteration as stop:
+                    self._add(time.thread_time() - started, outermost)
+                    return stop.value
+                except BaseException:
+                    self._add(time.thread_time() - started, outermost)
+                    raise
+                self._add(time.thread_time() - started, outermost)
+                try:
+                    message, error = (yield signal), None
+                except BaseException as e:
+                    message, error = None, e
+        finally:
+            if token is not None:
+                _cpu_timing_task.reset(token)
+
+    def _add(self, seconds: float, outermost: bool):
+        if self.frame.node is not None:
+            self.frame.node["cpu_seconds"] += seconds
+        if outermost:
+            self.profiler.cpu_seconds += seconds
+
+
+class ExecutionProfiler:
+    """单次执行的性能剖析器
+
+    按节点记录墙钟时间与CPU时间，按类别(db/network/jinja)独占计时：
+    嵌套进入新类别时暂停外层类别，因此各类别时间互不重叠。
+    计时状态按任务保存，并发执行的foreach迭代互不干扰；CPU时间只统计节点处理器协程自身的执行步骤。
+    内存统计来自进程级的tracemalloc，有其他节点并发运行时只是近似值。
+    """
+
+    def __init__(self, execution_id: int, phase: str, cprofile: bool = False, top_allocations: int = 20):
+        self.execution_id = execution_id
+        self.phase = phase
+        self.top_allocations = top_allocations
+        self.nodes: List[Dict[str, Any]] = []
+        self.totals = {category: 0.0 for category in CATEGORIES}
+        self.cpu_seconds = 0.0
+        self._cprofile_requested = cprofile
+        self._profile: Optional[cProfile.Profile] = None
+        self._active_nodes = 0
+        self._started_wall = 0.0
+        self.cprofile_stats: Optional[bytes] = None
+        self.cprofile_text: Optional[str] = None
+        self.summary: Dict[str, Any] = {}
+
+    def start(self):
+        global _active_profilers, _owns_tracemalloc, _cprofile_in_use
+        if _active_profilers == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracemalloc = True
+        _active_profilers += 1
+        self._started_wall = time.perf_counter()
+        if self._cprofile_requested and not _cprofile_in_use:
+            _cprofile_in_use = True
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def _frame(self) -> _Frame:
+        """当前任务的计时帧；在新任务中第一次使用时创建，节点沿用创建任务时所在的节点"""
+        frame = _current_frame.get()
+        if frame is None or frame.profiler is not self or frame.task is not _current_task():
+            inherited = frame.node if frame is not None and frame.profiler is self and frame.active else None
+            frame = _Frame(self, inherited, previous=frame)
+            _current_frame.set(frame)
+        return frame
+
+    def timed(self, coro):
+        """包装节点处理器的协程，把它自身的CPU时间计入当前节点"""
+        return _CpuTimed(self, coro)
+
+    def start_node(self, node_id: str, node_type: str):
+        if tracemalloc.is_tracing():
+            if self._active_nodes == 0:
+                # 峰值是进程级的，只在没有其他节点运行时重置
+                tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+        else:
+            current = 0
+        self._active_nodes += 1
+        node = {
+            "node_id": node_id,
+            "node_type": node_type,
+            "_wall": time.perf_counter(),
+            "_memory": current,
+            "cpu_seconds": 0.0,
+            **{f"{category}_seconds": 0.0 for category in CATEGORIES},
+        }
+        _current_frame.set(_Frame(self, node, previous=_current_frame.get()))
+
+    def end_node(self, status: str):
+        frame = _current_frame.get()
+        if frame is None or frame.profiler is not self or not frame.active or frame.task is not _current_task():
+            return
+        node = frame.node
+        frame.active = False
+        _current_frame.set(frame.previous)
+        self._active_nodes -= 1
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        node["status"] = status
+        node["wall_seconds"] = time.perf_counter() - node.pop("_wall")
+        memory_before = node.pop("_memory")
+        node["memory_net_bytes"] = current - memory_before
+        node["memory_peak_bytes"] = max(peak - memory_before, 0)
+        categorized = sum(node[f"{category}_seconds"] for category in CATEGORIES)
+        node["other_seconds"] = max(node["wall_seconds"] - categorized, 0.0)
+        self.nodes.append(node)
+
+    def enter(self, category: str):
+        frame = self._frame()
+        now = time.perf_counter()
+        if frame.stack:
+            self._add(frame, frame.stack[-1][0], now - frame.stack[-1][1])
+        frame.stack.append([category, now])
+
+    def exit(self):
+        frame = self._frame()
+        if not frame.stack:
+            return
+        now = time.perf_counter()
+        category, started = frame.stack.pop()
+        self._add(frame, category, now - started)
+        if frame.stack:
+            frame.stack[-1][1] = now
+
+    def _add(self, frame: _Frame, category: str, seconds: float):
+        self.totals[category] += seconds
+        if frame.node is not None:
+            frame.node[f"{category}_seconds"] += seconds
+
+    def finish(self):
+        global _active_profilers, _owns_tracemalloc, _cprofile_in_use
+        if self._profile:
+            self._profile.disable()
+            _cprofile_in_use = False
+
+        top, peak = [], 0
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            top = snapshot.statistics("lineno")[:self.top_allocations]
+            _, peak = tracemalloc.get_traced_memory()
+        _active_profilers -= 1
+        if _active_profilers == 0 and _owns_tracemalloc:
+            tracemalloc.stop()
+            _owns_tracemalloc = False
+
+        if self._profile:
+            self._profile.create_stats()
+            self.cprofile_stats = marshal.dumps(self._profile.stats)
+            output = io.StringIO()
+            pstats.Stats(self._profile, stream=output).sort_stats("cumulative").print_stats(40)
+            self.cprofile_text = output.getvalue()
+        elif self._cprofile_requested:
+            self.cprofile_text = "cProfile skipped: another execution was being profiled with cProfile"
+
+        self.summary = {
+            "execution_id": self.execution_id,
+            "phase": self.phase,
+            "wall_seconds": time.perf_counter() - self._started_wall,
+            "cpu_seconds": self.cpu_seconds,
+            "categories": {f"{category}_seconds": seconds for category, seconds in self.totals.items()},
+            "memory_peak_bytes": peak,
+            "nodes": self.nodes,
+            "top_allocations": [
+                {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+                for stat in top
+            ],
+            "cprofile": self.cprofile_text,
+        }
+
+
+def current_profiler() -> Optional[ExecutionProfiler]:
+    return _current_profiler.get()
+
+
+@contextmanager
+def profile_section(category: str):
+    """在剖析模式下把代码块计入指定类别，未开启剖析时不做任何事"""
+    profiler = _current_profiler.get()
+    if profiler is None:
+        yield
+        return
+    profiler.enter(category)
+    try:
+        yield
+    finally:
+        profiler.exit()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profiler = _current_profiler.get()
+    if profiler is not None:
+        profiler.enter("db")
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profiler = _current_profiler.get()
+    if profiler is not None:
+        profiler.exit()
+
+
+def _handle_error(exception_context):
+    profiler = _current_profiler.get()
+    if profiler is not None:
+        profiler.exit()
+
+
+_db_listeners_installed = False
+
+
+def _install_db_listeners():
+    """首次使用剖析时才注册SQL计时监听，未剖析的执行不受影响"""
+    global _db_listeners_installed
+    if _db_listeners_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _db_listeners_installed = True
+
+
+@contextmanager
+def profiling(db: Session, execution_id: int, phase: str, enabled: bool = False, cprofile: bool = False):
+    """为一次执行（或继续执行）开启剖析，结束后保存结果"""
+    if not enabled:
+        yield None
+        return
+
+    _install_db_listeners()
+    profiler = ExecutionProfiler(execution_id, phase, cprofile=cprofile)
+    token = _current_profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        _current_profiler.reset(token)
+        # 剖析或保存失败不影响执行本身
+        try:
+            profiler.finish()
+            db.add(ExecutionProfile(
+                execution_id=execution_id,
+                phase=phase,
+                created_at=datetime.utcnow(),
+                summary=json.dumps(profiler.summary, ensure_ascii=False),
+                cprofile_stats=profiler.cprofile_stats,
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Failed to save profile for execution {execution_id}: {str(e)}")
@@ -0,0 +1,293 @@
+import asyncio
+import base64
+import enum
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from sqlalchemy import DateTime, Enum, func, select, text
+from sqlalchemy.orm import Session
+from app.database.database import SessionLocal
+from app.models.execution import Execution, ExecutionStatus
+from app.models.variable import Variable
+from app.models.execution_history import ExecutionHistory, ChatMessage
+from app.models.retention import RetentionPolicy, ExecutionArchive
+from app.core.idempotency import RequestKeyStore
+from app.core.node_cache import NodeCache
+
+# 只归档已结束的执行，运行中/暂停的执行永远不会被清理
+FINISHED_STATUSES = [ExecutionStatus.COMPLETED, ExecutionStatus.FAILED, ExecutionStatus.CANCELLED]
+
+# 执行记录的子表，删除和恢复时按此顺序处理
+CHILD_MODELS = {
+    "variables": Variable,
+    "history": ExecutionHistory,
+    "chat_messages": ChatMessage,
+}
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+class RetentionService:
+    """执行记录的保留、归档、压缩与恢复"""
+
+    def __init__(self, db: Session, archive_dir: Optional[str] = None):
+        self.db = db
+        self.archive_dir = Path(archive_dir or os.getenv("ARCHIVE_DIR", "./archives"))
+
+    def get_default_policy(self) -> Dict[str, Optional[int]]:
+        """默认策略：数据库中的默认策略优先，其次为环境变量"""
+        policy = self.db.query(RetentionPolicy).filter(RetentionPolicy.workflow_id.is_(None)).first()
+        if policy:
+            if not policy.enabled:
+                return {"max_age_days": None, "keep_last": None}
+            return {"max_age_days": policy.max_age_days, "keep_last": policy.keep_last}
+        return {
+            "max_age_days": _env_int("RETENTION_MAX_AGE_DAYS"),
+            "keep_last": _env_int("RETENTION_KEEP_LAST"),
+        }
+
+    def find_expired(self, limit: int = 500, now: Optional[datetime] = None) -> List[int]:
+        """查找过期的执行ID
+
+        满足任一条件即过期：早于max_age_days，或不在该工作流最近keep_last条执行之内。
+        """
+        now = now or datetime.utcnow()
+        default = self.get_default_policy()
+        overrides = {
+            p.workflow_id: p for p in self.db.query(RetentionPolicy).filter(RetentionPolicy.workflow_id.isnot(None)).all()
+        }
+        # 最近按需恢复的执行在宽限期内不会被再次归档
+        grace_days = int(os.getenv("RETENTION_RESTORE_GRACE_DAYS", "7"))
+        recently_restored = {
+            execution_id for (execution_id,) in self.db.query(ExecutionArchive.execution_id).filter(
+                ExecutionArchive.restored_at >= now - timedelta(days=grace_days)
+            )
+        }
+
+        # 用窗口函数一次性计算每个工作流内的执行排名
+        ranked = select(
+            Execution.id.label("id"),
+            Execution.workflow_id.label("workflow_id"),
+            Execution.started_at.label("started_at"),
+            func.row_number().over(
+                partition_by=Execution.workflow_id,
+                order_by=(Execution.started_at.desc(), Execution.id.desc())
+            ).label("row_rank"),
+        ).where(Execution.status.in_(FINISHED_STATUSES)).subquery()
+
+        expired = []
+        for row in self.db.execute(select(ranked).order_by(ranked.c.started_at)):
+            if row.id in recently_restored:
+                continue
+            override = overrides.get(row.workflow_id)
+            if override is not None:
+                if not override.enabled:
+                    continue
+                max_age_days, keep_last = override.max_age_days, override.keep_last
+            else:
+                max_age_days, keep_last = default["max_age_days"], default["keep_last"]
+
+            too_old = max_age_days is not None and row.started_at is not None \
+                and row.started_at < now - timedelta(days=max_age_days)
+            beyond_keep = keep_last is not None and row.row_rank > keep_last
+            if too_old or beyond_keep:
+                expired.append(row.id)
+                if len(expired) >= limit:
+                    break
+        return expired
+
+    def archive_executions(self, execution_ids: List[int]) -> Optional[str]:
+        """将执行记录导出到压缩归档文件，再以集合SQL删除"""
+        if not execution_ids:
+            return None
+
+        executions = self.db.query(Execution).filter(Execution.id.in_(execution_ids)).order_by(Execution.id).all()
+        children = {
+            key: self._group_by_execution(model, execution_ids)
+            for key, model in CHILD_MODELS.items()
+        }
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        archive_path = self.archive_dir / f"executions-{timestamp}-{executions[0].id}-{executions[-1].id}.ndjson.gz"
+
+        with gzip.open(archive_path, "wt", encoding="utf-8") as f:
+            for execution in executions:
+                record = {
+                    "execution": _row_to_dict(execution),
+                    **{key: [_row_to_dict(row) for row in rows.get(execution.id, [])] for key, rows in children.items()},
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        ids = [e.id for e in executions]
+        self.db.query(ExecutionArchive).filter(ExecutionArchive.execution_id.in_(ids)).delete(synchronize_session=False)
+        self.db.bulk_insert_mappings(ExecutionArchive, [
+            {
+                "execution_id": e.id,
+                "workflow_id": e.workflow_id,
+                "status": e.status.value if e.status else None,
+                "started_at": e.started_at,
+                "archive_file": str(archive_path),
+                "archived_at": datetime.utcnow(),
+            }
+            for e in executions
+        ])
+        for model in CHILD_MODELS.values():
+            self.db.query(model).filter(model.execution_id.in_(ids)).delete(synchronize_session=False)
+        # 去重键不归档：指向已归档执行的键失效，后续相同请求重新执行
+        RequestKeyStore(self.db).delete_for_executions(ids)
+        self.db.query(Execution).filter(Execution.id.in_(ids)).delete(synchronize_session=False)
+        self.db.commit()
+        self.db.expunge_all()
+        return str(archive_path)
+
+    def reclaim_space(self, max_pages: int = 1000) -> int:
+        """增量回收空闲页（需要SQLite的auto_vacuum=INCREMENTAL）"""
+        if self.db.get_bind().dialect.name != "sqlite":
+            return 0
+        if self.db.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            return 0
+        freelist = self.db.execute(text("PRAGMA freelist_count")).scalar() or 0
+        pages = min(freelist, max_pages)
+        if pages:
+            self.db.execute(text(f"PRAGMA incremental_vacuum({int(pages)})"))
+            self.db.commit()
+        return pages
+
+    def run_once(self, batch_size: int = 200, max_batches: int = 10, dry_run: bool = False) -> Dict[str, Any]:
+        """执行一轮清理：分批归档、删除并回收空间"""
+        archived = []
+        files = []
+        reclaimed_pages = 0
+        for _ in range(max_batches):
+            execution_ids = self.find_expired(limit=batch_size)
+            if not execution_ids:
+                break
+            if dry_run:
+                archived.extend(execution_ids)
+                break
+            files.append(self.archive_executions(execution_ids))
+            archived.extend(execution_ids)
+            reclaimed_pages += self.reclaim_space()
+            if len(execution_ids) < batch_size:
+                break
+        purged_request_keys = 0 if dry_run else RequestKeyStore(self.db).purge_expired()
+        purged_node_cache = 0 if dry_run else NodeCache(self.db).purge_expired()
+        return {
+            "dry_run": dry_run,
+            "archived_count": len(archived),
+            "execution_ids": archived,
+            "archive_files": files,
+            "reclaimed_pages": reclaimed_pages,
+            "purged_request_keys": purged_request_keys,
+            "purged_node_cache": purged_node_cache,
+        }
+
+    def restore_execution(self, execution_id: int) -> Execution:
+        """从归档文件恢复单个执行记录（保留原ID）"""
+        archive = self.db.query(ExecutionArchive).filter(ExecutionArchive.execution_id == execution_id).first()
+        if not archive:
+            raise LookupError(f"Execution {execution_id} is not archived")
+        if archive.restored_at is not None and self.db.query(Execution).filter(Execution.id == execution_id).first():
+            raise ValueError(f"Execution {execution_id} is already restored")
+
+        record = None
+        with gzip.open(archive.archive_file, "rt", encoding="utf-8") as f:
+            for line in f:
+                data = json.loads(line)
+                if data["execution"]["id"] == execution_id:
+                    record = data
+                    break
+        if record is None:
+            raise LookupError(f"Execution {execution_id} not found in {archive.archive_file}")
+
+        execution = _dict_to_row(Execution, record["execution"])
+        self.db.add(execution)
+        self.db.flush()
+        for key, model in CHILD_MODELS.items():
+            for row in record.get(key, []):
+                self.db.add(_dict_to_row(model, row))
+        archive.restored_at = datetime.utcnow()
+        self.db.commit()
+        self.db.refresh(execution)
+        return execution
+
+    def _group_by_execution(self, model, execution_ids: List[int]) -> Dict[int, list]:
+        grouped: Dict[int, list] = {}
+        for row in self.db.query(model).filter(model.execution_id.in_(execution_ids)).order_by(model.id).all():
+            grouped.setdefault(row.execution_id, []).append(row)
+        return grouped
+
+
+def _row_to_dict(row) -> Dict[str, Any]:
+    """将ORM对象转换为可JSON序列化的字典"""
+    result = {}
+    for column in row.__table__.columns:
+        value = getattr(row, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        elif isinstance(value, bytes):
+            # 二进制编码的值（msgpack）
+            value = {"$binary": base64.b64encode(value).decode("ascii")}
+        result[column.key] = value
+    return result
+
+
+def _dict_to_row(model, data: Dict[str, Any]):
+    """将归档字典还原为ORM对象"""
+    values = {}
+    for column in model.__table__.columns:
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column.type, Enum) and column.type.enum_class:
+            value = column.type.enum_class(value)
+        elif isinstance(value, dict) and "$binary" in value:
+            value = base64.b64decode(value["$binary"])
+        values[column.key] = value
+    return model(**values)
+
+
+def enable_incremental_vacuum(db: Session):
+    """将SQLite切换为增量回收模式（仅首次需要一次完整VACUUM）"""
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    if db.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+        return
+    with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+        conn.execute(text("VACUUM"))
+
+
+def _run_retention_pass() -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return RetentionService(db).run_once(
+            batch_size=int(os.getenv("RETENTION_BATCH_SIZE", "200")),
+            max_batches=int(os.getenv("RETENTION_MAX_BATCHES", "10")),
+        )
+    finally:
+        db.close()
+
+
+async def retention_loop(interval_seconds: float):
+    """后台定时清理任务，数据库操作放在线程中以免阻塞事件循环"""
+    while True:
+        try:
+            result = await asyncio.to_thread(_run_retention_pass)
+            if result["archived_count"]:
+                print(f"Retention: archived {result['archived_count']} executions, "
+                      f"reclaimed {result['reclaimed_pages']} pages")
+        except Exception as e:
+            print(f"Retention pass failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
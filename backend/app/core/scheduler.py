@@ -0,0 +1,232 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+from app.core.metrics import SCHEDULER_QUEUE_WAIT_SECONDS, SCHEDULER_EXECUTIONS
+
+LANE_INTERACTIVE = "interactive"  # 用户等待结果的执行，优先调度
+LANE_BULK = "bulk"  # 批量执行，只使用交互执行剩下的容量
+LANES = (LANE_INTERACTIVE, LANE_BULK)
+
+# 同时运行的顶层执行数上限，0表示不限制（子工作流的子执行不占用名额）
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "0"))
+# 为交互执行保留的名额，批量执行最多使用 上限-保留 个名额
+SCHEDULER_INTERACTIVE_RESERVED = int(os.getenv("SCHEDULER_INTERACTIVE_RESERVED", "0"))
+# 租户的默认权重、并发上限（0不限制）和每分钟LLM token配额（0不限制）
+SCHEDULER_DEFAULT_WEIGHT = float(os.getenv("SCHEDULER_DEFAULT_WEIGHT", "1"))
+SCHEDULER_TENANT_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_TENANT_MAX_CONCURRENCY", "0"))
+SCHEDULER_TENANT_TOKENS_PER_MINUTE = int(os.getenv("SCHEDULER_TENANT_TOKENS_PER_MINUTE", "0"))
+# 单个租户的配置，JSON：{"workflow:12": {"weight": 0.5, "max_concurrency": 4, "tokens_per_minute": 200000}}
+SCHEDULER_TENANT_QUOTAS = os.getenv("SCHEDULER_TENANT_QUOTAS", "")
+
+TOKEN_WINDOW_SECONDS = 60.0
+
+# 当前执行所属的租户，LLM用量按它计入token配额；子执行继承父执行的租户
+_current_tenant: ContextVar[Optional[str]] = ContextVar('scheduler_tenant', default=None)
+
+
+def tenant_for(workflow_id: int) -> str:
+    """执行所属的租户；目前按工作流划分，有所有者后改为按所有者划分"""
+    return f"workflow:{workflow_id}"
+
+
+class TenantQuota:
+    def __init__(self, weight: float = SCHEDULER_DEFAULT_WEIGHT,
+                 max_concurrency: int = SCHEDULER_TENANT_MAX_CONCURRENCY,
+                 tokens_per_minute: int = SCHEDULER_TENANT_TOKENS_PER_MINUTE):
+        self.weight = weight if weight > 0 else SCHEDULER_DEFAULT_WEIGHT
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+
+
+def _quotas_from_env() -> Dict[str, TenantQuota]:
+    if not SCHEDULER_TENANT_QUOTAS.strip():
+        return {}
+    return {tenant: TenantQuota(**config) for tenant, config in json.loads(SCHEDULER_TENANT_QUOTAS).items()}
+
+
+class _Waiter:
+    def __init__(self, tenant: str, lane: str):
+        self.tenant = tenant
+        self.lane = lane
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+
+class FairScheduler:
+    """顶层执行的准入调度
+
+    交互通道优先于批量通道，批量通道最多使用 上限-保留 个名额；同一通道内按租户加权公平排队：
+    每个租户有虚拟时间，每次准入增加 1/权重，总是准入虚拟时间最小且未超出并发和token配额的租户。
+    排队中的执行保持pending状态，被停止时直接出队。
+    """
+
+    def __init__(self, max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+                 interactive_reserved: int = SCHEDULER_INTERACTIVE_RESERVED,
+                 quotas: Optional[Dict[str, TenantQuota]] = None):
+        self.max_concurrency = max_concurrency
+        self.interactive_reserved = interactive_reserved
+        self.quotas = quotas if quotas is not None else _quotas_from_env()
+        self._queues: Dict[str, Dict[str, Deque[_Waiter]]] = {lane: {} for lane in LANES}
+        self._virtual_time: Dict[Tuple[str, str], float] = {}
+        # 每个通道最近一次准入的虚拟时间
+        self._clock: Dict[str, float] = {lane: 0.0 for lane in LANES}
+        self._running: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._running_by_tenant: Dict[str, int] = {}
+        self._token_usage: Dict[str, Deque[Tuple[float, int]]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def quota(self, tenant: str) -> TenantQuota:
+        quota = self.quotas.get(tenant)
+        if quota is None:
+            quota = self.quotas[tenant] = TenantQuota()
+        return quota
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, lane: str = LANE_INTERACTIVE):
+        """排队直到获得运行名额，退出时归还名额"""
+        if lane not in LANES:
+            raise ValueError(f"Unknown scheduling lane: {lane}")
+        waiter = _Waiter(tenant, lane)
+        queue = self._queues[lane].get(tenant)
+        if queue is None:
+            # 重新开始排队的租户从通道当前的虚拟时间起算，空闲期间不积累额度
+            queue = self._queues[lane][tenant] = deque()
+            key = (lane, tenant)
+            self._virtual_time[key] = max(self._virtual_time.get(key, 0.0), self._clock[lane])
+        queue.append(waiter)
+        waiter.future.add_done_callback(lambda future: self._on_waiter_done(waiter, future))
+        SCHEDULER_EXECUTIONS.inc(lane=lane, state="queued")
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if not waiter.future.cancelled():
+                # 准入后、开始运行前被取消（排队中取消时已由回调出队）
+                self._release(waiter)
+            raise
+        SCHEDULER_QUEUE_WAIT_SECONDS.observe(time.monotonic() - waiter.enqueued_at, lane=lane)
+        token = _current_tenant.set(tenant)
+        try:
+            yield
+        finally:
+            _current_tenant.reset(token)
+            self._release(waiter)
+
+    def charge_tokens(self, tokens: int, tenant: Optional[str] = None):
+        """把LLM token用量计入租户的配额窗口（默认为当前执行的租户）"""
+        tenant = tenant or _current_tenant.get()
+        if tenant is None or not tokens:
+            return
+        self._token_usage.setdefault(tenant, deque()).append((time.monotonic(), tokens))
+
+    def tokens_used(self, tenant: str, now: Optional[float] = None) -> int:
+        usage = self._token_usage.get(tenant)
+        if not usage:
+            return 0
+        now = time.monotonic() if now is None else now
+        while usage and usage[0][0] <= now - TOKEN_WINDOW_SECONDS:
+            usage.popleft()
+        return sum(tokens for _, tokens in usage)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            lane: {
+                "running": self._running[lane],
+                "queued": sum(len(queue) for queue in self._queues[lane].values()),
+            }
+            for lane in LANES
+        }
+
+    def _remove(self, waiter: _Waiter):
+        queue = self._queues[waiter.lane].get(waiter.tenant)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.lane][waiter.tenant]
+            SCHEDULER_EXECUTIONS.dec(lane=waiter.lane, state="queued")
+
+    def _release(self, waiter: _Waiter):
+        self._running[waiter.lane] -= 1
+        self._running_by_tenant[waiter.tenant] -= 1
+        SCHEDULER_EXECUTIONS.dec(lane=waiter.lane, state="running")
+        self._dispatch()
+
+    def _lane_has_capacity(self, lane: str) -> bool:
+        if self.max_concurrency <= 0:
+            return True
+        total = sum(self._running.values())
+        if total >= self.max_concurrency:
+            return False
+        if lane == LANE_BULK:
+            return self._running[LANE_BULK] < max(self.max_concurrency - self.interactive_reserved, 1)
+        return True
+
+    def _eligible(self, tenant: str, now: float) -> Tuple[bool, Optional[float]]:
+        """租户当前能否准入；因token配额受限时同时返回窗口释放的时间"""
+        quota = self.quota(tenant)
+        if quota.max_concurrency > 0 and self._running_by_tenant.get(tenant, 0) >= quota.max_concurrency:
+            return False, None
+        if quota.tokens_per_minute > 0 and self.tokens_used(tenant, now) >= quota.tokens_per_minute:
+            return False, self._token_usage[tenant][0][0] + TOKEN_WINDOW_SECONDS
+        return True, None
+
+    def _next(self, lane: str, now: float, retry_at: List[float]) -> Optional[_Waiter]:
+        queues = self._queues[lane]
+        for queue in list(queues.values()):
+            # 已取消但回调尚未执行的waiter直接出队
+            while queue and queue[0].future.done():
+                self._remove(queue[0])
+        best = None
+        for tenant in queues:
+            eligible, blocked_until = self._eligible(tenant, now)
+            if blocked_until is not None:
+                retry_at.append(blocked_until)
+            if not eligible:
+                continue
+            vtime = self._virtual_time[(lane, tenant)]
+            if best is None or vtime < best[0]:
+                best = (vtime, tenant)
+        if best is None:
+            return None
+        vtime, tenant = best
+        self._clock[lane] = vtime
+        self._virtual_time[(lane, tenant)] = vtime + 1.0 / self.quota(tenant).weight
+        waiter = queues[tenant].popleft()
+        if not queues[tenant]:
+            del queues[tenant]
+        return waiter
+
+    def _on_waiter_done(self, waiter: _Waiter, future: asyncio.Future):
+        # 排队中被取消时slot()中的except要等任务下次运行才执行，在回调中尽早出队
+        if future.cancelled():
+            self._remove(waiter)
+
+    def _dispatch(self):
+        now = time.monotonic()
+        retry_at: List[float] = []
+        for lane in LANES:
+            while self._lane_has_capacity(lane):
+                waiter = self._next(lane, now, retry_at)
+                if waiter is None:
+                    break
+                self._running[lane] += 1
+                self._running_by_tenant[waiter.tenant] = self._running_by_tenant.get(waiter.tenant, 0) + 1
+                SCHEDULER_EXECUTIONS.dec(lane=lane, state="queued")
+                SCHEDULER_EXECUTIONS.inc(lane=lane, state="running")
+                waiter.future.set_result(None)
+        if retry_at and self._timer is None:
+            # token窗口释放后重新调度
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(max(min(retry_at) - now, 0.01), self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+
+scheduler = FairScheduler()
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Coroutine, Dict, List, Optional, Tuple
+
+
+class ExecutionTaskRegistry:
+    """进程内正在运行的执行任务
+
+    每个执行（以及继续执行、子执行）作为独立的asyncio任务运行并在这里登记，
+    停止执行时直接取消任务，正在等待的LLM/Jira请求随之中断。
+    """
+
+    def __init__(self):
+        self._tasks: Dict[int, Tuple[int, asyncio.Task]] = {}
+
+    def start(self, execution_id: int, workflow_id: int, coro: Coroutine) -> asyncio.Task:
+        """创建任务并登记，任务结束后自动移除"""
+        return self.track(execution_id, workflow_id, asyncio.create_task(coro, name=f"execution-{execution_id}"))
+
+    def track(self, execution_id: int, workflow_id: int, task: asyncio.Task) -> asyncio.Task:
+        self._tasks[execution_id] = (workflow_id, task)
+
+        def _remove(done: asyncio.Task):
+            entry = self._tasks.get(execution_id)
+            if entry is not None and entry[1] is done:
+                del self._tasks[execution_id]
+
+        task.add_done_callback(_remove)
+        return task
+
+    def get(self, execution_id: int) -> Optional[asyncio.Task]:
+        entry = self._tasks.get(execution_id)
+        return entry[1] if entry else None
+
+    def cancel(self, execution_id: int) -> Optional[asyncio.Task]:
+        """取消执行任务，返回被取消的任务（没有运行中的任务时返回None）"""
+        task = self.get(execution_id)
+        if task is None or task.done():
+            return None
+        task.cancel()
+        return task
+
+    def cancel_all(self) -> List[asyncio.Task]:
+        """取消所有运行中的执行任务（服务关闭时使用）"""
+        tasks = [task for _, task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+
+execution_tasks = ExecutionTaskRegistry()
+
+
+async def wait_cancelled(tasks: List[asyncio.Task], timeout: float = 5.0):
+    """等待被取消的任务完成清理（记录部分历史等）"""
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
@@ -0,0 +1,170 @@
+import math
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # 可选依赖，未安装时使用估算
+    tiktoken = None
+
+# 超出预算时的处理策略
+STRATEGY_NONE = "none"
+STRATEGY_TRUNCATE_MIDDLE = "truncate_middle"  # 保留开头和结尾，省略中间
+STRATEGY_DROP_OLDEST = "drop_oldest"  # 保留第一段（通常是指令），从最早的段落开始丢弃
+STRATEGY_SUMMARIZE = "summarize"  # 先用同一模型分块摘要再发送
+STRATEGIES = (STRATEGY_NONE, STRATEGY_TRUNCATE_MIDDLE, STRATEGY_DROP_OLDEST, STRATEGY_SUMMARIZE)
+
+DEFAULT_COMPLETION_TOKENS = 2000
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# 模型上下文窗口（token），按前缀匹配，越具体的前缀越靠前
+MODEL_CONTEXT_WINDOWS = (
+    ("qwen-turbo", 131072),
+    ("qwen-plus", 131072),
+    ("qwen-max", 32768),
+    ("qwen-long", 1000000),
+    ("gpt-4o", 128000),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4", 8192),
+    ("gpt-3.5-turbo-16k", 16385),
+    ("gpt-3.5-turbo", 16385),
+)
+
+# 中日韩字符大约每字一个token，其余文本大约每4个字符一个token
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+_SECTION_PATTERN = re.compile(r"\n\s*\n")
+
+_encodings: Dict[str, object] = {}
+
+
+def context_window(model: str) -> int:
+    for prefix, window in MODEL_CONTEXT_WINDOWS:
+        if model.startswith(prefix):
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def _encoding_for(model: str):
+    """OpenAI模型在安装了tiktoken时使用精确编码，其余模型返回None"""
+    if tiktoken is None or not model.startswith("gpt"):
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """统计文本的token数（精确或估算）"""
+    if not text:
+        return 0
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _take_tokens(text: str, tokens: int, model: str, from_end: bool = False) -> str:
+    """从开头（或结尾）截取不超过指定token数的文本"""
+    if tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        part = text[-middle:] if from_end else text[:middle]
+        if count_tokens(part, model) <= tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[-low:] if (from_end and low) else text[:low]
+
+
+def truncate_middle(text: str, budget: int, model: str = "") -> str:
+    total = count_tokens(text, model)
+    if total <= budget:
+        return text
+    marker = f"\n...[省略约{total - budget}个token]...\n"
+    marker_tokens = count_tokens(marker, model)
+    if marker_tokens >= budget:
+        # 预算放不下省略标记时直接截断，保证结果不超出预算
+        return _take_tokens(text, budget, model)
+    available = budget - marker_tokens
+    head = _take_tokens(text, available // 2, model)
+    tail = _take_tokens(text, available - available // 2, model, from_end=True)
+    return head + marker + tail
+
+
+def drop_oldest(text: str, budget: int, model: str = "") -> str:
+    """按空行分段，保留第一段，从最早的段落开始丢弃；仍超出时截断中间"""
+    sections = _SECTION_PATTERN.split(text)
+    if len(sections) > 2:
+        head, rest = sections[0], sections[1:]
+        dropped = 0
+        while len(rest) > 1 and count_tokens("\n\n".join([head] + rest), model) > budget:
+            rest.pop(0)
+            dropped += 1
+        if dropped:
+            text = "\n\n".join([head, f"[已省略较早的{dropped}段内容]"] + rest)
+    return truncate_middle(text, budget, model)
+
+
+def _chunks(text: str, chunk_tokens: int, model: str) -> List[str]:
+    chunks = []
+    while text:
+        chunk = _take_tokens(text, chunk_tokens, model) or text[:1]
+        chunks.append(chunk)
+        text = text[len(chunk):]
+    return chunks
+
+
+SUMMARY_INSTRUCTION = "请简洁地总结以下内容，保留关键事实、数字和结论：\n\n"
+
+
+class SummaryFailed(Exception):
+    """摘要调用失败（summarizer抛出后改为截断中间）"""
+
+
+async def summarize(text: str, budget: int, model: str, summarizer: Callable[[str, int], Awaitable[str]]) -> str:
+    """分块调用summarizer(提示词, 最大输出token)生成摘要，摘要仍超出预算时截断中间；
+    任一块摘要失败时放弃摘要，对原文截断中间"""
+    chunk_tokens = max(budget - count_tokens(SUMMARY_INSTRUCTION, model), 256)
+    chunks = _chunks(text, chunk_tokens, model)
+    summary_tokens = max(budget // max(len(chunks), 1), 64)
+    try:
+        summaries = [await summarizer(SUMMARY_INSTRUCTION + chunk, summary_tokens) for chunk in chunks]
+    except SummaryFailed:
+        return truncate_middle(text, budget, model)
+    return truncate_middle("\n\n".join(summaries), budget, model)
+
+
+def resolve_budget(node_config: Dict, model: str) -> Tuple[int, int, str]:
+    """从节点配置读取 (提示词预算, 输出token上限, 策略)
+
+    maxTokens默认2000；maxPromptTokens默认为上下文窗口减去输出上限；
+    truncationStrategy默认truncate_middle。
+    """
+    max_tokens = int(node_config.get("maxTokens") or DEFAULT_COMPLETION_TOKENS)
+    prompt_budget = node_config.get("maxPromptTokens")
+    if not prompt_budget:
+        prompt_budget = context_window(model) - max_tokens
+    strategy = node_config.get("truncationStrategy") or STRATEGY_TRUNCATE_MIDDLE
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown truncation strategy: {strategy}")
+    return max(int(prompt_budget), 1), max_tokens, strategy
+
+
+async def fit_prompt(prompt: str, budget: int, strategy: str, model: str,
+                     summarizer: Optional[Callable[[str, int], Awaitable[str]]] = None) -> Tuple[str, bool]:
+    """按策略把提示词压缩到预算内，返回 (提示词, 是否做了处理)"""
+    if strategy == STRATEGY_NONE or count_tokens(prompt, model) <= budget:
+        return prompt, False
+    if strategy == STRATEGY_DROP_OLDEST:
+        return drop_oldest(prompt, budget, model), True
+    if strategy == STRATEGY_SUMMARIZE and summarizer is not None:
+        return await summarize(prompt, budget, model, summarizer), True
+    return truncate_middle(prompt, budget, model), True
@@ -0,0 +1,253 @@
+import json
+import os
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# OTLP中的SpanKind
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP中的StatusCode
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """与OpenTelemetry数据模型兼容的轻量Span"""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "attributes",
+                 "start_time_ns", "end_time_ns", "status_code", "status_message", "is_root")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str] = None,
+                 kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None, is_root: bool = False):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns = None
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+        self.is_root = is_root
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status_code = STATUS_ERROR
+        self.status_message = message
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or self.start_time_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """按OTLP/JSON的ExportTraceServiceRequest格式组装"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "ai_workflow"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]
+    }
+
+
+class SpanExporter:
+    """导出器基类，默认丢弃"""
+
+    def export(self, spans: List[Span]):
+        pass
+
+
+class FileSpanExporter(SpanExporter):
+    """以OTLP/JSON格式按行追加写入本地文件"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = Path(path)
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(_otlp_payload(spans, self.service_name), ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """通过OTLP/HTTP(JSON)发送到Collector，在后台线程中发送避免阻塞事件循环"""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        body = json.dumps(_otlp_payload(spans, self.service_name)).encode("utf-8")
+        threading.Thread(target=self._send, args=(body,), daemon=True).start()
+
+    def _send(self, body: bytes):
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except Exception as e:
+            print(f"Trace export to {self.url} failed: {str(e)}")
+
+
+def _exporter_from_env() -> SpanExporter:
+    service_name = os.getenv("OTEL_SERVICE_NAME", "ai-workflow-backend")
+    kind = os.getenv("TRACING_EXPORTER", "none").lower()
+    if kind == "file":
+        return FileSpanExporter(os.getenv("TRACING_FILE", "./traces/traces.jsonl"), service_name)
+    if kind == "otlp":
+        return OTLPHttpSpanExporter(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"), service_name)
+    return SpanExporter()
+
+
+class Tracer:
+    """按trace收集span，根span结束时整体导出"""
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+        self._pending: Dict[str, List[Span]] = {}
+        self._open_roots: Dict[str, int] = {}  # 每个trace尚未结束的根span数（继续执行会开始同一trace的新根span）
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                   kind: int = SPAN_KIND_INTERNAL, trace_id: Optional[str] = None) -> Span:
+        """创建span但不设为当前span；指定trace_id时开始该trace的新根span"""
+        parent = _current_span.get()
+        if trace_id is not None or parent is None:
+            span = Span(name, trace_id or secrets.token_hex(16), kind=kind, attributes=attributes, is_root=True)
+            with self._lock:
+                self._open_roots[span.trace_id] = self._open_roots.get(span.trace_id, 0) + 1
+            return span
+        return Span(name, parent.trace_id, parent.span_id, kind=kind, attributes=attributes)
+
+    def end_span(self, span: Span):
+        span.end_time_ns = time.time_ns()
+        with self._lock:
+            if span.is_root:
+                spans = self._pending.pop(span.trace_id, [])
+                spans.append(span)
+                open_roots = self._open_roots.pop(span.trace_id, 1) - 1
+                if open_roots > 0:
+                    self._open_roots[span.trace_id] = open_roots
+            elif span.trace_id in self._open_roots:
+                self._pending.setdefault(span.trace_id, []).append(span)
+                return
+            else:
+                # 根span已导出后才结束的span（如未等待的后台任务）单独导出，不再积压在_pending中
+                spans = [span]
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            print(f"Trace export failed: {str(e)}")
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+             kind: int = SPAN_KIND_INTERNAL, trace_id: Optional[str] = None):
+        """创建span并设为当前span（子span自动关联）"""
+        span = self.start_span(name, attributes, kind, trace_id)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {str(e)}")
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+
+tracer = Tracer(_exporter_from_env())
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _before_flush(session, flush_context, instances):
+    if _current_span.get() is not None:
+        session.info["trace_flush_span"] = tracer.start_span("db.flush", {"db.system": "sqlite"})
+
+
+def _after_flush(session, flush_context):
+    span = session.info.pop("trace_flush_span", None)
+    if span is not None:
+        span.set_attribute("db.rows.new", len(session.new))
+        span.set_attribute("db.rows.dirty", len(session.dirty))
+        tracer.end_span(span)
+
+
+def _before_commit(session):
+    if _current_span.get() is not None:
+        session.info["trace_commit_span"] = tracer.start_span("db.commit", {"db.system": "sqlite"})
+
+
+def _after_commit(session):
+    span = session.info.pop("trace_commit_span", None)
+    if span is not None:
+        tracer.end_span(span)
+
+
+def _after_rollback(session):
+    for key in ("trace_flush_span", "trace_commit_span"):
+        span = session.info.pop(key, None)
+        if span is not None:
+            span.set_error("rollback")
+            tracer.end_span(span)
+
+
+_db_instrumented = False
+
+
+def install_db_tracing():
+    """为所有Session注册flush/commit的span"""
+    global _db_instrumented
+    if _db_instrumented:
+        return
+    event.listen(Session, "before_flush", _before_flush)
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "before_commit", _before_commit)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    _db_instrumented = True
@@ -1,16 +1,32 @@
-import json
-from typing import Dict, Any, Optional
+import time
+from functools import lru_cache
+from typing import Dict, Any, Optional, Union
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from jinja2 import Template, Environment, select_autoescape
 from app.models.variable import Variable, VariableType
 from app.models.execution import Execution
+from app.core.metrics import TEMPLATE_RENDER_SECONDS
+from app.core import codec
+from app.core.tracing import tracer
+from app.core.profiler import profile_section
+
+# 所有变量管理器共用的Jinja2环境
+JINJA_ENV = Environment(
+    autoescape=select_autoescape(['html', 'xml'])
+)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(template_str: str) -> Template:
+    """编译模板并缓存，同一模板（节点提示词、条件等）只解析一次；语法错误时抛出TemplateSyntaxError"""
+    return JINJA_ENV.from_string(template_str)
+
 
 class VariableManager:
     def __init__(self, db: Session):
         self.db = db
-        self.jinja_env = Environment(
-            autoescape=select_autoescape(['html', 'xml'])
-        )
+        self.jinja_env = JINJA_ENV
     
     async def set_variable(self, execution_id: int, name: str, value: Any, var_type: VariableType, created_by_node: str):
         """设置单个变量"""
@@ -36,6 +52,11 @@ class VariableManager:
             )
             self.db.add(variable)
         
+        # 递增变量版本，依赖变量的缓存（如聊天系统提示词）随之失效
+        self.db.query(Execution).filter(Execution.id == execution_id).update(
+            {Execution.variables_version: func.coalesce(Execution.variables_version, 0) + 1},
+            synchronize_session=False
+        )
         self.db.commit()
     
     async def set_variables(self, execution_id: int, variables: Dict[str, Any], created_by_node: str):
@@ -69,32 +90,40 @@ class VariableManager:
     
     async def render_template(self, execution_id: int, template_str: str) -> str:
         """使用Jinja2渲染模板"""
-        try:
-            # 获取所有变量作为模板上下文
-            variables = await self.get_all_variables(execution_id)
-            
-            # 创建Jinja2模板
-            template = self.jinja_env.from_string(template_str)
-            
-            # 渲染模板
-            return template.render(**variables)
-        except Exception as e:
-            raise Exception(f"Template rendering error: {str(e)}")
+        started = time.perf_counter()
+        with tracer.span("template.render", {'template.length': len(template_str)}), profile_section('jinja'):
+            try:
+                # 获取所有变量作为模板上下文
+                variables = await self._template_variables(execution_id, template_str)
+                
+                # 获取编译好的Jinja2模板
+                template = compile_template(template_str)
+                
+                # 渲染模板
+                return template.render(**variables)
+            except Exception as e:
+                raise Exception(f"Template rendering error: {str(e)}")
+            finally:
+                TEMPLATE_RENDER_SECONDS.observe(time.perf_counter() - started)
     
-    def _serialize_value(self, value: Any, var_type: VariableType) -> str:
-        """序列化变量值"""
+    async def _template_variables(self, execution_id: int, template_str: str) -> Dict[str, Any]:
+        """模板渲染的上下文变量"""
+        return await self.get_all_variables(execution_id)
+    
+    def _serialize_value(self, value: Any, var_type: VariableType) -> Union[str, bytes]:
+        """序列化变量值（复杂类型按配置的编解码器编码）"""
         if var_type == VariableType.JSON:
-            return json.dumps(value)
+            return codec.dumps(value)
         elif var_type == VariableType.BOOLEAN:
             return str(bool(value)).lower()
         else:
             return str(value)
     
-    def _deserialize_value(self, value: str, var_type: VariableType) -> Any:
+    def _deserialize_value(self, value: Union[str, bytes], var_type: VariableType) -> Any:
         """反序列化变量值"""
         try:
             if var_type == VariableType.JSON:
-                return json.loads(value)
+                return codec.loads(value)
             elif var_type == VariableType.NUMBER:
                 # 尝试转换为整数，如果失败则转换为浮点数
                 try:
@@ -118,4 +147,35 @@ class VariableManager:
         elif isinstance(value, str):
             return VariableType.STRING
         else:
-            return VariableType.JSON 
\ No newline at end of file
+            return VariableType.JSON
+
+
+class ScopedVariableManager(VariableManager):
+    """foreach单次迭代、内联子工作流的变量作用域
+
+    读取时在父作用域之上叠加本作用域的变量，写入只保存在内存中，
+    并发的作用域之间互不覆盖，也不会写入执行的变量表。
+    inherit为False时不读取父作用域（子工作流只能看到映射进来的输入）。
+    """
+    
+    def __init__(self, parent: VariableManager, local_variables: Dict[str, Any], inherit: bool = True):
+        super().__init__(parent.db)
+        self.parent = parent
+        self.inherit = inherit
+        self.jinja_env = parent.jinja_env
+        self.local_variables = dict(local_variables)
+        self.last_written: Optional[str] = None
+    
+    async def set_variable(self, execution_id: int, name: str, value: Any, var_type: VariableType, created_by_node: str):
+        self.local_variables[name] = value
+        self.last_written = name
+    
+    async def get_variable(self, execution_id: int, name: str) -> Optional[Any]:
+        if name in self.local_variables or not self.inherit:
+            return self.local_variables.get(name)
+        return await self.parent.get_variable(execution_id, name)
+    
+    async def get_all_variables(self, execution_id: int) -> Dict[str, Any]:
+        variables = await self.parent.get_all_variables(execution_id) if self.inherit else {}
+        variables.update(self.local_variables)
+        return variables
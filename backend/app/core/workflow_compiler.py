@@ -0,0 +1,261 @@
+import json
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from jinja2 import TemplateSyntaxError
+from sqlalchemy.orm import Session
+from app.models.node import NodeType
+from app.models.workflow import Workflow
+from app.core.variable_manager import compile_template
+from app.core.workflow_graph import CompiledGraph, ERROR_HANDLE, config_hash, graph_cache
+from app.core.workflow_versions import ensure_version
+
+SEVERITY_ERROR = "error"  # 执行前必须修复，存在时拒绝执行
+SEVERITY_WARNING = "warning"  # 不影响执行，仅提示
+
+SUPPORTED_MODEL_TYPES = ("qwen", "openai")
+NODE_TYPES = {t.value for t in NodeType}
+
+
+def _diagnostic(severity: str, code: str, message: str, node_id: Optional[str] = None,
+                edge_id: Optional[str] = None) -> Dict[str, Any]:
+    diagnostic = {"severity": severity, "code": code, "message": message}
+    if node_id is not None:
+        diagnostic["node_id"] = node_id
+    if edge_id is not None:
+        diagnostic["edge_id"] = edge_id
+    return diagnostic
+
+
+def errors_of(diagnostics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [d for d in diagnostics if d["severity"] == SEVERITY_ERROR]
+
+
+def _node_config(node: Dict[str, Any]) -> Any:
+    config = node.get("data", {}).get("config", {})
+    if isinstance(config, str):
+        config = json.loads(config) if config.strip() else {}
+    return config or {}
+
+
+class CompileResult:
+    """编译结果：编译图（配置结构无效时为空）和诊断信息"""
+
+    def __init__(self, graph: Optional[CompiledGraph], diagnostics: List[Dict[str, Any]]):
+        self.graph = graph
+        self.diagnostics = diagnostics
+
+    @property
+    def ok(self) -> bool:
+        return not errors_of(self.diagnostics)
+
+
+class WorkflowCompiler:
+    """保存时编译工作流
+
+    校验图结构（开始节点、连线、可达性、条件分支）和节点配置，
+    解析所有Jinja2模板和条件表达式；编译好的模板进入模板缓存，执行时不再解析。
+    传入db时同时检查子工作流引用。
+    """
+
+    def __init__(self, db: Optional[Session] = None, workflow_id: Optional[int] = None):
+        self.db = db
+        self.workflow_id = workflow_id
+
+    def compile(self, config_text: str) -> CompileResult:
+        try:
+            config = json.loads(config_text)
+        except json.JSONDecodeError as e:
+            return CompileResult(None, [_diagnostic(SEVERITY_ERROR, "invalid_json", f"Invalid JSON config: {e}")])
+        if not isinstance(config, dict) or not isinstance(config.get("nodes", []), list) \
+                or not isinstance(config.get("edges", []), list):
+            return CompileResult(None, [_diagnostic(
+                SEVERITY_ERROR, "invalid_structure", "Config must be an object with 'nodes' and 'edges' lists"
+            )])
+
+        graph = CompiledGraph(config)
+        diagnostics: List[Dict[str, Any]] = []
+        self._check_graph(graph, diagnostics)
+        for node in config.get("nodes", []):
+            try:
+                node_config = _node_config(node)
+            except json.JSONDecodeError as e:
+                diagnostics.append(_diagnostic(SEVERITY_ERROR, "invalid_node_config",
+                                               f"Node config is not valid JSON: {e}", node.get("id")))
+                continue
+            self._check_node(graph, node, node_config, diagnostics)
+        return CompileResult(graph, diagnostics)
+
+    def _check_graph(self, graph: CompiledGraph, diagnostics: List[Dict[str, Any]]):
+        seen = set()
+        for node in graph.get("nodes", []):
+            node_id = node.get("id")
+            if node_id in seen:
+                diagnostics.append(_diagnostic(SEVERITY_ERROR, "duplicate_node_id", f"Duplicate node id '{node_id}'", node_id))
+            seen.add(node_id)
+            if node.get("type") not in NODE_TYPES:
+                diagnostics.append(_diagnostic(SEVERITY_ERROR, "unknown_node_type",
+                                               f"Unknown node type '{node.get('type')}'", node_id))
+
+        start_nodes = [n.get("id") for n in graph.get("nodes", []) if n.get("type") == NodeType.START.value]
+        if not start_nodes:
+            diagnostics.append(_diagnostic(SEVERITY_ERROR, "missing_start", "Workflow has no start node"))
+        elif len(start_nodes) > 1:
+            diagnostics.append(_diagnostic(SEVERITY_WARNING, "multiple_start",
+                                           f"Workflow has {len(start_nodes)} start nodes; only '{start_nodes[0]}' is used"))
+
+        for edge in graph.get("edges", []):
+            for end in ("source", "target"):
+                if edge.get(end) not in graph.nodes_by_id:
+                    diagnostics.append(_diagnostic(SEVERITY_ERROR, "dangling_edge",
+                                                   f"Edge {end} '{edge.get(end)}' does not exist", edge_id=edge.get("id")))
+
+        if graph.start_node is not None:
+            reachable = {graph.start_node.get("id")}
+            queue = deque(reachable)
+            while queue:
+                for _, target in graph.out_edges.get(queue.popleft(), ()):
+                    if target in graph.nodes_by_id and target not in reachable:
+                        reachable.add(target)
+                        queue.append(target)
+            for node_id in graph.nodes_by_id:
+                if node_id not in reachable:
+                    diagnostics.append(_diagnostic(SEVERITY_WARNING, "unreachable_node",
+                                                   "Node is not reachable from the start node", node_id))
+
+    def _check_node(self, graph: CompiledGraph, node: Dict[str, Any], config: Dict[str, Any],
+                    diagnostics: List[Dict[str, Any]]):
+        node_id = node.get("id")
+        node_type = node.get("type")
+        handles = {handle for handle, _ in graph.out_edges.get(node_id, ())}
+
+        def error(code: str, message: str):
+            diagnostics.append(_diagnostic(SEVERITY_ERROR, code, message, node_id))
+
+        def template(field: str, value: Any):
+            if not isinstance(value, str) or not value:
+                return
+            try:
+                compile_template(value)
+            except TemplateSyntaxError as e:
+                error("template_syntax", f"Template syntax error in '{field}' (line {e.lineno}): {e.message}")
+
+        timeout = config.get("timeoutSeconds")
+        if timeout not in (None, ""):
+            try:
+                float(timeout)
+            except (TypeError, ValueError):
+                error("invalid_timeout", f"timeoutSeconds must be a number, got {timeout!r}")
+
+        if node_type == NodeType.START.value:
+            initial = config.get("initialVariables")
+            if isinstance(initial, str) and initial.strip():
+                try:
+                    json.loads(initial)
+                except json.JSONDecodeError as e:
+                    diagnostics.append(_diagnostic(SEVERITY_WARNING, "invalid_initial_variables",
+                                                   f"initialVariables is not valid JSON and will be ignored: {e}", node_id))
+
+        elif node_type == NodeType.AGENT.value:
+            if not config.get("prompt"):
+                error("missing_prompt", "Agent node has no prompt")
+            if config.get("modelType") not in SUPPORTED_MODEL_TYPES:
+                error("unsupported_model", f"Unsupported model type: {config.get('modelType')}")
+            template("prompt", config.get("prompt"))
+
+        elif node_type == NodeType.IF.value:
+            condition = config.get("condition")
+            if condition:
+                template("condition", condition)
+                if "{{" not in condition and "{%" not in condition:
+                    try:
+                        compile(condition, "<condition>", "eval")
+                    except SyntaxError as e:
+                        error("condition_syntax", f"Condition is not a valid expression: {e.msg}")
+                branches = {"true", "false"}
+            elif config.get("conditions"):
+                branches = {c.get("output_branch", "true") for c in config["conditions"]} | {"false"}
+            else:
+                error("missing_condition", "If node has no condition")
+                branches = set()
+            for branch in sorted(branches - handles):
+                if branch == "false":
+                    # 没有false分支时条件不成立即结束执行，与旧版本行为一致
+                    diagnostics.append(_diagnostic(
+                        SEVERITY_WARNING, "missing_branch",
+                        "If node has no 'false' branch; the run ends when the condition is false", node_id
+                    ))
+                else:
+                    error("missing_branch", f"If node has no '{branch}' branch")
+
+        elif node_type == NodeType.END.value:
+            template("output_text", config.get("output_text"))
+
+        elif node_type == NodeType.JIRA.value:
+            if not str(config.get("jiraKeys") or "").strip():
+                error("missing_jira_keys", "Jira node has no issue keys")
+
+        elif node_type == NodeType.FOREACH.value:
+            if not config.get("listVariable"):
+                error("missing_list_variable", "Foreach node has no list variable")
+            if "body" not in handles:
+                error("missing_branch", "Foreach node has no 'body' branch")
+
+        elif node_type == NodeType.SUBWORKFLOW.value:
+            self._check_subworkflow(node_id, config, error, template)
+
+        if ERROR_HANDLE in handles and node_type in (NodeType.START.value, NodeType.END.value):
+            diagnostics.append(_diagnostic(SEVERITY_WARNING, "unused_error_branch",
+                                           f"{node_type} nodes never take the error branch", node_id))
+
+    def _check_subworkflow(self, node_id: str, config: Dict[str, Any], error, template):
+        workflow_id = config.get("workflowId")
+        if not workflow_id:
+            error("missing_workflow", "Sub-workflow node has no workflow")
+        else:
+            try:
+                workflow_id = int(workflow_id)
+            except (TypeError, ValueError):
+                error("missing_workflow", f"Invalid sub-workflow id {workflow_id!r}")
+                workflow_id = None
+            if workflow_id is not None and workflow_id == self.workflow_id:
+                error("recursive_subworkflow", "Sub-workflow node calls its own workflow")
+            elif workflow_id is not None and self.db is not None \
+                    and not self.db.query(Workflow.id).filter(Workflow.id == workflow_id).first():
+                error("missing_workflow", f"Sub-workflow {workflow_id} not found")
+        for field in ("inputMapping", "outputMapping"):
+            mapping = config.get(field)
+            if isinstance(mapping, str) and mapping.strip():
+                try:
+                    mapping = json.loads(mapping)
+                except json.JSONDecodeError as e:
+                    error("invalid_mapping", f"{field} is not valid JSON: {e}")
+                    continue
+            if mapping and not isinstance(mapping, dict):
+                error("invalid_mapping", f"{field} must be an object")
+                continue
+            if field == "inputMapping":
+                for name, source in (mapping or {}).items():
+                    template(f"inputMapping.{name}", source if isinstance(source, str) and "{" in source else None)
+
+
+def compile_workflow(workflow: Workflow, db: Optional[Session] = None) -> CompileResult:
+    """编译工作流并把结果记录到工作流上（不提交）
+
+    同时登记当前配置对应的不可变版本，编译图按版本哈希放入图缓存。
+    """
+    result = WorkflowCompiler(db, workflow.id).compile(workflow.config)
+    workflow.config_hash = ensure_version(db, workflow.config) if db is not None else config_hash(workflow.config)
+    workflow.compiled_at = datetime.utcnow()
+    workflow.compile_diagnostics = json.dumps(result.diagnostics, ensure_ascii=False)
+    if result.graph is not None:
+        graph_cache.put(workflow.config_hash, result.graph)
+    return result
+
+
+def ensure_compiled(workflow: Workflow, db: Session) -> List[Dict[str, Any]]:
+    """返回工作流的诊断信息；配置在保存后被修改过（或旧数据未编译）时重新编译"""
+    if workflow.config_hash != config_hash(workflow.config):
+        compile_workflow(workflow, db)
+        db.commit()
+    return workflow.diagnostics
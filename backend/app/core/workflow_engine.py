@@ -1,6 +1,8 @@
 import json
 import asyncio
-from typing import Dict, Any, List
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from app.models.execution import Execution, ExecutionStatus
 from app.models.workflow import Workflow
@@ -8,18 +10,35 @@ from app.models.node import Node, NodeType
 from app.models.variable import Variable, VariableType
 from app.models.execution_history import ExecutionHistory, ExecutionHistoryStatus
 from app.core.variable_manager import VariableManager
+from app.core import codec
 from app.core.node_processors.start_processor import StartNodeProcessor
 from app.core.node_processors.agent_processor import AgentNodeProcessor
 from app.core.node_processors.if_processor import IfNodeProcessor
 from app.core.node_processors.human_control_processor import HumanControlNodeProcessor
 from app.core.node_processors.jira_processor import JiraProcessor
 from app.core.node_processors.end_processor import EndNodeProcessor
+from app.core.node_processors.foreach_processor import ForeachNodeProcessor
+from app.core.node_processors.subworkflow_processor import SubworkflowNodeProcessor, workflow_call_scope
+from app.core.metrics import NODE_EXECUTION_SECONDS, EXECUTIONS_FINISHED_TOTAL
+from app.core.tracing import tracer
+from app.core.profiler import profiling, current_profiler
+from app.core.workflow_graph import CompiledGraph, ERROR_HANDLE
+from app.core.workflow_versions import graph_for_execution
+from app.core.deadlines import DEFAULT_EXECUTION_TIMEOUT, DeadlineExceeded, deadline_scope, remaining
+from app.core.node_cache import NodeCache, RecordingVariableManager, node_cache_scope
 from datetime import datetime
 
+# 节点出错时（如超时）经错误分支继续，错误信息写入该变量
+ERROR_VARIABLE = 'last_error'
+
+# 当前正在执行的图（主图或内联子工作流），并发的子图任务各自持有
+_current_graph: ContextVar[Optional[Dict[str, Any]]] = ContextVar('current_graph', default=None)
+
 class WorkflowEngine:
     def __init__(self, db: Session):
         self.db = db
         self.variable_manager = VariableManager(db)
+        self.node_cache = NodeCache(db)
         
         # 节点处理器映射
         self.processors = {
@@ -28,250 +47,520 @@ class WorkflowEngine:
             NodeType.IF: IfNodeProcessor(),
             NodeType.HUMAN_CONTROL: HumanControlNodeProcessor(),
             NodeType.JIRA: JiraProcessor(db, self.variable_manager),
+            NodeType.FOREACH: ForeachNodeProcessor(self),
+            NodeType.SUBWORKFLOW: SubworkflowNodeProcessor(self),
             NodeType.END: EndNodeProcessor()
         }
     
-    async def execute_workflow(self, execution_id: int, initial_variables: Dict[str, Any] = None):
-        """执行工作流"""
-        try:
-            execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
-            if not execution:
-                raise Exception(f"Execution {execution_id} not found")
-            
-            # 更新执行状态
-            execution.status = ExecutionStatus.RUNNING
-            self.db.commit()
-            
-            # 获取工作流配置
-            workflow = execution.workflow
-            workflow_config = json.loads(workflow.config)
-            
-            # 初始化变量
-            if initial_variables:
-                await self.variable_manager.set_variables(execution_id, initial_variables, "start")
-            
-            # 找到开始节点
-            start_node = self._find_start_node(workflow_config)
-            if not start_node:
-                raise Exception("No start node found in workflow")
-            
-            # 从开始节点执行
-            await self._execute_from_node(execution_id, start_node, workflow_config)
-            
-        except Exception as e:
-            # 更新执行状态为失败
-            execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
-            if execution:
-                execution.status = ExecutionStatus.FAILED
-                execution.error_message = str(e)
-                execution.completed_at = datetime.utcnow()
+    @property
+    def workflow_config(self) -> Dict[str, Any]:
+        """当前正在执行的图，foreach等需要访问子图的处理器从这里读取"""
+        return _current_graph.get() or {}
+    
+    async def execute_workflow(self, execution_id: int, initial_variables: Dict[str, Any] = None,
+                               profile: bool = False, profile_cprofile: bool = False,
+                               start_node_id: Optional[str] = None):
+        """执行工作流（start_node_id不为空时从该节点开始，用于从快照重新运行）"""
+        with tracer.span("workflow.execute", {'execution.id': execution_id}) as span, \
+                profiling(self.db, execution_id, 'execute', profile, profile_cprofile):
+            try:
+                execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
+                if not execution:
+                    raise Exception(f"Execution {execution_id} not found")
+                
+                # 更新执行状态
+                execution.status = ExecutionStatus.RUNNING
+                execution.trace_id = span.trace_id
+                span.set_attribute('workflow.id', execution.workflow_id)
                 self.db.commit()
-            raise e
+                
+                # 获取执行固定使用的工作流版本
+                workflow = execution.workflow
+                workflow_config = graph_for_execution(self.db, execution, workflow)
+                
+                # 初始化变量
+                if initial_variables:
+                    await self.variable_manager.set_variables(execution_id, initial_variables, "start")
+                
+                # 找到开始节点
+                if start_node_id:
+                    start_node = self._find_node_by_id(workflow_config, start_node_id)
+                    if not start_node:
+                        raise Exception(f"Node {start_node_id} not found in workflow")
+                else:
+                    start_node = self._find_start_node(workflow_config)
+                    if not start_node:
+                        raise Exception("No start node found in workflow")
+                
+                # 从开始节点执行（执行时限从此刻开始计算）
+                with deadline_scope(execution.timeout_seconds or DEFAULT_EXECUTION_TIMEOUT), \
+                        node_cache_scope(execution.node_cache), workflow_call_scope(execution.workflow_id):
+                    await self._execute_from_node(execution_id, start_node, workflow_config)
+                self._record_final_status(execution)
+                
+            except asyncio.CancelledError:
+                self._mark_cancelled(execution_id)
+                raise
+            except Exception as e:
+                # 更新执行状态为失败
+                execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
+                if execution:
+                    execution.status = ExecutionStatus.FAILED
+                    execution.error_message = str(e)
+                    execution.completed_at = datetime.utcnow()
+                    self.db.commit()
+                    self._record_final_status(execution)
+                raise e
     
-    async def continue_execution(self, execution_id: int, additional_variables: Dict[str, Any] = None):
+    async def continue_execution(self, execution_id: int, additional_variables: Dict[str, Any] = None,
+                                 profile: bool = False, profile_cprofile: bool = False):
         """继续暂停的工作流执行"""
-        try:
-            print(f"DEBUG: continue_execution called for execution {execution_id}")
-            execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
-            if not execution:
-                raise Exception(f"Execution {execution_id} not found")
-            
-            if execution.status != ExecutionStatus.PAUSED:
-                raise Exception("Execution is not paused")
-            
-            print(f"DEBUG: Current node before continue: {execution.current_node}")
-            
-            # 更新执行状态
-            execution.status = ExecutionStatus.RUNNING
-            self.db.commit()
-            
-            # 添加新变量
-            if additional_variables:
-                await self.variable_manager.set_variables(execution_id, additional_variables, execution.current_node)
-                print(f"DEBUG: Added variables: {additional_variables}")
-            
-            # 获取工作流配置
-            workflow = execution.workflow
-            workflow_config = json.loads(workflow.config)
-            
-            # 对于人工干预节点，直接找到下一个节点继续执行
-            current_node = self._find_node_by_id(workflow_config, execution.current_node)
-            print(f"DEBUG: Current node found: {current_node}")
-            
-            if current_node and current_node.get('type') == 'human_control':
-                print("DEBUG: Processing human_control node")
-                # 找到下一个节点
-                next_node_id = self._find_next_node_id(workflow_config, execution.current_node)
-                print(f"DEBUG: Next node ID: {next_node_id}")
+        # 继续执行沿用原执行的trace
+        trace_id = self.db.query(Execution.trace_id).filter(Execution.id == execution_id).scalar()
+        with tracer.span("workflow.continue", {'execution.id': execution_id}, trace_id=trace_id) as span, \
+                profiling(self.db, execution_id, 'continue', profile, profile_cprofile):
+            try:
+                print(f"DEBUG: continue_execution called for execution {execution_id}")
+                execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
+                if not execution:
+                    raise Exception(f"Execution {execution_id} not found")
+                
+                if execution.status != ExecutionStatus.PAUSED:
+                    raise Exception("Execution is not paused")
+                
+                print(f"DEBUG: Current node before continue: {execution.current_node}")
                 
-                if next_node_id:
-                    next_node = self._find_node_by_id(workflow_config, next_node_id)
-                    print(f"DEBUG: Next node found: {next_node}")
+                # 更新执行状态
+                execution.status = ExecutionStatus.RUNNING
+                execution.trace_id = span.trace_id
+                span.set_attribute('workflow.id', execution.workflow_id)
+                self.db.commit()
+                
+                # 添加新变量
+                if additional_variables:
+                    await self.variable_manager.set_variables(execution_id, additional_variables, execution.current_node)
+                    print(f"DEBUG: Added variables: {additional_variables}")
+                
+                # 获取执行固定使用的工作流版本（暂停期间修改工作流不影响继续执行）
+                workflow = execution.workflow
+                workflow_config = graph_for_execution(self.db, execution, workflow)
+                
+                # 执行时限按每次运行计算，暂停等待人工处理的时间不计入
+                with deadline_scope(execution.timeout_seconds or DEFAULT_EXECUTION_TIMEOUT), \
+                        node_cache_scope(execution.node_cache), workflow_call_scope(execution.workflow_id):
+                    # 对于人工干预节点，直接找到下一个节点继续执行
+                    current_node = self._find_node_by_id(workflow_config, execution.current_node)
+                    print(f"DEBUG: Current node found: {current_node}")
+                
+                    if current_node and current_node.get('type') == 'human_control':
+                        print("DEBUG: Processing human_control node")
+                        # 找到下一个节点
+                        next_node_id = self._find_next_node_id(workflow_config, execution.current_node)
+                        print(f"DEBUG: Next node ID: {next_node_id}")
                     
-                    if next_node:
-                        # 直接从下一个节点开始执行，不更新当前节点ID（因为_execute_from_node会处理）
-                        print("DEBUG: Starting execution from next node")
-                        await self._execute_from_node(execution_id, next_node, workflow_config)
+                        if next_node_id:
+                            next_node = self._find_node_by_id(workflow_config, next_node_id)
+                            print(f"DEBUG: Next node found: {next_node}")
+                        
+                            if next_node:
+                                # 直接从下一个节点开始执行，不更新当前节点ID（因为_execute_from_node会处理）
+                                print("DEBUG: Starting execution from next node")
+                                await self._execute_from_node(execution_id, next_node, workflow_config)
+                            else:
+                                # 没有下一个节点，工作流结束
+                                print("DEBUG: No next node found, completing workflow")
+                                execution.status = ExecutionStatus.COMPLETED
+                                execution.completed_at = datetime.utcnow()
+                                self.db.commit()
+                        else:
+                            # 没有下一个节点，工作流结束
+                            print("DEBUG: No next node ID found, completing workflow")
+                            execution.status = ExecutionStatus.COMPLETED
+                            execution.completed_at = datetime.utcnow()
+                            self.db.commit()
                     else:
-                        # 没有下一个节点，工作流结束
-                        print("DEBUG: No next node found, completing workflow")
-                        execution.status = ExecutionStatus.COMPLETED
-                        execution.completed_at = datetime.utcnow()
-                        self.db.commit()
-                else:
-                    # 没有下一个节点，工作流结束
-                    print("DEBUG: No next node ID found, completing workflow")
-                    execution.status = ExecutionStatus.COMPLETED
+                        # 其他类型的节点从当前节点继续执行
+                        print("DEBUG: Processing non-human_control node")
+                        await self._execute_from_node(execution_id, current_node, workflow_config)
+                
+                self._record_final_status(execution)
+                
+            except asyncio.CancelledError:
+                self._mark_cancelled(execution_id)
+                raise
+            except Exception as e:
+                print(f"DEBUG: Exception in continue_execution: {str(e)}")
+                # 更新执行状态为失败
+                execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
+                if execution:
+                    execution.status = ExecutionStatus.FAILED
+                    execution.error_message = str(e)
                     execution.completed_at = datetime.utcnow()
                     self.db.commit()
-            else:
-                # 其他类型的节点从当前节点继续执行
-                print("DEBUG: Processing non-human_control node")
-                await self._execute_from_node(execution_id, current_node, workflow_config)
-            
-        except Exception as e:
-            print(f"DEBUG: Exception in continue_execution: {str(e)}")
-            # 更新执行状态为失败
-            execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
-            if execution:
-                execution.status = ExecutionStatus.FAILED
-                execution.error_message = str(e)
-                execution.completed_at = datetime.utcnow()
-                self.db.commit()
-            raise e
+                    self._record_final_status(execution)
+                raise e
     
     async def _execute_from_node(self, execution_id: int, node: Dict[str, Any], workflow_config: Dict[str, Any]):
         """从指定节点开始执行"""
         execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
+        profiler = current_profiler()
+        _current_graph.set(workflow_config)
         
         while node and execution.status == ExecutionStatus.RUNNING:
-            # 更新当前执行节点
-            execution.current_node = node['id']
-            self.db.commit()
-            
-            # 创建执行历史记录
-            # 获取当前变量快照
-            variables = await self.variable_manager.get_all_variables(execution_id)
-            variables_json = json.dumps(variables, ensure_ascii=False) if variables else "{}"
-            
-            # 获取节点名称 - 优先使用用户自定义名称
-            node_data = node.get('data', {})
-            node_config = node_data.get('config', {})
-            
-            # 如果config是字符串，尝试解析JSON
-            if isinstance(node_config, str):
+            with tracer.span(f"node.{node['type']}", {'node.id': node['id'], 'node.type': node['type']}) as node_span:
+                # 更新当前执行节点
+                execution.current_node = node['id']
+                self.db.commit()
+                
+                # 创建执行历史记录
+                # 获取当前变量快照
+                variables = await self.variable_manager.get_all_variables(execution_id)
+                variables_json = codec.dumps(variables) if variables else "{}"
+                
+                node_name = self._node_name(node)
+                node_span.set_attribute('node.name', node_name)
+                
+                history_record = ExecutionHistory(
+                    execution_id=execution_id,
+                    node_id=node['id'],
+                    node_type=node['type'],
+                    node_name=node_name,
+                    status=ExecutionHistoryStatus.STARTED,
+                    started_at=datetime.utcnow(),
+                    variables_snapshot=variables_json
+                )
+                self.db.add(history_record)
+                self.db.commit()
+                self.db.refresh(history_record)
+                
+                node_started = time.perf_counter()
+                if profiler:
+                    profiler.start_node(node['id'], node['type'])
                 try:
-                    node_config = json.loads(node_config)
-                except json.JSONDecodeError:
-                    node_config = {}
-            
-            # 优先级：config.label > data.label > node.id
-            node_name = (
-                node_config.get('label') or 
-                node_data.get('label') or 
-                node.get('id', 'Unknown Node')
-            )
-            
-            history_record = ExecutionHistory(
-                execution_id=execution_id,
-                node_id=node['id'],
-                node_type=node['type'],
-                node_name=node_name,
-                status=ExecutionHistoryStatus.STARTED,
-                started_at=datetime.utcnow(),
-                variables_snapshot=variables_json
-            )
-            self.db.add(history_record)
-            self.db.commit()
-            self.db.refresh(history_record)
+                    # 获取节点处理器
+                    node_type = NodeType(node['type'])
+                    processor = self.processors.get(node_type)
+                    
+                    if not processor:
+                        raise Exception(f"No processor found for node type: {node_type}")
+                    
+                    # 执行节点（受节点和执行的截止时间限制）
+                    processing = self._process_node(processor, node, execution_id, self.variable_manager)
+                    result = await (profiler.timed(processing) if profiler else processing)
+                    NODE_EXECUTION_SECONDS.observe(
+                        time.perf_counter() - node_started,
+                        node_type=node['type'],
+                        status=result.get('status', 'success')
+                    )
+                    if profiler:
+                        profiler.end_node(result.get('status', 'success'))
+                    node_span.set_attribute('node.status', result.get('status', 'success'))
+                    if result.get('status') == 'error':
+                        node_span.set_error(result.get('error', 'Unknown error'))
+                    
+                    # 更新执行历史记录
+                    history_record.completed_at = datetime.utcnow()
+                    history_record.duration = (history_record.completed_at - history_record.started_at).total_seconds()
+                    
+                    # 根据结果状态更新历史记录
+                    if result.get('status') == 'paused':
+                        history_record.status = ExecutionHistoryStatus.PAUSED
+                        history_record.output = result.get('message', 'Node paused for human intervention')
+                        # 节点要求暂停执行
+                        execution.status = ExecutionStatus.PAUSED
+                        self.db.commit()
+                        break
+                    elif result.get('status') == 'completed':
+                        history_record.status = ExecutionHistoryStatus.COMPLETED
+                        history_record.output = result.get('output', 'Workflow completed successfully')
+                        # 工作流完成
+                        execution.status = ExecutionStatus.COMPLETED
+                        execution.completed_at = datetime.utcnow()
+                        self.db.commit()
+                        break
+                    elif result.get('status') == 'error':
+                        history_record.status = ExecutionHistoryStatus.FAILED
+                        history_record.error_message = result.get('error', 'Unknown error')
+                        if not await self._take_error_branch(execution_id, workflow_config, node, result, self.variable_manager):
+                            # 节点执行出错
+                            execution.status = ExecutionStatus.FAILED
+                            execution.error_message = result.get('error', 'Unknown error')
+                            execution.completed_at = datetime.utcnow()
+                            self.db.commit()
+                            break
+                    else:
+                        # 正常完成，继续下一个节点
+                        history_record.status = ExecutionHistoryStatus.COMPLETED
+                        history_record.output = result.get('output', f'Node {node["id"]} executed successfully')
+                    
+                    # 保存Agent节点的特殊信息
+                    if node['type'] == 'agent' and result.get('prompt') and result.get('response'):
+                        history_record.agent_prompt = result.get('prompt')
+                        history_record.agent_response = result.get('response')
+                    if result.get('prompt_tokens') is not None:
+                        history_record.prompt_tokens = result.get('prompt_tokens')
+                        history_record.completion_tokens = result.get('completion_tokens')
+                    if result.get('cache_hit'):
+                        history_record.cache_hit = True
+                        history_record.time_saved = result.get('time_saved')
+                    
+                    self.db.commit()
+                    
+                    # 获取下一个节点
+                    next_node_id = result.get('next_node')
+                    if not next_node_id:
+                        # 如果节点处理器没有指定下一个节点，从工作流配置中查找
+                        output_branch = result.get('output_branch')
+                        next_node_id = self._find_next_node_id(workflow_config, node['id'], output_branch)
+                    
+                    if next_node_id:
+                        node = self._find_node_by_id(workflow_config, next_node_id)
+                    else:
+                        # 没有下一个节点，工作流结束
+                        execution.status = ExecutionStatus.COMPLETED
+                        execution.completed_at = datetime.utcnow()
+                        self.db.commit()
+                        break
+                        
+                except asyncio.CancelledError:
+                    self._record_cancelled_node(history_record, node, node_started, profiler)
+                    raise
+                except Exception as e:
+                    NODE_EXECUTION_SECONDS.observe(
+                        time.perf_counter() - node_started,
+                        node_type=node['type'],
+                        status='exception'
+                    )
+                    if profiler:
+                        profiler.end_node('exception')
+                    # 更新执行历史记录为失败
+                    history_record.completed_at = datetime.utcnow()
+                    history_record.duration = (history_record.completed_at - history_record.started_at).total_seconds()
+                    history_record.status = ExecutionHistoryStatus.FAILED
+                    history_record.error_message = str(e)
+                    self.db.commit()
+                    raise e
+                
+                # 刷新执行状态
+                self.db.refresh(execution)
+    
+    async def execute_subgraph(self, execution_id: int, start_node_id: str, variable_manager: VariableManager,
+                               parent_node_id: str, iteration_index: Optional[int],
+                               workflow_config: Optional[Dict[str, Any]] = None):
+        """在给定的变量作用域中执行子图（foreach循环体、内联子工作流）
+
+        从start_node_id开始沿边执行，直到没有下一个节点或遇到结束节点。
+        workflow_config为空时在当前图中执行；子图内节点的执行历史记录所属的父节点和迭代序号；
+        节点出错时抛出异常。
+        """
+        if workflow_config is None:
+            workflow_config = self.workflow_config
+        token = _current_graph.set(workflow_config)
+        try:
+            await self._run_subgraph(execution_id, start_node_id, variable_manager, parent_node_id,
+                                     iteration_index, workflow_config)
+        finally:
+            _current_graph.reset(token)
+    
+    async def _run_subgraph(self, execution_id: int, start_node_id: str, variable_manager: VariableManager,
+                            parent_node_id: str, iteration_index: Optional[int], workflow_config: Dict[str, Any]):
+        profiler = current_profiler()
+        node = self._find_node_by_id(workflow_config, start_node_id)
+        
+        while node:
+            if node['type'] == NodeType.HUMAN_CONTROL.value:
+                raise Exception(f"Human control node '{node['id']}' is not supported inside a foreach body or inline sub-workflow")
             
-            try:
-                # 获取节点处理器
-                node_type = NodeType(node['type'])
-                processor = self.processors.get(node_type)
+            span_attributes = {'node.id': node['id'], 'node.type': node['type'], 'parent.node.id': parent_node_id}
+            if iteration_index is not None:
+                span_attributes['iteration.index'] = iteration_index
+            with tracer.span(f"node.{node['type']}", span_attributes) as node_span:
+                local_variables = getattr(variable_manager, 'local_variables', {})
+                history_record = ExecutionHistory(
+                    execution_id=execution_id,
+                    node_id=node['id'],
+                    node_type=node['type'],
+                    node_name=self._node_name(node),
+                    status=ExecutionHistoryStatus.STARTED,
+                    started_at=datetime.utcnow(),
+                    variables_snapshot=codec.dumps(local_variables, default=str),
+                    parent_node_id=parent_node_id,
+                    iteration_index=iteration_index
+                )
+                self.db.add(history_record)
+                self.db.commit()
                 
-                if not processor:
-                    raise Exception(f"No processor found for node type: {node_type}")
+                node_started = time.perf_counter()
+                if profiler:
+                    profiler.start_node(node['id'], node['type'])
+                try:
+                    processor = self.processors.get(NodeType(node['type']))
+                    if not processor:
+                        raise Exception(f"No processor found for node type: {node['type']}")
+                    processing = self._process_node(processor, node, execution_id, variable_manager)
+                    result = await (profiler.timed(processing) if profiler else processing)
+                except asyncio.CancelledError:
+                    self._record_cancelled_node(history_record, node, node_started, profiler)
+                    raise
+                except Exception as e:
+                    result = {'status': 'error', 'error': str(e)}
                 
-                # 执行节点
-                result = await processor.process(
-                    node, 
-                    execution_id, 
-                    self.variable_manager, 
-                    self.db
-                )
+                status = result.get('status', 'success')
+                NODE_EXECUTION_SECONDS.observe(time.perf_counter() - node_started, node_type=node['type'], status=status)
+                if profiler:
+                    profiler.end_node(status)
+                node_span.set_attribute('node.status', status)
                 
-                # 更新执行历史记录
                 history_record.completed_at = datetime.utcnow()
                 history_record.duration = (history_record.completed_at - history_record.started_at).total_seconds()
-                
-                # 根据结果状态更新历史记录
-                if result.get('status') == 'paused':
-                    history_record.status = ExecutionHistoryStatus.PAUSED
-                    history_record.output = result.get('message', 'Node paused for human intervention')
-                    # 节点要求暂停执行
-                    execution.status = ExecutionStatus.PAUSED
-                    self.db.commit()
-                    break
-                elif result.get('status') == 'completed':
-                    history_record.status = ExecutionHistoryStatus.COMPLETED
-                    history_record.output = result.get('output', 'Workflow completed successfully')
-                    # 工作流完成
-                    execution.status = ExecutionStatus.COMPLETED
-                    execution.completed_at = datetime.utcnow()
-                    self.db.commit()
-                    break
-                elif result.get('status') == 'error':
+                if status == 'error':
+                    node_span.set_error(result.get('error', 'Unknown error'))
                     history_record.status = ExecutionHistoryStatus.FAILED
                     history_record.error_message = result.get('error', 'Unknown error')
-                    # 节点执行出错
-                    execution.status = ExecutionStatus.FAILED
-                    execution.error_message = result.get('error', 'Unknown error')
-                    execution.completed_at = datetime.utcnow()
                     self.db.commit()
-                    break
+                    if not await self._take_error_branch(execution_id, workflow_config, node, result, variable_manager):
+                        raise Exception(f"Node {node['id']} failed: {history_record.error_message}")
                 else:
-                    # 正常完成，继续下一个节点
                     history_record.status = ExecutionHistoryStatus.COMPLETED
                     history_record.output = result.get('output', f'Node {node["id"]} executed successfully')
-                
-                # 保存Agent节点的特殊信息
                 if node['type'] == 'agent' and result.get('prompt') and result.get('response'):
                     history_record.agent_prompt = result.get('prompt')
                     history_record.agent_response = result.get('response')
-                
+                if result.get('prompt_tokens') is not None:
+                    history_record.prompt_tokens = result.get('prompt_tokens')
+                    history_record.completion_tokens = result.get('completion_tokens')
+                if result.get('cache_hit'):
+                    history_record.cache_hit = True
+                    history_record.time_saved = result.get('time_saved')
                 self.db.commit()
                 
-                # 获取下一个节点
-                next_node_id = result.get('next_node')
-                if not next_node_id:
-                    # 如果节点处理器没有指定下一个节点，从工作流配置中查找
-                    output_branch = result.get('output_branch')
-                    next_node_id = self._find_next_node_id(workflow_config, node['id'], output_branch)
-                
-                if next_node_id:
-                    node = self._find_node_by_id(workflow_config, next_node_id)
-                else:
-                    # 没有下一个节点，工作流结束
-                    execution.status = ExecutionStatus.COMPLETED
-                    execution.completed_at = datetime.utcnow()
-                    self.db.commit()
+                # 结束节点结束本次迭代
+                if status == 'completed':
                     break
-                    
-            except Exception as e:
-                # 更新执行历史记录为失败
-                history_record.completed_at = datetime.utcnow()
-                history_record.duration = (history_record.completed_at - history_record.started_at).total_seconds()
-                history_record.status = ExecutionHistoryStatus.FAILED
-                history_record.error_message = str(e)
-                self.db.commit()
-                raise e
-            
-            # 刷新执行状态
+                next_node_id = result.get('next_node') or self._find_next_node_id(
+                    workflow_config, node['id'], result.get('output_branch')
+                )
+                node = self._find_node_by_id(workflow_config, next_node_id) if next_node_id else None
+    
+    def _node_name(self, node: Dict[str, Any]) -> str:
+        """获取节点名称 - 优先使用用户自定义名称"""
+        node_data = node.get('data', {})
+        node_config = node_data.get('config', {})
+        
+        # 如果config是字符串，尝试解析JSON
+        if isinstance(node_config, str):
+            try:
+                node_config = json.loads(node_config)
+            except json.JSONDecodeError:
+                node_config = {}
+        
+        # 优先级：config.label > data.label > node.id
+        return (
+            node_config.get('label') or 
+            node_data.get('label') or 
+            node.get('id', 'Unknown Node')
+        )
+    
+    async def _process_node(self, processor, node: Dict[str, Any], execution_id: int,
+                            variable_manager: VariableManager) -> Dict[str, Any]:
+        """执行节点，启用节点缓存时先查找缓存，未命中则执行并保存结果"""
+        if not self.node_cache.applies_to(node):
+            return await self._run_processor(processor, node, execution_id, variable_manager)
+        cached = await self.node_cache.lookup(node, execution_id, variable_manager)
+        if cached is not None:
+            return cached
+        recorder = RecordingVariableManager(variable_manager)
+        started = time.perf_counter()
+        result = await self._run_processor(processor, node, execution_id, recorder)
+        self.node_cache.store(node, recorder, result, time.perf_counter() - started)
+        return result
+    
+    async def _run_processor(self, processor, node: Dict[str, Any], execution_id: int,
+                             variable_manager: VariableManager) -> Dict[str, Any]:
+        """执行节点处理器，时限取节点timeoutSeconds和执行剩余时间中较小者
+
+        截止时间经上下文传给处理器，下游LLM/Jira请求的超时不会超过剩余时间，
+        因截止时间失败的请求抛出DeadlineExceeded，按超时处理。
+        """
+        node_timeout = self._node_timeout(node)
+        execution_left = remaining()
+        with deadline_scope(node_timeout):
+            budget = remaining()
+            if budget is None:
+                return await processor.process(node, execution_id, variable_manager, self.db)
+            try:
+                if budget <= 0:
+                    raise asyncio.TimeoutError()
+                return await asyncio.wait_for(
+                    processor.process(node, execution_id, variable_manager, self.db), timeout=budget
+                )
+            except (asyncio.TimeoutError, DeadlineExceeded):
+                # 执行的剩余时间先于节点时限耗尽时，整个执行失败，不走错误分支
+                execution_deadline = execution_left is not None and (node_timeout is None or execution_left <= node_timeout)
+                return {
+                    'status': 'error',
+                    'error': 'Execution deadline exceeded' if execution_deadline
+                             else f"Node timed out after {node_timeout:g}s",
+                    'timed_out': True,
+                    'execution_deadline': execution_deadline
+                }
+    
+    def _node_timeout(self, node: Dict[str, Any]) -> Optional[float]:
+        node_config = node.get('data', {}).get('config', {})
+        if isinstance(node_config, str):
+            try:
+                node_config = json.loads(node_config)
+            except json.JSONDecodeError:
+                return None
+        try:
+            timeout = float(node_config.get('timeoutSeconds') or 0)
+        except (TypeError, ValueError):
+            return None
+        return timeout if timeout > 0 else None
+    
+    async def _take_error_branch(self, execution_id: int, workflow_config: Dict[str, Any], node: Dict[str, Any],
+                                 result: Dict[str, Any], variable_manager: VariableManager) -> bool:
+        """节点出错且连有错误分支时，记录错误信息并改为沿错误分支继续；执行超时不走错误分支"""
+        if result.get('execution_deadline'):
+            return False
+        if not self._find_next_node_id(workflow_config, node['id'], ERROR_HANDLE):
+            return False
+        error = result.get('error', 'Unknown error')
+        await variable_manager.set_variable(execution_id, ERROR_VARIABLE, error, VariableType.STRING, node['id'])
+        result['next_node'] = None
+        result['output_branch'] = ERROR_HANDLE
+        return True
+    
+    def _record_cancelled_node(self, history_record: ExecutionHistory, node: Dict[str, Any], node_started: float, profiler):
+        """节点执行被取消：保留已有的历史记录并标记为已取消"""
+        NODE_EXECUTION_SECONDS.observe(time.perf_counter() - node_started, node_type=node['type'], status='cancelled')
+        if profiler:
+            profiler.end_node('cancelled')
+        history_record.completed_at = datetime.utcnow()
+        history_record.duration = (history_record.completed_at - history_record.started_at).total_seconds()
+        history_record.status = ExecutionHistoryStatus.CANCELLED
+        history_record.error_message = 'Cancelled while running'
+        self.db.commit()
+    
+    def _mark_cancelled(self, execution_id: int):
+        """执行任务被取消（stop接口已设置状态并统计，这里补充结束时间）"""
+        execution = self.db.query(Execution).filter(Execution.id == execution_id).first()
+        if execution:
             self.db.refresh(execution)
+            if execution.status not in (ExecutionStatus.COMPLETED, ExecutionStatus.FAILED):
+                execution.status = ExecutionStatus.CANCELLED
+            execution.completed_at = execution.completed_at or datetime.utcnow()
+            self.db.commit()
+    
+    def _record_final_status(self, execution: Execution):
+        """统计执行终态（取消由stop接口统计）"""
+        if execution.status in (ExecutionStatus.COMPLETED, ExecutionStatus.FAILED):
+            EXECUTIONS_FINISHED_TOTAL.inc(status=execution.status.value)
     
     def _find_start_node(self, workflow_config: Dict[str, Any]) -> Dict[str, Any]:
         """查找开始节点"""
+        if isinstance(workflow_config, CompiledGraph):
+            return workflow_config.start_node
         nodes = workflow_config.get('nodes', [])
         for node in nodes:
             if node.get('type') == 'start':
@@ -280,6 +569,8 @@ class WorkflowEngine:
     
     def _find_node_by_id(self, workflow_config: Dict[str, Any], node_id: str) -> Dict[str, Any]:
         """根据ID查找节点"""
+        if isinstance(workflow_config, CompiledGraph):
+            return workflow_config.node(node_id)
         nodes = workflow_config.get('nodes', [])
         for node in nodes:
             if node.get('id') == node_id:
@@ -288,11 +579,15 @@ class WorkflowEngine:
     
     def _find_next_node_id(self, workflow_config: Dict[str, Any], current_node_id: str, output_branch: str = None) -> str:
         """查找下一个节点ID"""
+        if isinstance(workflow_config, CompiledGraph):
+            return workflow_config.next_node_id(current_node_id, output_branch)
         edges = workflow_config.get('edges', [])
         for edge in edges:
             if edge.get('source') == current_node_id:
-                # 如果指定了输出分支，检查边的标签
+                # 如果指定了输出分支，检查边的标签；未指定时跳过错误分支
                 if output_branch and edge.get('sourceHandle') != output_branch:
                     continue
+                if not output_branch and edge.get('sourceHandle') == ERROR_HANDLE:
+                    continue
                 return edge.get('target')
         return None 
\ No newline at end of file
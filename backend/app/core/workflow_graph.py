@@ -0,0 +1,90 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from app.models.workflow import Workflow
+from app.core import codec
+
+# 缓存的编译图个数
+GRAPH_CACHE_SIZE = 128
+# 错误分支的sourceHandle，只在节点出错时使用，不参与默认路由
+ERROR_HANDLE = "error"
+
+
+class CompiledGraph(dict):
+    """解析后的工作流配置，附带节点和出边索引
+
+    继承dict，原来按workflow_config读取nodes/edges的代码无需修改；
+    被多个执行共享，调用方不能修改其中的节点配置。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.nodes_by_id: Dict[str, Dict[str, Any]] = {}
+        self.start_node: Optional[Dict[str, Any]] = None
+        for node in config.get('nodes', []):
+            self.nodes_by_id.setdefault(node.get('id'), node)
+            if self.start_node is None and node.get('type') == 'start':
+                self.start_node = node
+        # source -> [(sourceHandle, target)]，保持边的原始顺序
+        self.out_edges: Dict[str, List[Tuple[Optional[str], str]]] = {}
+        for edge in config.get('edges', []):
+            self.out_edges.setdefault(edge.get('source'), []).append((edge.get('sourceHandle'), edge.get('target')))
+
+    def node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        return self.nodes_by_id.get(node_id)
+
+    def next_node_id(self, node_id: str, output_branch: str = None) -> Optional[str]:
+        for handle, target in self.out_edges.get(node_id, ()):
+            if output_branch and handle != output_branch:
+                continue
+            if not output_branch and handle == ERROR_HANDLE:
+                continue
+            return target
+        return None
+
+
+class GraphCache:
+    """按版本内容哈希缓存编译图；版本不可变，缓存条目不需要失效"""
+
+    def __init__(self, max_entries: int = GRAPH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CompiledGraph]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, content_hash: str, config: Optional[str] = None, loader=None) -> CompiledGraph:
+        """命中时直接返回；未命中时编译config（为空时调用loader()读取版本配置）"""
+        with self._lock:
+            graph = self._entries.get(content_hash)
+            if graph is not None:
+                self._entries.move_to_end(content_hash)
+                self.hits += 1
+                return graph
+        graph = CompiledGraph(codec.loads(config if config is not None else loader()))
+        with self._lock:
+            self.misses += 1
+        self.put(content_hash, graph)
+        return graph
+
+    def put(self, content_hash: str, graph: CompiledGraph):
+        """放入保存时编译好的图"""
+        with self._lock:
+            self._entries[content_hash] = graph
+            self._entries.move_to_end(content_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+graph_cache = GraphCache()
+
+
+def config_hash(config: str) -> str:
+    """可执行配置的内容哈希，即工作流版本的标识"""
+    return hashlib.sha256((config or "").encode('utf-8')).hexdigest()
+
+
+def compiled_graph(workflow: Workflow) -> CompiledGraph:
+    """获取工作流当前配置的编译图（命中缓存时不再解析JSON）"""
+    return graph_cache.get(config_hash(workflow.config), workflow.config)
@@ -0,0 +1,210 @@
+import json
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+from app.models.node import Node, NodeType
+from app.models.edge import WorkflowEdge
+from app.models.workflow import Workflow
+from app.core.node_processors.agent_processor import DEFAULT_MODEL_NAMES
+from app.core.workflow_graph import config_hash
+
+# 执行需要的节点/连线字段，其余字段都属于编辑器布局
+NODE_EXECUTABLE_KEYS = ("id", "type", "position", "data")
+NODE_EXECUTABLE_DATA_KEYS = ("label", "config")
+EDGE_EXECUTABLE_KEYS = ("id", "source", "target", "sourceHandle", "targetHandle")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _node_values(node: Dict[str, Any], ordinal: int) -> Dict[str, Any]:
+    """编辑器节点拆分为节点表的列"""
+    data = node.get("data") or {}
+    config = data.get("config", {})
+    position = node.get("position") or {}
+    layout = {k: v for k, v in node.items() if k not in NODE_EXECUTABLE_KEYS}
+    extra_data = {k: v for k, v in data.items() if k not in NODE_EXECUTABLE_DATA_KEYS}
+    if extra_data:
+        layout["data"] = extra_data
+
+    model_type = model_name = None
+    if node.get("type") == NodeType.AGENT.value and isinstance(config, dict):
+        model_type = config.get("modelType")
+        model_name = config.get("modelName") or DEFAULT_MODEL_NAMES.get(model_type)
+    return {
+        "type": str(node.get("type")),
+        "config": _dumps(config),
+        "label": data.get("label"),
+        "position_x": float(position.get("x") or 0),
+        "position_y": float(position.get("y") or 0),
+        "ordinal": ordinal,
+        "layout": _dumps(layout) if layout else None,
+        "model_type": model_type,
+        "model_name": model_name,
+    }
+
+
+def _edge_key(edge: Dict[str, Any]) -> str:
+    return edge.get("id") or f"{edge.get('source')}->{edge.get('target')}:{edge.get('sourceHandle') or ''}"
+
+
+def _edge_values(edge: Dict[str, Any], ordinal: int) -> Dict[str, Any]:
+    layout = {k: v for k, v in edge.items() if k not in EDGE_EXECUTABLE_KEYS}
+    return {
+        "source": str(edge.get("source")),
+        "target": str(edge.get("target")),
+        "source_handle": edge.get("sourceHandle"),
+        "target_handle": edge.get("targetHandle"),
+        "ordinal": ordinal,
+        "layout": _dumps(layout) if layout else None,
+    }
+
+
+def executable_config(nodes: List[Node], edges: List[WorkflowEdge]) -> str:
+    """由节点/连线记录生成执行引擎使用的配置（不含布局）"""
+    return json.dumps({
+        "nodes": [node.to_executable() for node in nodes],
+        "edges": [edge.to_executable() for edge in edges],
+    }, ensure_ascii=False, separators=(",", ":"))
+
+
+class WorkflowGraphStore:
+    """工作流图的规范化存储
+
+    编辑器提交的完整配置拆分为节点表和连线表（可执行部分与布局分列保存），
+    只更新有变化的行；Workflow.config保存由这些行生成的可执行配置，
+    只移动节点位置时可执行配置不变，编译结果、图缓存和记忆化键都继续有效。
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save(self, workflow: Workflow, editor_config: str):
+        """保存编辑器配置（workflow需已有ID，不提交）"""
+        document = json.loads(editor_config)
+        if not isinstance(document, dict):
+            raise ValueError("Workflow config must be a JSON object")
+        nodes, edges = document.pop("nodes", None) or [], document.pop("edges", None) or []
+
+        node_rows = self._sync(
+            Node, Node.node_id, workflow.id,
+            [(str(node.get("id")), _node_values(node, i)) for i, node in enumerate(nodes) if isinstance(node, dict)]
+        )
+        edge_rows = self._sync(
+            WorkflowEdge, WorkflowEdge.edge_id, workflow.id,
+            [(_edge_key(edge), _edge_values(edge, i)) for i, edge in enumerate(edges) if isinstance(edge, dict)]
+        )
+        workflow.layout = _dumps(document) if document else None
+        workflow.config = executable_config(node_rows, edge_rows)
+        workflow.graph_hash = config_hash(workflow.config)
+        self.db.flush()
+        self.db.expire(workflow, ["nodes", "edges"])
+
+    def is_stale(self, workflow: Workflow) -> bool:
+        """config是否在存储之外被修改过（节点表/连线表与config不一致）"""
+        return workflow.graph_hash != config_hash(workflow.config)
+
+    def resync(self, workflow: Workflow) -> bool:
+        """按config重新同步节点表和连线表（不提交）
+
+        已有节点/连线的位置和布局保留，可执行部分以config为准；返回是否同步了
+        """
+        try:
+            config = json.loads(workflow.config)
+        except (TypeError, json.JSONDecodeError):
+            return False
+        if not isinstance(config, dict):
+            return False
+        node_rows = {node.node_id: node for node in workflow.nodes}
+        edge_rows = {edge.edge_id: edge for edge in workflow.edges}
+        document = json.loads(workflow.layout) if workflow.layout else {}
+        document["nodes"] = [self._merge_layout(node, node_rows.get(str(node.get("id"))))
+                             for node in config.get("nodes") or [] if isinstance(node, dict)]
+        document["edges"] = [self._merge_layout(edge, edge_rows.get(_edge_key(edge)))
+                             for edge in config.get("edges") or [] if isinstance(edge, dict)]
+        self.save(workflow, _dumps(document))
+        return True
+
+    @staticmethod
+    def _merge_layout(item: Dict[str, Any], row) -> Dict[str, Any]:
+        """config中的节点/连线加上已存储的布局（config中的字段优先）"""
+        if row is None:
+            return item
+        merged = row.to_editor()
+        data = {**(merged.get("data") or {}), **(item.get("data") or {})}
+        merged.update(item)
+        if data:
+            merged["data"] = data
+        return merged
+
+    def refresh(self, workflows: List[Workflow]) -> int:
+        """重新同步其中config被外部修改过的工作流（不提交），返回同步的数量"""
+        return sum(1 for workflow in workflows if self.is_stale(workflow) and self.resync(workflow))
+
+    def _sync(self, model, key_column, workflow_id: int, items: List[Tuple[str, Dict[str, Any]]]) -> list:
+        """按ID对比已有的行：新增、修改有变化的列、删除已移除的行；返回按顺序排列的行"""
+        key_name = key_column.key
+        existing = {getattr(row, key_name): row for row in self.db.query(model).filter(model.workflow_id == workflow_id)}
+        rows = []
+        seen = set()
+        for key, values in items:
+            if key in seen:
+                # 重复的ID只保留第一个，编译诊断会报告
+                continue
+            seen.add(key)
+            row = existing.get(key)
+            if row is None:
+                row = model(workflow_id=workflow_id, **{key_name: key}, **values)
+                self.db.add(row)
+            else:
+                for name, value in values.items():
+                    if getattr(row, name) != value:
+                        setattr(row, name, value)
+            rows.append(row)
+        removed = [row.id for key, row in existing.items() if key not in seen]
+        if removed:
+            self.db.query(model).filter(model.id.in_(removed)).delete(synchronize_session=False)
+        return rows
+
+    def backfill(self) -> int:
+        """把尚未规范化存储的工作流（只有config）拆分到节点表和连线表，
+        并重新同步config在存储之外被修改过的工作流"""
+        pending = self.db.query(Workflow).filter(
+            ~exists().where(Node.workflow_id == Workflow.id),
+            ~exists().where(WorkflowEdge.workflow_id == Workflow.id)
+        ).all()
+        migrated = 0
+        for workflow in pending:
+            try:
+                config = json.loads(workflow.config)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(config, dict) or not (config.get("nodes") or config.get("edges")):
+                continue
+            self.save(workflow, workflow.config)
+            migrated += 1
+
+        pending_ids = {workflow.id for workflow in pending}
+        stale = [
+            workflow_id for workflow_id, config, graph_hash
+            in self.db.query(Workflow.id, Workflow.config, Workflow.graph_hash)
+            if workflow_id not in pending_ids and graph_hash != config_hash(config)
+        ]
+        if stale:
+            migrated += self.refresh(self.db.query(Workflow).filter(Workflow.id.in_(stale)).all())
+        self.db.commit()
+        return migrated
+
+
+def find_workflows_using(db: Session, node_type: Optional[str] = None, model_type: Optional[str] = None,
+                         model_name: Optional[str] = None) -> List[Workflow]:
+    """按节点类型/模型查找工作流（使用节点表上的索引，不解析配置）"""
+    query = db.query(Node.workflow_id)
+    if node_type:
+        query = query.filter(Node.type == node_type)
+    if model_type:
+        query = query.filter(Node.model_type == model_type)
+    if model_name:
+        query = query.filter(Node.model_name == model_name)
+    return db.query(Workflow).filter(Workflow.id.in_(query.distinct())).order_by(Workflow.id).all()
@@ -0,0 +1,57 @@
+from typing import Optional
+from sqlalchemy import exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.execution import Execution
+from app.models.workflow import Workflow
+from app.models.workflow_version import WorkflowVersion
+from app.core.workflow_graph import CompiledGraph, compiled_graph, config_hash, graph_cache
+
+
+def ensure_version(db: Session, config: str) -> str:
+    """登记可执行配置对应的不可变版本（已存在时复用），返回内容哈希（不提交）"""
+    content_hash = config_hash(config)
+    if db.query(WorkflowVersion.id).filter(WorkflowVersion.content_hash == content_hash).first() is None:
+        try:
+            with db.begin_nested():
+                db.add(WorkflowVersion(content_hash=content_hash, config=config))
+        except IntegrityError:
+            # 并发保存了相同内容的版本
+            pass
+    return content_hash
+
+
+def version_config(db: Session, content_hash: str) -> str:
+    config = db.query(WorkflowVersion.config).filter(WorkflowVersion.content_hash == content_hash).scalar()
+    if config is None:
+        raise Exception(f"Workflow version {content_hash} not found")
+    return config
+
+
+def graph_for_version(db: Session, content_hash: str) -> CompiledGraph:
+    """按内容哈希获取版本的编译图，未缓存时从版本表读取"""
+    return graph_cache.get(content_hash, loader=lambda: version_config(db, content_hash))
+
+
+def backfill_versions(db: Session) -> int:
+    """为引入版本表之前已编译的工作流登记当前版本"""
+    pending = db.query(Workflow).filter(
+        Workflow.config_hash.isnot(None),
+        ~exists().where(WorkflowVersion.content_hash == Workflow.config_hash)
+    ).all()
+    registered = 0
+    for workflow in pending:
+        # 配置在编译后被修改过的由ensure_compiled重新编译并登记
+        if workflow.config_hash == config_hash(workflow.config):
+            ensure_version(db, workflow.config)
+            registered += 1
+    db.commit()
+    return registered
+
+
+def graph_for_execution(db: Session, execution: Execution, workflow: Optional[Workflow] = None) -> CompiledGraph:
+    """执行固定使用创建时的版本，运行过程中修改工作流不会影响该执行；
+    没有记录版本的旧执行使用工作流的当前配置"""
+    if execution.workflow_version:
+        return graph_for_version(db, execution.workflow_version)
+    return compiled_graph(workflow or execution.workflow)
@@ -3,8 +3,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
-# SQLite数据库文件路径
-SQLALCHEMY_DATABASE_URL = "sqlite:///./workflow_platform.db"
+# SQLite数据库文件路径（可通过DATABASE_URL环境变量覆盖）
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./workflow_platform.db")
 
 # 创建数据库引擎
 engine = create_engine(
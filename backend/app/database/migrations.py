@@ -0,0 +1,51 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateIndex
+from app.database.database import Base
+
+
+def _column_default_sql(column) -> str:
+    """仅支持标量默认值（用于ALTER TABLE ADD COLUMN）"""
+    default = column.default
+    if default is None or not default.is_scalar:
+        return ""
+    value = default.arg
+    if isinstance(value, bool):
+        return f" DEFAULT {1 if value else 0}"
+    if isinstance(value, (int, float)):
+        return f" DEFAULT {value}"
+    if hasattr(value, "value"):  # 枚举
+        value = value.value
+    return " DEFAULT '" + str(value).replace("'", "''") + "'"
+
+
+def ensure_schema(engine: Engine):
+    """创建缺失的表，并为已有表补充新增的列和索引
+
+    create_all不会修改已存在的表，这里对新增的列执行ALTER TABLE ADD COLUMN，
+    只做增量变更，不删除或修改已有列。
+    """
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{_column_default_sql(column)}"
+                ))
+
+    # 索引每次都检查（CREATE INDEX IF NOT EXISTS），已有列的旧库也能补上新增的索引
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+            except SQLAlchemyError as e:
+                # 例如已有重复数据时无法创建唯一索引，不阻止启动
+                print(f"Warning: failed to create index {index.name}: {e}")
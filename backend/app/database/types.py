@@ -0,0 +1,117 @@
+import os
+import zlib
+from typing import Any, Optional, Union
+from sqlalchemy.types import LargeBinary, TypeDecorator, Text
+
+try:
+    import zstandard
+except ImportError:  # zstd为可选依赖，未安装时回退到zlib
+    zstandard = None
+
+# 压缩数据的格式标记，以\x00开头，保证不会与正常文本冲突
+ZLIB_MARKER = b"\x00ZL1"
+ZSTD_MARKER = b"\x00ZS1"
+
+
+class CompressionSettings:
+    """压缩配置（默认从环境变量读取）"""
+
+    def __init__(self, algorithm: str = "zlib", min_bytes: int = 256, level: int = 6):
+        self.algorithm = algorithm
+        self.min_bytes = min_bytes
+        self.level = level
+
+
+def _settings_from_env() -> CompressionSettings:
+    algorithm = os.getenv("HISTORY_COMPRESSION", "zlib").lower()
+    if algorithm == "zstd" and zstandard is None:
+        algorithm = "zlib"
+    return CompressionSettings(
+        algorithm=algorithm,
+        min_bytes=int(os.getenv("HISTORY_COMPRESSION_MIN_BYTES", "256")),
+        level=int(os.getenv("HISTORY_COMPRESSION_LEVEL", "6")),
+    )
+
+
+_settings = _settings_from_env()
+
+
+def configure_compression(algorithm: Optional[str] = None, min_bytes: Optional[int] = None, level: Optional[int] = None):
+    """运行时修改压缩配置（用于迁移工具和基准测试）"""
+    if algorithm is not None:
+        algorithm = algorithm.lower()
+        if algorithm == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        if algorithm not in ("zlib", "zstd", "none"):
+            raise ValueError(f"Unsupported compression algorithm: {algorithm}")
+        _settings.algorithm = algorithm
+    if min_bytes is not None:
+        _settings.min_bytes = min_bytes
+    if level is not None:
+        _settings.level = level
+
+
+def get_compression_settings() -> CompressionSettings:
+    return _settings
+
+
+def compress_text(value: Union[str, bytes]) -> Any:
+    """压缩文本（或带格式标记的二进制编码值）；过短或关闭压缩时原样返回"""
+    raw = value if isinstance(value, bytes) else value.encode("utf-8")
+    if _settings.algorithm == "none" or len(raw) < _settings.min_bytes:
+        return value
+    if _settings.algorithm == "zstd":
+        payload = ZSTD_MARKER + zstandard.ZstdCompressor(level=_settings.level).compress(raw)
+    else:
+        payload = ZLIB_MARKER + zlib.compress(raw, _settings.level)
+    # 压缩后反而更大时保留明文
+    if len(payload) >= len(raw):
+        return value
+    return payload
+
+
+def _text_or_binary(data: bytes) -> Union[str, bytes]:
+    # 以\x00开头的是带格式标记的二进制编码值（如msgpack），原样返回由编解码器识别
+    return data if data.startswith(b"\x00") else data.decode("utf-8")
+
+
+def decompress_text(value: Any) -> Optional[Union[str, bytes]]:
+    """解压数据；兼容历史上未压缩的明文数据"""
+    if value is None or isinstance(value, str):
+        return value
+    data = bytes(value)
+    if data.startswith(ZLIB_MARKER):
+        return _text_or_binary(zlib.decompress(data[len(ZLIB_MARKER):]))
+    if data.startswith(ZSTD_MARKER):
+        if zstandard is None:
+            raise RuntimeError("zstd compressed data found but 'zstandard' is not installed")
+        return _text_or_binary(zstandard.ZstdDecompressor().decompress(data[len(ZSTD_MARKER):]))
+    return _text_or_binary(data)
+
+
+class CompressedText(TypeDecorator):
+    """透明压缩的文本列
+
+    写入时按配置压缩为带格式标记的二进制数据，读取时自动解压。
+    SQLite按值存储类型，列类型为TEXT，压缩数据(BLOB)与旧的明文数据(TEXT)可以共存；
+    其他数据库的列类型为二进制，未压缩的文本按UTF-8编码后写入。
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(Text())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = compress_text(value)
+        if dialect.name != "sqlite" and isinstance(value, str):
+            return value.encode("utf-8")
+        return value
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
@@ -1,8 +1,13 @@
 # Data models for the workflow platform 
 from .workflow import Workflow
+from .workflow_version import WorkflowVersion
 from .agent import Agent
 from .node import Node
+from .edge import WorkflowEdge
 from .execution import Execution
 from .variable import Variable
 from .execution_history import ExecutionHistory
-from .meta import Meta 
\ No newline at end of file
+from .meta import Meta, MetaVersion
+from .profile import ExecutionProfile
+from .idempotency import ExecutionRequestKey
+from .node_cache import NodeResultCache
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from typing import Dict, Any
+import json
+from app.database.database import Base
+
+class WorkflowEdge(Base):
+    """工作流连线（规范化存储）"""
+    __tablename__ = "workflow_edges"
+    __table_args__ = (Index("ix_workflow_edges_workflow_source", "workflow_id", "source"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
+    edge_id = Column(String(255), nullable=False)  # React Flow连线ID
+    source = Column(String(255), nullable=False)
+    target = Column(String(255), nullable=False)
+    source_handle = Column(String(100), nullable=True)  # 输出分支（true/false/body/error等）
+    target_handle = Column(String(100), nullable=True)
+    ordinal = Column(Integer, nullable=False, default=0)  # 连线顺序（同一节点的多条出边按顺序匹配）
+    layout = Column(Text, nullable=True)  # 其余编辑器数据（样式、动画等，JSON）
+    
+    # 关联关系
+    workflow = relationship("Workflow", back_populates="edges")
+    
+    def to_executable(self) -> Dict[str, Any]:
+        """执行引擎使用的连线"""
+        edge = {"id": self.edge_id, "source": self.source, "target": self.target}
+        if self.source_handle is not None:
+            edge["sourceHandle"] = self.source_handle
+        return edge
+    
+    def to_editor(self) -> Dict[str, Any]:
+        edge = self.to_executable()
+        if self.target_handle is not None:
+            edge["targetHandle"] = self.target_handle
+        if self.layout:
+            edge.update(json.loads(self.layout))
+        return edge
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -35,8 +35,19 @@ class Execution(Base):
     current_node = Column(String(255), nullable=True)  # 当前执行的节点ID
     variables = Column(Text, nullable=True)  # JSON字符串，存储执行过程中的变量
     error_message = Column(Text, nullable=True)
+    trace_id = Column(String(32), nullable=True, index=True)  # 分布式追踪的trace ID
+    variables_version = Column(Integer, default=0)  # 变量每次写入时递增，用于缓存失效
+    parent_execution_id = Column(Integer, ForeignKey("executions.id"), nullable=True, index=True)  # 子工作流执行所属的父执行
+    parent_node_id = Column(String(255), nullable=True)  # 父执行中发起调用的子工作流节点ID
+    timeout_seconds = Column(Float, nullable=True)  # 执行时限（秒），每次运行（启动/继续）分别计时
+    node_cache = Column(Boolean, default=False)  # 启用节点结果缓存，未变化的节点直接复用上次的输出
+    rerun_of_execution_id = Column(Integer, ForeignKey("executions.id"), nullable=True, index=True)  # 从该执行的快照重新运行
+    rerun_from_node_id = Column(String(255), nullable=True)  # 重新运行的起始节点ID
+    workflow_version = Column(String(64), nullable=True, index=True)  # 执行固定使用的工作流版本（内容哈希）
+    lane = Column(String(20), nullable=True, default="interactive")  # 调度通道：interactive / bulk
     
     # 关联关系
     workflow = relationship("Workflow", back_populates="executions")
     variables_records = relationship("Variable", back_populates="execution", cascade="all, delete-orphan")
-    history_records = relationship("ExecutionHistory", back_populates="execution", cascade="all, delete-orphan") 
\ No newline at end of file
+    history_records = relationship("ExecutionHistory", back_populates="execution", cascade="all, delete-orphan")
+    profiles = relationship("ExecutionProfile", back_populates="execution", cascade="all, delete-orphan") 
\ No newline at end of file
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from app.database.database import Base
+from app.database.types import CompressedText
 
 class ExecutionHistoryStatus(str, enum.Enum):
     """执行历史状态枚举 - 继承str确保与SQLAlchemy兼容"""
@@ -10,6 +11,7 @@ class ExecutionHistoryStatus(str, enum.Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     PAUSED = "paused"
+    CANCELLED = "cancelled"
     
     @classmethod
     def _missing_(cls, value):
@@ -34,12 +36,18 @@ class ExecutionHistory(Base):
     started_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     duration = Column(Float, nullable=True)  # 执行持续时间（秒）
-    output = Column(Text, nullable=True)  # 节点输出内容
+    output = Column(CompressedText, nullable=True)  # 节点输出内容
     error_message = Column(Text, nullable=True)  # 错误信息
-    variables_snapshot = Column(Text, nullable=True)  # 当时的变量快照（JSON格式）
-    agent_prompt = Column(Text, nullable=True)  # AI Agent的提示词
-    agent_response = Column(Text, nullable=True)  # AI Agent的响应
-    chat_history = Column(Text, nullable=True)  # Human Control的聊天历史（JSON格式）
+    variables_snapshot = Column(CompressedText, nullable=True)  # 当时的变量快照（JSON格式）
+    agent_prompt = Column(CompressedText, nullable=True)  # AI Agent的提示词
+    agent_response = Column(CompressedText, nullable=True)  # AI Agent的响应
+    chat_history = Column(CompressedText, nullable=True)  # Human Control的聊天历史（JSON格式）
+    prompt_tokens = Column(Integer, nullable=True)  # AI Agent提示词token数（含摘要调用）
+    completion_tokens = Column(Integer, nullable=True)  # AI Agent输出token数
+    parent_node_id = Column(String(255), nullable=True)  # foreach循环体内节点所属的foreach节点ID
+    iteration_index = Column(Integer, nullable=True)  # foreach迭代序号（从0开始）
+    cache_hit = Column(Boolean, default=False)  # 节点结果从节点缓存恢复
+    time_saved = Column(Float, nullable=True)  # 缓存命中时节省的时间（原始执行耗时，秒）
     
     # 关联关系
     execution = relationship("Execution", back_populates="history_records")
@@ -52,7 +60,7 @@ class ChatMessage(Base):
     execution_id = Column(Integer, ForeignKey("executions.id"), nullable=False)
     node_id = Column(String(255), nullable=True)  # 关联的节点ID（可选）
     role = Column(String(20), nullable=False)  # 'user' 或 'assistant'
-    content = Column(Text, nullable=False)  # 消息内容
+    content = Column(CompressedText, nullable=False)  # 消息内容
     timestamp = Column(DateTime, default=datetime.utcnow)
     
     # 关联关系
@@ -0,0 +1,23 @@
+import enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, UniqueConstraint
+from datetime import datetime
+from app.database.database import Base
+
+class RequestKeyKind(str, enum.Enum):
+    """执行请求去重键的类型"""
+    IDEMPOTENCY = "idempotency"  # 客户端提供的Idempotency-Key
+    MEMO = "memo"  # 工作流版本 + 规范化输入变量的哈希
+
+class ExecutionRequestKey(Base):
+    """执行请求的去重键：相同的键在有效期内返回已有的执行，而不是新建执行"""
+    __tablename__ = "execution_request_keys"
+    __table_args__ = (UniqueConstraint("workflow_id", "kind", "key", name="uq_execution_request_key"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
+    kind = Column(Enum(RequestKeyKind, values_callable=lambda x: [e.value for e in x]), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # 请求内容的哈希，同一Idempotency-Key用于不同请求时拒绝
+    execution_id = Column(Integer, ForeignKey("executions.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
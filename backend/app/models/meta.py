@@ -9,4 +9,12 @@ class Meta(Base):
     key = Column(String(255), nullable=False, unique=True, index=True)  # 如 "openai_token", "jira_token", "confluence_token"
     value = Column(Text, nullable=False)  # API Key值
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
+
+class MetaVersion(Base):
+    """Meta配置的版本计数（单行），每次修改Meta时加一，其他进程据此发现配置变化"""
+    __tablename__ = "meta_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Index
+from typing import Dict, Any
 from sqlalchemy.orm import relationship
 import enum
+import json
 from app.database.database import Base
 
 class NodeType(str, enum.Enum):
@@ -10,6 +12,8 @@ class NodeType(str, enum.Enum):
     IF = "if"
     HUMAN_CONTROL = "human_control"
     JIRA = "jira"
+    FOREACH = "foreach"
+    SUBWORKFLOW = "subworkflow"
     END = "end"
     
     @classmethod
@@ -23,16 +27,38 @@ class NodeType(str, enum.Enum):
         return cls.START  # 默认返回START
 
 class Node(Base):
+    """工作流节点（规范化存储）：可执行的配置与编辑器布局分开保存"""
     __tablename__ = "nodes"
+    __table_args__ = (Index("ix_nodes_workflow_node", "workflow_id", "node_id", unique=True),)
     
     id = Column(Integer, primary_key=True, index=True)
     workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
     node_id = Column(String(255), nullable=False)  # React Flow节点ID
-    type = Column(Enum(NodeType, values_callable=lambda x: [e.value for e in x]), 
-                 nullable=False)
+    type = Column(String(50), nullable=False, index=True)  # 节点类型（保留原始值，未知类型由编译诊断报告）
     config = Column(Text, nullable=False)  # JSON字符串，存储节点配置
     position_x = Column(Float, nullable=False, default=0.0)
     position_y = Column(Float, nullable=False, default=0.0)
+    label = Column(String(255), nullable=True)  # 节点显示名称（data.label）
+    ordinal = Column(Integer, nullable=False, default=0)  # 节点在配置中的顺序
+    layout = Column(Text, nullable=True)  # 其余编辑器数据（尺寸、选中状态等，JSON）
+    model_type = Column(String(50), nullable=True, index=True)  # Agent节点的模型类型
+    model_name = Column(String(100), nullable=True, index=True)  # Agent节点实际使用的模型
     
     # 关联关系
-    workflow = relationship("Workflow", back_populates="nodes") 
\ No newline at end of file
+    workflow = relationship("Workflow", back_populates="nodes")
+    
+    def to_executable(self) -> Dict[str, Any]:
+        """执行引擎使用的节点（不含布局）"""
+        data = {"config": json.loads(self.config)}
+        if self.label is not None:
+            data = {"label": self.label, **data}
+        return {"id": self.node_id, "type": self.type, "data": data}
+    
+    def to_editor(self) -> Dict[str, Any]:
+        """编辑器使用的完整节点：可执行部分加布局"""
+        layout = json.loads(self.layout) if self.layout else {}
+        node = self.to_executable()
+        node["data"] = {**layout.pop("data", {}), **node["data"]}
+        node["position"] = {"x": self.position_x, "y": self.position_y}
+        node.update(layout)
+        return node
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, UniqueConstraint
+from datetime import datetime
+from app.database.database import Base
+from app.database.types import CompressedText
+
+class NodeResultCache(Base):
+    """节点结果缓存：节点配置不变、读取的变量取值不变时复用上次的输出"""
+    __tablename__ = "node_result_cache"
+    __table_args__ = (UniqueConstraint("node_key", "inputs_hash", name="uq_node_result_cache"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    node_key = Column(String(64), nullable=False, index=True)  # 节点ID、类型和配置的哈希
+    inputs_hash = Column(String(64), nullable=False)  # 节点读取的变量及其取值的哈希
+    read_names = Column(Text, nullable=False)  # 节点读取的变量名（JSON数组）
+    writes = Column(CompressedText, nullable=False)  # 节点写入的变量（JSON数组：[名称, 值, 类型]）
+    result = Column(CompressedText, nullable=False)  # 处理器返回的结果（JSON）
+    duration = Column(Float, nullable=True)  # 原始执行耗时（秒），命中时记为节省的时间
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database.database import Base
+from app.database.types import CompressedText
+
+class ExecutionProfile(Base):
+    """执行的性能剖析结果（每次执行/继续执行各一条）"""
+    __tablename__ = "execution_profiles"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    execution_id = Column(Integer, ForeignKey("executions.id"), nullable=False, index=True)
+    phase = Column(String(20), nullable=False)  # 'execute' 或 'continue'
+    created_at = Column(DateTime, default=datetime.utcnow)
+    summary = Column(CompressedText, nullable=False)  # 剖析摘要（JSON格式）
+    cprofile_stats = Column(LargeBinary, nullable=True)  # cProfile原始统计（marshal格式，可用pstats加载）
+    
+    # 关联关系
+    execution = relationship("Execution", back_populates="profiles")
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from datetime import datetime
+from app.database.database import Base
+
+class RetentionPolicy(Base):
+    """执行记录保留策略，workflow_id为空表示默认策略"""
+    __tablename__ = "retention_policies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=True, unique=True)
+    max_age_days = Column(Integer, nullable=True)  # 超过该天数的执行记录被归档
+    keep_last = Column(Integer, nullable=True)  # 每个工作流保留最近N条执行记录
+    enabled = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ExecutionArchive(Base):
+    """已归档执行记录的索引，用于按需恢复"""
+    __tablename__ = "execution_archives"
+
+    id = Column(Integer, primary_key=True, index=True)
+    execution_id = Column(Integer, nullable=False, unique=True, index=True)  # 原执行ID（执行记录已删除，不设外键）
+    workflow_id = Column(Integer, nullable=False, index=True)
+    status = Column(String(20), nullable=True)  # 归档时的执行状态
+    started_at = Column(DateTime, nullable=True)
+    archive_file = Column(String(512), nullable=False)  # 归档文件路径（gzip压缩的NDJSON）
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    restored_at = Column(DateTime, nullable=True)
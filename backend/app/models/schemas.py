@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, AliasChoices
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -9,6 +9,10 @@ class WorkflowStatusEnum(str, Enum):
     ACTIVE = "active"
     ARCHIVED = "archived"
 
+class ExecutionLaneEnum(str, Enum):
+    INTERACTIVE = "interactive"  # 用户等待结果，优先调度
+    BULK = "bulk"  # 批量执行，使用剩余容量
+
 class NodeTypeEnum(str, Enum):
     START = "start"
     AGENT = "agent"
@@ -40,6 +44,21 @@ class WorkflowBase(BaseModel):
 class WorkflowCreate(WorkflowBase):
     pass
 
+class WorkflowDiagnostic(BaseModel):
+    """工作流编译诊断"""
+    severity: str  # error：执行前必须修复；warning：仅提示
+    code: str
+    message: str
+    node_id: Optional[str] = None
+    edge_id: Optional[str] = None
+
+class WorkflowValidateRequest(BaseModel):
+    config: str  # JSON字符串
+
+class WorkflowValidateResponse(BaseModel):
+    valid: bool  # 没有error级别的诊断
+    diagnostics: List[WorkflowDiagnostic]
+
 class WorkflowUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -47,10 +66,24 @@ class WorkflowUpdate(BaseModel):
     status: Optional[WorkflowStatusEnum] = None
 
 class WorkflowResponse(WorkflowBase):
+    # 返回编辑器使用的完整配置（含布局），而不是只含可执行部分的config列
+    config: str = Field(validation_alias=AliasChoices("editor_config", "config"))
     id: int
     status: WorkflowStatusEnum
     created_at: datetime
     updated_at: datetime
+    compiled_at: Optional[datetime] = None
+    diagnostics: List[WorkflowDiagnostic] = []
+    # 当前版本的内容哈希，新执行固定使用该版本
+    version: Optional[str] = Field(None, validation_alias=AliasChoices("config_hash", "version"))
+    
+    class Config:
+        from_attributes = True
+
+class WorkflowVersionResponse(BaseModel):
+    content_hash: str
+    config: str
+    created_at: datetime
     
     class Config:
         from_attributes = True
@@ -108,6 +141,15 @@ class ExecutionResponse(BaseModel):
     current_node: Optional[str] = None
     variables: Optional[str] = None
     error_message: Optional[str] = None
+    trace_id: Optional[str] = None
+    parent_execution_id: Optional[int] = None
+    parent_node_id: Optional[str] = None
+    timeout_seconds: Optional[float] = None
+    node_cache: Optional[bool] = None
+    rerun_of_execution_id: Optional[int] = None
+    rerun_from_node_id: Optional[str] = None
+    workflow_version: Optional[str] = None
+    lane: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -151,10 +193,29 @@ class MetaResponse(MetaBase):
 # 工作流执行请求
 class WorkflowExecuteRequest(BaseModel):
     variables: Optional[Dict[str, Any]] = None
+    profile: bool = False  # 开启性能剖析（按节点统计耗时、内存分配）
+    profile_cprofile: bool = False  # 剖析时额外保存cProfile统计
+    timeout_seconds: Optional[float] = None  # 执行时限（秒），不填使用EXECUTION_TIMEOUT_SECONDS
+    memoize: bool = False  # 相同工作流版本和输入的请求复用已有执行（进行中或已完成）
+    memo_ttl_seconds: Optional[int] = None  # 记忆化有效期（秒），不填使用EXECUTION_MEMO_TTL_SECONDS
+    refresh: bool = False  # 忽略记忆化结果重新执行（也可以使用Cache-Control: no-cache）
+    node_cache: bool = False  # 启用节点结果缓存：配置和读取的变量都未变化的节点复用上次的输出
+    lane: ExecutionLaneEnum = ExecutionLaneEnum.INTERACTIVE  # 调度通道，批量任务使用bulk
 
 # 继续执行请求
 class ContinueExecutionRequest(BaseModel):
     variables: Optional[Dict[str, Any]] = None
+    profile: bool = False
+    profile_cprofile: bool = False
+
+# 从指定节点重新运行请求
+class RerunFromNodeRequest(BaseModel):
+    variables: Optional[Dict[str, Any]] = None  # 覆盖快照中的变量
+    profile: bool = False
+    profile_cprofile: bool = False
+    timeout_seconds: Optional[float] = None  # 不填沿用原执行的时限
+    node_cache: Optional[bool] = None  # 不填沿用原执行的设置
+    lane: Optional[ExecutionLaneEnum] = None  # 不填沿用原执行的调度通道
 
 # 工作流导出和导入相关模式
 class WorkflowExportData(BaseModel):
@@ -177,4 +238,31 @@ class WorkflowImportResponse(BaseModel):
     success: bool
     message: str
     workflow_id: Optional[int] = None
-    workflow: Optional[WorkflowResponse] = None 
\ No newline at end of file
+    workflow: Optional[WorkflowResponse] = None 
+
+# 保留策略相关模式
+class RetentionPolicyUpdate(BaseModel):
+    max_age_days: Optional[int] = None  # 超过该天数的执行记录被归档
+    keep_last: Optional[int] = None  # 每个工作流保留最近N条执行记录
+    enabled: bool = True
+
+class RetentionPolicyResponse(RetentionPolicyUpdate):
+    id: int
+    workflow_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ExecutionArchiveResponse(BaseModel):
+    execution_id: int
+    workflow_id: int
+    status: Optional[str] = None
+    started_at: Optional[datetime] = None
+    archive_file: str
+    archived_at: datetime
+    restored_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
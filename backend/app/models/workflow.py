@@ -2,6 +2,7 @@ from sqlalchemy import Column, Integer, String, Text, DateTime, Enum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+import json
 from app.database.database import Base
 
 class WorkflowStatus(str, enum.Enum):
@@ -31,7 +32,30 @@ class Workflow(Base):
                    default=WorkflowStatus.DRAFT)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    config_hash = Column(String(64), nullable=True)  # 当前版本（workflow_versions.content_hash），与当前配置不一致时需要重新编译
+    compiled_at = Column(DateTime, nullable=True)
+    compile_diagnostics = Column(Text, nullable=True)  # 编译诊断信息（JSON数组）
+    layout = Column(Text, nullable=True)  # 编辑器的其余顶层数据（如视口，JSON）
+    graph_hash = Column(String(64), nullable=True)  # 节点表/连线表对应的config哈希，与config不一致时需要重新同步
     
     # 关联关系
-    nodes = relationship("Node", back_populates="workflow", cascade="all, delete-orphan")
-    executions = relationship("Execution", back_populates="workflow", cascade="all, delete-orphan") 
\ No newline at end of file
+    # config只保存可执行的节点和连线；完整的编辑器数据（含布局）由nodes/edges表组装
+    nodes = relationship("Node", back_populates="workflow", cascade="all, delete-orphan", order_by="Node.ordinal")
+    edges = relationship("WorkflowEdge", back_populates="workflow", cascade="all, delete-orphan",
+                         order_by="WorkflowEdge.ordinal")
+    executions = relationship("Execution", back_populates="workflow", cascade="all, delete-orphan")
+    
+    @property
+    def diagnostics(self):
+        """编译诊断信息（未编译时为空列表）"""
+        return json.loads(self.compile_diagnostics) if self.compile_diagnostics else []
+    
+    @property
+    def editor_config(self) -> str:
+        """编辑器使用的完整配置（JSON字符串）；尚未规范化存储的工作流直接返回config"""
+        if not self.nodes and not self.edges:
+            return self.config
+        document = json.loads(self.layout) if self.layout else {}
+        document["nodes"] = [node.to_editor() for node in self.nodes]
+        document["edges"] = [edge.to_editor() for edge in self.edges]
+        return json.dumps(document, ensure_ascii=False)
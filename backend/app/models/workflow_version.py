@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.database.database import Base
+
+class WorkflowVersion(Base):
+    """不可变的工作流版本：以可执行配置的内容哈希标识，内容相同的版本在所有工作流间只保存一份"""
+    __tablename__ = "workflow_versions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False, unique=True, index=True)  # 可执行配置的sha256
+    config = Column(Text, nullable=False)  # 可执行配置（JSON字符串），写入后不再修改
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,100 @@
+"""存储值编解码基准测试
+
+用法（在backend目录下执行）:
+    python -m benchmarks.bench_codec [--items 200] [--repeat 50] [--json out.json]
+
+分别用json、orjson（已安装时）、msgpack（已安装时）编解码相同的合成变量
+（Jira issue列表、LLM长文本输出、变量快照），比较编码、解码耗时和编码后大小。
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from app.core.codec import configure_codec, dumps, loads, orjson, msgpack
+
+WORDS = (
+    "workflow agent epic story acceptance criteria summary risk dependency release "
+    "需求 分析 测试 用例 风险 依赖 发布 总结 模型 输出 变量 节点"
+).split()
+
+
+def synthetic_text(rng: random.Random, paragraphs: int) -> str:
+    """生成类似LLM输出/Jira markdown的文本"""
+    parts = []
+    for i in range(paragraphs):
+        parts.append(f"## Section {i + 1}")
+        for _ in range(rng.randint(3, 8)):
+            parts.append("- " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))))
+    return "\n".join(parts)
+
+
+def synthetic_values(rng: random.Random, items: int) -> dict:
+    """生成几类典型的变量值"""
+    issues = [{
+        "key": f"PROJ-{i}",
+        "summary": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 12))),
+        "description": synthetic_text(rng, 2),
+        "status": rng.choice(["To Do", "In Progress", "Done"]),
+        "story_points": rng.choice([1, 2, 3, 5, 8]),
+        "labels": [rng.choice(WORDS) for _ in range(3)],
+        "subtasks": [{"key": f"PROJ-{i}-{j}", "done": rng.random() < 0.5} for j in range(rng.randint(0, 4))],
+    } for i in range(items)]
+    llm_output = synthetic_text(rng, items // 4 or 1)
+    snapshot = {f"node_{n}_output": synthetic_text(rng, 3) for n in range(items // 10 or 1)}
+    snapshot["issues"] = issues[:items // 4]
+    return {"jira_issues": issues, "llm_output": [llm_output], "variables_snapshot": snapshot}
+
+
+def _timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def run_case(name: str, values: dict, repeat: int) -> dict:
+    configure_codec(name)
+    result = {"codec": name}
+    for label, value in values.items():
+        encoded = dumps(value)
+        assert loads(encoded) == json.loads(json.dumps(value)), f"{name} round trip changed {label}"
+        size = len(encoded.encode("utf-8") if isinstance(encoded, str) else encoded)
+        result[label] = {
+            "size_bytes": size,
+            "encode_ms": round(_timed(lambda: dumps(value), repeat) * 1000, 3),
+            "decode_ms": round(_timed(lambda: loads(encoded), repeat) * 1000, 3),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stored value codecs")
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", dest="json_path", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    values = synthetic_values(random.Random(42), args.items)
+    codecs = ["json"] + (["orjson"] if orjson is not None else []) + (["msgpack"] if msgpack is not None else [])
+    results = [run_case(name, values, args.repeat) for name in codecs]
+    configure_codec("json")
+
+    print(f"{'value':<20}{'codec':<9}{'size (KiB)':>12}{'encode (ms)':>13}{'decode (ms)':>13}{'speedup':>9}")
+    for label in values:
+        baseline = results[0][label]
+        for r in results:
+            case = r[label]
+            speedup = (baseline["encode_ms"] + baseline["decode_ms"]) / max(case["encode_ms"] + case["decode_ms"], 1e-6)
+            print(f"{label:<20}{r['codec']:<9}{case['size_bytes'] / 1024:>12.1f}"
+                  f"{case['encode_ms']:>13.3f}{case['decode_ms']:>13.3f}{speedup:>8.2f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
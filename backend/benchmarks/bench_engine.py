@@ -0,0 +1,184 @@
+"""工作流引擎端到端基准测试
+
+用法（在backend目录下执行）:
+    python -m benchmarks.bench_engine [--scenarios linear,fanout,if_tree] [--sizes 10,100,1000]
+                                      [--executions 5] [--latency-ms 20] [--failure-rate 0.0]
+                                      [--output benchmarks/results/<commit>.json]
+
+生成合成工作流，在本地模拟LLM服务下通过WorkflowEngine执行，统计：
+  - executions_per_sec    每秒完成的执行数
+  - overhead_ms_per_node  扣除LLM请求耗时后每个节点的平均开销
+  - db_writes_per_node    每个节点的INSERT/UPDATE/DELETE语句数
+  - commits_per_node      每个节点的事务提交数
+  - peak_memory_bytes     单次执行的tracemalloc峰值内存
+结果保存为JSON，可用 python -m benchmarks.compare 对比两次提交。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution_history import ExecutionHistory
+from app.core.workflow_engine import WorkflowEngine
+from app.core.metrics import LLM_REQUEST_SECONDS
+from app.core.http_client import close_http_session
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.workflows import SCENARIOS
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class WriteCounter:
+    """统计数据库写语句和提交次数"""
+
+    def __init__(self, engine):
+        self.writes = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self.writes += len(parameters) if executemany else 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+
+async def run_execution(session, workflow_id: int) -> int:
+    execution = Execution(workflow_id=workflow_id)
+    session.add(execution)
+    session.commit()
+    await WorkflowEngine(session).execute_workflow(execution.id, {})
+    return execution.id
+
+
+async def run_case(scenario: str, size: int, executions: int) -> dict:
+    config = SCENARIOS[scenario](size)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'bench.db')}", connect_args={"check_same_thread": False})
+        ensure_schema(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        session = Session()
+
+        workflow = Workflow(name=f"bench-{scenario}-{size}", config=json.dumps(config))
+        session.add(workflow)
+        session.commit()
+
+        # 预热一次（导入、模板编译、连接建立）
+        await run_execution(session, workflow.id)
+
+        counter = WriteCounter(engine)
+        llm_count_before, llm_seconds_before = LLM_REQUEST_SECONDS.totals()
+        started = time.perf_counter()
+        execution_ids = [await run_execution(session, workflow.id) for _ in range(executions)]
+        elapsed = time.perf_counter() - started
+        llm_count, llm_seconds = LLM_REQUEST_SECONDS.totals()
+        llm_count -= llm_count_before
+        llm_seconds -= llm_seconds_before
+
+        statuses = [s.value for (s,) in session.query(Execution.status).filter(Execution.id.in_(execution_ids))]
+        nodes_executed = session.query(ExecutionHistory).filter(ExecutionHistory.execution_id.in_(execution_ids)).count()
+
+        # 单独一次执行测量峰值内存，避免tracemalloc影响计时
+        tracemalloc.start()
+        await run_execution(session, workflow.id)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        session.close()
+        engine.dispose()
+
+    nodes_executed = max(nodes_executed, 1)
+    return {
+        "scenario": scenario,
+        "size": size,
+        "graph_nodes": len(config["nodes"]),
+        "executions": executions,
+        "completed": statuses.count("completed"),
+        "nodes_executed": nodes_executed,
+        "llm_calls": llm_count,
+        "elapsed_seconds": round(elapsed, 4),
+        "executions_per_sec": round(executions / elapsed, 3),
+        "llm_seconds": round(llm_seconds, 4),
+        "overhead_ms_per_node": round((elapsed - llm_seconds) / nodes_executed * 1000, 4),
+        "db_writes_per_node": round(counter.writes / nodes_executed, 3),
+        "commits_per_node": round(counter.commits / nodes_executed, 3),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def main_async(args) -> dict:
+    server = MockLLMServer(MockLLMConfig(args.latency_ms, args.jitter_ms, args.failure_rate, seed=42))
+    await server.start()
+    os.environ["QWEN_BASE_URL"] = server.base_url
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    # 模拟服务不校验API Key，但未配置时Agent节点不会发起请求
+    os.environ.setdefault("QwenToken", "mock-token")
+    results = []
+    try:
+        for scenario in args.scenarios.split(","):
+            for size in [int(s) for s in args.sizes.split(",")]:
+                result = await run_case(scenario, size, args.executions)
+                results.append(result)
+                print(f"{scenario:<8}{size:>6}  {result['executions_per_sec']:>8.2f} exec/s  "
+                      f"{result['overhead_ms_per_node']:>8.3f} ms/node overhead  "
+                      f"{result['db_writes_per_node']:>6.2f} writes/node  "
+                      f"{result['commits_per_node']:>6.2f} commits/node  "
+                      f"{result['peak_memory_bytes'] / 1024:>9.1f} KiB peak")
+    finally:
+        await close_http_session()
+        await server.stop()
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "executions": args.executions,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "failure_rate": args.failure_rate,
+        },
+        "mock_llm": server.stats.to_dict(),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end WorkflowEngine benchmark")
+    parser.add_argument("--scenarios", default="linear,fanout,if_tree")
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--executions", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", default=None, help="结果JSON路径，默认 benchmarks/results/<commit>.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""历史记录压缩基准测试
+
+用法（在backend目录下执行）:
+    python -m benchmarks.bench_history_compression [--executions 50] [--nodes 20] [--json out.json]
+
+分别在不压缩、zlib、zstd（已安装时）配置下生成相同的合成执行历史，
+比较数据库文件大小以及 GET /api/executions/{id}/history 处理函数的耗时。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.database.database import Base
+from app.database.types import configure_compression, zstandard
+from app.models import Workflow, Execution
+from app.models.execution_history import ExecutionHistory, ExecutionHistoryStatus, ChatMessage
+from app.api.execution import get_execution_history
+
+WORDS = (
+    "workflow agent epic story acceptance criteria summary risk dependency release "
+    "需求 分析 测试 用例 风险 依赖 发布 总结 模型 输出 变量 节点"
+).split()
+
+
+def synthetic_text(rng: random.Random, paragraphs: int) -> str:
+    """生成类似LLM输出/Jira markdown的文本"""
+    parts = []
+    for i in range(paragraphs):
+        parts.append(f"## Section {i + 1}")
+        for _ in range(rng.randint(3, 8)):
+            parts.append("- " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))))
+    return "\n".join(parts)
+
+
+def populate(session, executions: int, nodes: int, seed: int):
+    rng = random.Random(seed)
+    workflow = Workflow(name="bench", config="{}")
+    session.add(workflow)
+    session.flush()
+    execution_ids = []
+    for _ in range(executions):
+        execution = Execution(workflow_id=workflow.id)
+        session.add(execution)
+        session.flush()
+        execution_ids.append(execution.id)
+        variables = {}
+        for n in range(nodes):
+            prompt = synthetic_text(rng, 4)
+            response = synthetic_text(rng, 6)
+            variables[f"node_{n}_output"] = response
+            session.add(ExecutionHistory(
+                execution_id=execution.id,
+                node_id=f"node_{n}",
+                node_type="agent",
+                node_name=f"Agent {n}",
+                status=ExecutionHistoryStatus.COMPLETED,
+                started_at=datetime.utcnow(),
+                completed_at=datetime.utcnow(),
+                duration=0.0,
+                output=f"Agent executed successfully. Output saved to variable 'node_{n}_output'",
+                variables_snapshot=json.dumps(variables, ensure_ascii=False),
+                agent_prompt=prompt,
+                agent_response=response,
+            ))
+        session.add(ChatMessage(execution_id=execution.id, role="user", content=synthetic_text(rng, 1)))
+        session.commit()
+    return execution_ids
+
+
+def run_case(algorithm: str, executions: int, nodes: int, repeat: int) -> dict:
+    configure_compression(algorithm=algorithm)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "bench.db")
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        session = Session()
+        started = time.perf_counter()
+        execution_ids = populate(session, executions, nodes, seed=42)
+        write_seconds = time.perf_counter() - started
+        session.close()
+
+        with engine.connect() as conn:
+            page_count = conn.execute(text("PRAGMA page_count")).scalar()
+            page_size = conn.execute(text("PRAGMA page_size")).scalar()
+
+        latencies = []
+        session = Session()
+        for _ in range(repeat):
+            for execution_id in execution_ids:
+                t0 = time.perf_counter()
+                asyncio.run(get_execution_history(execution_id, session))
+                latencies.append(time.perf_counter() - t0)
+                session.expunge_all()
+        session.close()
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "algorithm": algorithm,
+        "db_size_bytes": page_count * page_size,
+        "write_seconds": round(write_seconds, 4),
+        "history_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "history_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark history column compression")
+    parser.add_argument("--executions", type=int, default=50)
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    algorithms = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+    results = [run_case(a, args.executions, args.nodes, args.repeat) for a in algorithms]
+
+    baseline = results[0]["db_size_bytes"]
+    print(f"{'algorithm':<10}{'db size (KiB)':>15}{'ratio':>8}{'write (s)':>11}{'history p50 (ms)':>18}{'p95 (ms)':>10}")
+    for r in results:
+        print(f"{r['algorithm']:<10}{r['db_size_bytes'] / 1024:>15.1f}{r['db_size_bytes'] / baseline:>8.2f}"
+              f"{r['write_seconds']:>11.3f}{r['history_p50_ms']:>18.3f}{r['history_p95_ms']:>10.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
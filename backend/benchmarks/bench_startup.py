@@ -0,0 +1,116 @@
+"""启动耗时基准测试
+
+用法（在backend目录下执行）:
+    python -m benchmarks.bench_startup [--runs 5] [--budget-ms 400] [--json out.json]
+
+在独立进程中以 python -X importtime 导入main，统计导入main的累计耗时（中位数）
+和耗时最多的模块。fastapi、SQLAlchemy等框架的导入耗时随机器差异很大，因此同时在
+独立进程中只导入这些框架作为基线，预算只约束应用自身在基线之上增加的耗时；
+超过预算或启动时导入了应延迟加载的SDK时以非0状态退出，可用于CI。
+导入main不访问数据库（建表和迁移在startup阶段进行）。
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# 只在第一次调用时导入的模块，启动时不应出现
+LAZY_MODULES = ("openai", "aiohttp", "dotenv")
+# 应用启动必需的框架，它们的导入耗时作为基线
+FRAMEWORK_MODULES = ("fastapi", "sqlalchemy.orm", "pydantic", "jinja2")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_modules(env: dict, modules: str = "main") -> dict:
+    """在新进程中导入一次模块，返回 {模块名: (自身耗时us, 累计耗时us, 嵌套层级)}"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modules}"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {modules} failed:\n{proc.stderr[-2000:]}")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return modules
+
+
+def framework_ms(run: dict) -> float:
+    """基线进程中框架模块（顶层导入）的累计耗时"""
+    return sum(cumulative for name, (_, cumulative, level) in run.items()
+               if level == 0 and name in FRAMEWORK_MODULES) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "400")),
+                        help="应用在框架基线之上增加的导入耗时上限")
+    parser.add_argument("--top", type=int, default=15, help="列出累计耗时最多的顶层依赖")
+    parser.add_argument("--json", dest="json_path", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'startup.db')}")
+        runs, baselines_ms = [], []
+        for _ in range(args.runs):
+            # 交替测量，机器负载的变化同时影响两者
+            runs.append(import_modules(env))
+            baselines_ms.append(framework_ms(import_modules(env, ", ".join(FRAMEWORK_MODULES))))
+        db_created = os.path.exists(os.path.join(tmpdir, "startup.db"))
+
+    totals_ms = [run["main"][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+    baseline_ms = statistics.median(baselines_ms)
+    app_ms = statistics.median(total - baseline for total, baseline in zip(totals_ms, baselines_ms))
+    last = runs[-1]
+    # main直接导入的依赖（层级1）按累计耗时排序
+    top = sorted(
+        ((name, cumulative / 1000) for name, (_, cumulative, level) in last.items() if level == 1),
+        key=lambda item: item[1], reverse=True
+    )[:args.top]
+    eager = [name for name in LAZY_MODULES if name in last]
+
+    print(f"import main: median {median_ms:.1f} ms over {args.runs} runs (min {min(totals_ms):.1f}, max {max(totals_ms):.1f})")
+    print(f"framework baseline ({', '.join(FRAMEWORK_MODULES)}): median {baseline_ms:.1f} ms")
+    print(f"application on top of baseline: median {app_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"{'module':<45}{'cumulative (ms)':>16}")
+    for name, cumulative_ms in top:
+        print(f"{name:<45}{cumulative_ms:>16.1f}")
+
+    failures = []
+    if app_ms > args.budget_ms:
+        failures.append(f"application import time {app_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+    if eager:
+        failures.append(f"lazily loaded modules imported at startup: {', '.join(eager)}")
+    if db_created:
+        failures.append("importing main created the database file")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "median_ms": round(median_ms, 1),
+                "runs_ms": [round(t, 1) for t in totals_ms],
+                "framework_baseline_ms": round(baseline_ms, 1),
+                "application_ms": round(app_ms, 1),
+                "budget_ms": args.budget_ms,
+                "top_imports": [{"module": name, "cumulative_ms": round(ms, 1)} for name, ms in top],
+                "failures": failures,
+            }, f, ensure_ascii=False, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
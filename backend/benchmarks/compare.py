@@ -0,0 +1,61 @@
+"""对比两次基准测试结果
+
+用法（在backend目录下执行）:
+    python -m benchmarks.compare benchmarks/results/<base>.json benchmarks/results/<head>.json [--threshold 10]
+
+按(scenario, size)匹配，输出各指标的变化百分比；任一指标退化超过阈值时返回非零退出码。
+"""
+import argparse
+import json
+import sys
+
+# 指标名 -> 数值越大越好
+METRICS = {
+    "executions_per_sec": True,
+    "overhead_ms_per_node": False,
+    "db_writes_per_node": False,
+    "commits_per_node": False,
+    "peak_memory_bytes": False,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="退化阈值（百分比）")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    base_results = {(r["scenario"], r["size"]): r for r in base["results"]}
+    regressions = []
+    print(f"base={base.get('commit')} head={head.get('commit')}")
+    for result in head["results"]:
+        key = (result["scenario"], result["size"])
+        previous = base_results.get(key)
+        if previous is None:
+            continue
+        parts = []
+        for metric, higher_is_better in METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > args.threshold else ""
+            if flag:
+                regressions.append((key, metric, change))
+            parts.append(f"{metric}={new} ({change:+.1f}%){flag}")
+        print(f"{key[0]:<8}{key[1]:>6}  " + "  ".join(parts))
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""FastAPI接口的HTTP负载测试
+
+用法（在backend目录下执行）:
+    python -m benchmarks.load_test [--stages ramp|soak|spike|<profile.json>] [--llm-latency-ms 200]
+                                   [--url http://127.0.0.1:8000] [--output load.json]
+
+默认在临时SQLite数据库上用uvicorn启动main:app（单进程），并启动本地模拟LLM服务；
+指定--url时直接压测已运行的服务（此时需自行把QWEN_BASE_URL指向模拟服务）。
+
+流量由虚拟用户按权重混合产生：
+  - execute   批量启动执行（POST /execute，每次burst个）
+  - poll      轮询执行状态（GET /executions/{id}）
+  - history   读取执行历史（GET /executions/{id}/history）
+  - chat      在暂停的human_control节点上聊天（POST /executions/{id}/chat）
+  - continue  继续暂停的执行（POST /executions/{id}/continue）
+
+阶段配置文件格式（JSON数组）:
+    [{"name": "warmup", "duration": 20, "users": 5,
+      "mix": {"execute": 1, "poll": 6, "history": 2, "chat": 1, "continue": 1}, "burst": 3}, ...]
+
+每个阶段输出各路由的p50/p95/p99延迟、错误率、吞吐量，以及从/metrics读取的事件循环延迟；
+逐级增加并发直到吞吐不再增长、延迟陡增，即为单进程的饱和点。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import aiohttp
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.workflows import human_review
+
+DEFAULT_MIX = {"execute": 1, "poll": 6, "history": 2, "chat": 1, "continue": 1}
+
+STAGE_PROFILES = {
+    # 逐级加压，寻找饱和点
+    "ramp": [{"name": f"users-{users}", "duration": 20, "users": users} for users in (1, 5, 10, 25, 50, 100)],
+    # 固定并发长时间运行，观察延迟是否随数据增长而退化
+    "soak": [{"name": "soak", "duration": 300, "users": 20}],
+    # 低负载 -> 突发 -> 恢复
+    "spike": [
+        {"name": "baseline", "duration": 20, "users": 5},
+        {"name": "spike", "duration": 20, "users": 100, "mix": {"execute": 4, "poll": 6, "history": 1, "chat": 1, "continue": 1}},
+        {"name": "recovery", "duration": 30, "users": 5},
+    ],
+}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class LoadState:
+    """虚拟用户共享的执行池"""
+
+    def __init__(self):
+        self.active: List[int] = []  # 已启动、尚未确认暂停/结束的执行
+        self.paused: List[int] = []  # 处于human_control暂停的执行
+        self.known: List[int] = []  # 所有执行（用于读取历史）
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def reset_stats(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+
+class VirtualUser:
+    def __init__(self, session: aiohttp.ClientSession, base_url: str, workflow_id: int, state: LoadState,
+                 mix: Dict[str, float], burst: int, rng: random.Random):
+        self.session = session
+        self.base_url = base_url
+        self.workflow_id = workflow_id
+        self.state = state
+        self.actions = list(mix.keys())
+        self.weights = list(mix.values())
+        self.burst = burst
+        self.rng = rng
+
+    async def request(self, route: str, method: str, path: str, **kwargs) -> Optional[Any]:
+        started = time.perf_counter()
+        try:
+            async with self.session.request(method, self.base_url + path, **kwargs) as response:
+                body = await response.read()
+                elapsed = time.perf_counter() - started
+                self.state.latencies[route].append(elapsed)
+                if response.status >= 400:
+                    self.state.errors[route] += 1
+                    return None
+                return json.loads(body) if body else None
+        except Exception:
+            self.state.latencies[route].append(time.perf_counter() - started)
+            self.state.errors[route] += 1
+            return None
+
+    async def run(self, deadline: float):
+        while time.perf_counter() < deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            await getattr(self, f"do_{action}")()
+
+    async def do_execute(self):
+        for _ in range(self.burst):
+            result = await self.request("POST /executions/{workflow_id}/execute", "POST",
+                                        f"/api/executions/{self.workflow_id}/execute", json={"variables": {}})
+            if result:
+                self.state.active.append(result["id"])
+                self.state.known.append(result["id"])
+
+    async def do_poll(self):
+        if not self.state.active:
+            return await self.do_execute()
+        execution_id = self.rng.choice(self.state.active)
+        result = await self.request("GET /executions/{id}", "GET", f"/api/executions/{execution_id}")
+        if result and result["status"] != "running" and result["status"] != "pending":
+            if execution_id in self.state.active:
+                self.state.active.remove(execution_id)
+            if result["status"] == "paused":
+                self.state.paused.append(execution_id)
+
+    async def do_history(self):
+        if not self.state.known:
+            return await self.do_execute()
+        execution_id = self.rng.choice(self.state.known[-200:])
+        await self.request("GET /executions/{id}/history", "GET", f"/api/executions/{execution_id}/history")
+
+    async def do_chat(self):
+        if not self.state.paused:
+            return await self.do_poll()
+        execution_id = self.rng.choice(self.state.paused)
+        await self.request("POST /executions/{id}/chat", "POST", f"/api/executions/{execution_id}/chat",
+                           json={"message": "Summarise {{last_output}} in one sentence"})
+
+    async def do_continue(self):
+        if not self.state.paused:
+            return await self.do_poll()
+        # 每个暂停的执行只继续一次
+        execution_id = self.state.paused.pop(self.rng.randrange(len(self.state.paused)))
+        await self.request("POST /executions/{id}/continue", "POST", f"/api/executions/{execution_id}/continue",
+                           json={"variables": {}})
+
+
+_LAG_PATTERN = re.compile(r'^event_loop_lag_seconds_(bucket\{le="([^"]+)"\}|sum|count) (\S+)$', re.M)
+
+
+async def scrape_loop_lag(session: aiohttp.ClientSession, base_url: str) -> Dict[str, Any]:
+    """读取/metrics中的事件循环延迟直方图"""
+    try:
+        async with session.get(base_url + "/metrics") as response:
+            text = await response.text()
+    except Exception:
+        return {}
+    snapshot = {"buckets": {}}
+    for kind, bound, value in _LAG_PATTERN.findall(text):
+        if bound:
+            snapshot["buckets"][float(bound)] = float(value)
+        else:
+            snapshot[kind] = float(value)
+    return snapshot
+
+
+def loop_lag_between(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """两次抓取之间的事件循环延迟：均值与按分桶估算的p99上界"""
+    if not before or not after or "count" not in after:
+        return {}
+    count = after["count"] - before.get("count", 0)
+    if count <= 0:
+        return {"samples": 0}
+    p99_bound = None
+    for bound in sorted(after["buckets"]):
+        if after["buckets"][bound] - before["buckets"].get(bound, 0) >= 0.99 * count:
+            p99_bound = bound
+            break
+    return {
+        "samples": int(count),
+        "mean_ms": round((after["sum"] - before.get("sum", 0)) / count * 1000, 3),
+        "p99_upper_bound_ms": None if p99_bound is None else (p99_bound * 1000 if p99_bound != float("inf") else "inf"),
+    }
+
+
+def summarize_stage(stage: Dict[str, Any], state: LoadState, elapsed: float, loop_lag: Dict[str, Any]) -> Dict[str, Any]:
+    routes = {}
+    total_requests = total_errors = 0
+    for route, latencies in sorted(state.latencies.items()):
+        errors = state.errors.get(route, 0)
+        total_requests += len(latencies)
+        total_errors += errors
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": round(errors / len(latencies), 4),
+            "rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+    return {
+        "stage": stage["name"],
+        "users": stage["users"],
+        "duration_seconds": round(elapsed, 2),
+        "requests": total_requests,
+        "rps": round(total_requests / elapsed, 2),
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        "event_loop_lag": loop_lag,
+        "routes": routes,
+    }
+
+
+def print_stage(summary: Dict[str, Any]):
+    lag = summary["event_loop_lag"]
+    print(f"\n== {summary['stage']}  users={summary['users']}  rps={summary['rps']}  "
+          f"errors={summary['error_rate'] * 100:.2f}%  loop lag mean={lag.get('mean_ms')}ms "
+          f"p99<={lag.get('p99_upper_bound_ms')}ms")
+    print(f"{'route':<42}{'req':>7}{'err%':>8}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for route, stats in summary["routes"].items():
+        print(f"{route:<42}{stats['requests']:>7}{stats['error_rate'] * 100:>8.2f}{stats['rps']:>9.2f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_app(llm_base_url: str, workdir: str) -> (subprocess.Popen, str):
+    """在临时数据库上以单进程uvicorn启动后端"""
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        QWEN_BASE_URL=llm_base_url,
+        OPENAI_BASE_URL=llm_base_url,
+        QwenToken=os.getenv("QwenToken", "mock-token"),
+        RETENTION_INTERVAL_SECONDS="0",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=str(Path(__file__).resolve().parent.parent),
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                async with session.get(base_url + "/health") as response:
+                    if response.status == 200:
+                        return process, base_url
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become healthy")
+
+
+async def create_workflow(session: aiohttp.ClientSession, base_url: str) -> int:
+    payload = {"name": "load-test human review", "description": "created by benchmarks.load_test",
+               "config": json.dumps(human_review(5))}
+    async with session.post(base_url + "/api/workflows/", json=payload) as response:
+        response.raise_for_status()
+        return (await response.json())["id"]
+
+
+async def run_stages(base_url: str, stages: List[Dict[str, Any]], seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    state = LoadState()
+    summaries = []
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        workflow_id = await create_workflow(session, base_url)
+        for stage in stages:
+            state.reset_stats()
+            mix = stage.get("mix", DEFAULT_MIX)
+            users = [
+                VirtualUser(session, base_url, workflow_id, state, mix, stage.get("burst", 3), random.Random(rng.random()))
+                for _ in range(stage["users"])
+            ]
+            lag_before = await scrape_loop_lag(session, base_url)
+            started = time.perf_counter()
+            deadline = started + stage["duration"]
+            await asyncio.gather(*(user.run(deadline) for user in users))
+            elapsed = time.perf_counter() - started
+            lag_after = await scrape_loop_lag(session, base_url)
+            summary = summarize_stage(stage, state, elapsed, loop_lag_between(lag_before, lag_after))
+            print_stage(summary)
+            summaries.append(summary)
+    return summaries
+
+
+def load_stages(value: str, duration: Optional[float]) -> List[Dict[str, Any]]:
+    if value in STAGE_PROFILES:
+        stages = [dict(stage) for stage in STAGE_PROFILES[value]]
+    else:
+        with open(value) as f:
+            stages = json.load(f)
+    for stage in stages:
+        if duration is not None:
+            stage["duration"] = duration
+    return stages
+
+
+async def main_async(args) -> Dict[str, Any]:
+    stages = load_stages(args.stages, args.duration)
+    server = MockLLMServer(MockLLMConfig(args.llm_latency_ms, args.llm_jitter_ms, args.llm_failure_rate, seed=args.seed))
+    await server.start()
+    process = None
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            base_url = args.url
+            if base_url is None:
+                process, base_url = await start_app(server.base_url, workdir)
+            try:
+                summaries = await run_stages(base_url.rstrip("/"), stages, args.seed)
+            finally:
+                if process is not None:
+                    # uvicorn关闭时取消进行中的执行，超时则强制退出
+                    process.terminate()
+                    try:
+                        process.wait(timeout=30)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                        process.wait()
+    finally:
+        await server.stop()
+    return {
+        "config": {
+            "stages": args.stages,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_failure_rate": args.llm_failure_rate,
+        },
+        "mock_llm": server.stats.to_dict(),
+        "stages": summaries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test for the workflow API")
+    parser.add_argument("--stages", default="ramp", help=f"内置阶段配置({', '.join(STAGE_PROFILES)})或JSON文件路径")
+    parser.add_argument("--duration", type=float, default=None, help="覆盖每个阶段的持续时间（秒）")
+    parser.add_argument("--url", default=None, help="压测已运行的服务，不自动启动")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="结果JSON路径")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
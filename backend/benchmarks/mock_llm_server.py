@@ -0,0 +1,159 @@
+"""OpenAI/千问兼容的本地模拟LLM服务
+
+用法（在backend目录下执行）:
+    python -m benchmarks.mock_llm_server [--port 8900] [--latency-ms 200] [--jitter-ms 50] [--failure-rate 0.0]
+
+提供 POST /v1/chat/completions（以及千问的 /compatible-mode/v1/chat/completions），
+按配置的延迟和失败率返回响应，响应中包含usage字段。
+后端设置 QWEN_BASE_URL=http://127.0.0.1:8900/v1 或 OPENAI_BASE_URL=http://127.0.0.1:8900/v1 即可使用。
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+from aiohttp import web
+
+
+class MockLLMConfig:
+    """模拟服务的行为配置"""
+
+    def __init__(self, latency_ms: float = 200.0, jitter_ms: float = 50.0, failure_rate: float = 0.0,
+                 response_tokens: int = 120, stream_chunk_ms: float = 10.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.response_tokens = response_tokens
+        self.stream_chunk_ms = stream_chunk_ms
+        self.random = random.Random(seed)
+
+
+class MockLLMStats:
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.sleep_seconds = 0.0
+        self.streams_cancelled = 0
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def create_app(config: MockLLMConfig) -> web.Application:
+    stats = MockLLMStats()
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        stats.requests += 1
+
+        latency = max(0.0, config.latency_ms + config.random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        if config.random.random() < config.failure_rate:
+            stats.failures += 1
+            await asyncio.sleep(latency / 2)
+            return web.json_response({"error": {"message": "mock upstream failure", "type": "server_error"}}, status=500)
+
+        prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages", []))
+        prompt_tokens = _estimate_tokens(prompt)
+        completion_tokens = min(config.response_tokens, payload.get("max_tokens") or config.response_tokens)
+        content = f"[mock:{payload.get('model')}] " + " ".join(f"token{i}" for i in range(completion_tokens))
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+
+        if payload.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            await asyncio.sleep(latency)
+            stats.sleep_seconds += latency
+            try:
+                for word in content.split(" "):
+                    chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                    await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    await asyncio.sleep(config.stream_chunk_ms / 1000)
+                await response.write(b"data: [DONE]\n\n")
+                await response.write_eof()
+            except ConnectionResetError:
+                # 客户端提前断开
+                stats.streams_cancelled += 1
+            return response
+
+        await asyncio.sleep(latency)
+        stats.sleep_seconds += latency
+        return web.json_response({
+            "id": f"mock-{stats.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats.to_dict())
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["stats"] = stats
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/compatible-mode/v1/chat/completions", chat_completions)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+class MockLLMServer:
+    """在当前事件循环中启动模拟服务（供基准测试使用）"""
+
+    def __init__(self, config: MockLLMConfig, host: str = "127.0.0.1", port: int = 0):
+        self.app = create_app(config)
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def stats(self) -> MockLLMStats:
+        return self.app["stats"]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # port=0时取实际分配的端口
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Qwen compatible chat completion server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--response-tokens", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockLLMConfig(args.latency_ms, args.jitter_ms, args.failure_rate, args.response_tokens, seed=args.seed)
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1")
+    web.run_app(create_app(config), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
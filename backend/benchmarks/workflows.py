@@ -0,0 +1,117 @@
+"""基准测试用的合成工作流
+
+生成与前端React Flow导出格式一致的工作流配置（nodes/edges）。
+"""
+import json
+from typing import Dict, Any, List
+
+AGENT_MODEL = {"modelType": "qwen", "modelName": "qwen-turbo"}
+
+
+def _node(node_id: str, node_type: str, config: Dict[str, Any], x: float = 0, y: float = 0) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "type": node_type,
+        "position": {"x": x, "y": y},
+        "data": {"label": node_id, "config": config},
+    }
+
+
+def _edge(source: str, target: str, handle: str = None) -> Dict[str, Any]:
+    edge = {"id": f"e-{source}-{target}", "source": source, "target": target}
+    if handle:
+        edge["sourceHandle"] = handle
+    return edge
+
+
+def _agent(node_id: str, prompt: str, output_variable: str) -> Dict[str, Any]:
+    return _node(node_id, "agent", {**AGENT_MODEL, "prompt": prompt, "outputVariable": output_variable})
+
+
+def _start(initial: Dict[str, Any]) -> Dict[str, Any]:
+    return _node("start", "start", {"initialVariables": json.dumps(initial)})
+
+
+def _end(node_id: str = "end") -> Dict[str, Any]:
+    return _node(node_id, "end", {"output_text": "{{ last_output }}"})
+
+
+def linear_chain(size: int) -> Dict[str, Any]:
+    """start -> agent_1 -> ... -> agent_n -> end，每个agent引用上一个的输出"""
+    agents = max(size - 2, 1)
+    nodes: List[Dict[str, Any]] = [_start({"topic": "benchmark", "last_output": ""})]
+    edges = []
+    previous = "start"
+    for i in range(agents):
+        node_id = f"agent_{i}"
+        nodes.append(_agent(node_id, "Step %d about {{ topic }}: {{ last_output[:200] }}" % i, "last_output"))
+        edges.append(_edge(previous, node_id))
+        previous = node_id
+    nodes.append(_end())
+    edges.append(_edge(previous, "end"))
+    return {"nodes": nodes, "edges": edges}
+
+
+def wide_fanout(size: int) -> Dict[str, Any]:
+    """一个开始节点连出大量分支
+
+    引擎只沿第一条匹配的边执行，此拓扑用于衡量大图中节点/边查找的开销。
+    """
+    branches = max((size - 1) // 2, 1)
+    nodes: List[Dict[str, Any]] = [_start({"topic": "fanout", "last_output": ""})]
+    edges = []
+    for i in range(branches):
+        agent_id, end_id = f"branch_{i}", f"end_{i}"
+        nodes.append(_agent(agent_id, "Branch %d: {{ topic }}" % i, "last_output"))
+        nodes.append(_end(end_id))
+        edges.append(_edge("start", agent_id))
+        edges.append(_edge(agent_id, end_id))
+    return {"nodes": nodes, "edges": edges}
+
+
+def deep_if_tree(size: int) -> Dict[str, Any]:
+    """If节点组成的二叉决策树，叶子为agent -> end
+
+    每层根据level变量的比特位选择分支，执行路径长度为树深。
+    """
+    depth = 1
+    while (2 ** (depth + 1)) * 2 <= size:
+        depth += 1
+    nodes: List[Dict[str, Any]] = [_start({"route": 0b1011011011, "last_output": ""})]
+    edges = []
+
+    def build(prefix: str, level: int) -> str:
+        if level == depth:
+            agent_id, end_id = f"leaf_{prefix}", f"end_{prefix}"
+            nodes.append(_agent(agent_id, "Leaf %s reached" % prefix, "last_output"))
+            nodes.append(_end(end_id))
+            edges.append(_edge(agent_id, end_id))
+            return agent_id
+        node_id = f"if_{prefix or 'root'}"
+        nodes.append(_node(node_id, "if", {"condition": "({{ route }} >> %d) & 1 == 1" % level}))
+        edges.append(_edge(node_id, build(prefix + "1", level + 1), "true"))
+        edges.append(_edge(node_id, build(prefix + "0", level + 1), "false"))
+        return node_id
+
+    edges.append(_edge("start", build("", 0)))
+    return {"nodes": nodes, "edges": edges}
+
+
+def human_review(size: int) -> Dict[str, Any]:
+    """start -> agent(草稿) -> human_control -> agent(定稿) -> end，用于负载测试中的暂停/继续/聊天流量"""
+    nodes = [
+        _start({"topic": "load test", "last_output": ""}),
+        _agent("draft", "Draft a short note about {{ topic }}", "last_output"),
+        _node("review", "human_control", {}),
+        _agent("final", "Polish this draft: {{ last_output[:200] }}", "last_output"),
+        _end(),
+    ]
+    edges = [_edge("start", "draft"), _edge("draft", "review"), _edge("review", "final"), _edge("final", "end")]
+    return {"nodes": nodes, "edges": edges}
+
+
+SCENARIOS = {
+    "linear": linear_chain,
+    "fanout": wide_fanout,
+    "if_tree": deep_if_tree,
+}
@@ -1,24 +1,51 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.database import engine, Base
-from app.api import workflows, agents, execution, meta
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.orm import Session
+from app.database.database import engine, SessionLocal, get_db
+from app.database.migrations import ensure_schema
+from app.api import workflows, agents, execution, meta, retention
+from app.core.retention import retention_loop, enable_incremental_vacuum
+from app.core.metrics import (
+    CONTENT_TYPE_LATEST, install_db_instrumentation, monitor_event_loop_lag, render_metrics, update_execution_gauges
+)
+from app.core.tracing import install_db_tracing
+from app.core.http_client import close_http_session
+from app.core.task_registry import execution_tasks, wait_cancelled
+from app.core.codec import fast_responses
+from app.core.workflow_storage import WorkflowGraphStore
+from app.core.workflow_versions import backfill_versions
 
 # 导入所有模型以确保表被创建
 from app.models.workflow import Workflow
+from app.models.workflow_version import WorkflowVersion
 from app.models.node import Node
+from app.models.edge import WorkflowEdge
 from app.models.agent import Agent
 from app.models.execution import Execution
 from app.models.variable import Variable
 from app.models.execution_history import ExecutionHistory, ChatMessage
-from app.models.meta import Meta
+from app.models.meta import Meta, MetaVersion
+from app.models.retention import RetentionPolicy, ExecutionArchive
+from app.models.profile import ExecutionProfile
+from app.models.idempotency import ExecutionRequestKey
+from app.models.node_cache import NodeResultCache
+
+# 由部署流程统一迁移（python -m scripts.migrate）时设置，启动时跳过建表和数据回填，加快实例启动
+SKIP_SCHEMA_MIGRATIONS = os.getenv("SKIP_SCHEMA_MIGRATIONS", "").lower() in ("1", "true", "yes")
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 统计数据库提交耗时，并为flush/commit记录追踪span
+install_db_instrumentation()
+install_db_tracing()
 
 app = FastAPI(
     title="AI Agent Workflow Platform",
     description="A visual workflow platform for AI agents",
-    version="1.0.0"
+    version="1.0.0",
+    # 配置了orjson/msgpack编解码器时API响应也用orjson渲染
+    default_response_class=ORJSONResponse if fast_responses() else JSONResponse
 )
 
 # 配置CORS
@@ -35,6 +62,60 @@ app.include_router(workflows.router, prefix="/api/workflows", tags=["workflows"]
 app.include_router(agents.router, prefix="/api/agents", tags=["agents"])
 app.include_router(execution.router, prefix="/api/executions", tags=["executions"])
 app.include_router(meta.router, prefix="/api/meta", tags=["meta"])
+app.include_router(retention.router, prefix="/api/retention", tags=["retention"])
+
+@app.on_event("startup")
+async def prepare_database():
+    """创建数据库表并补充新增的列（在导入时不访问数据库）"""
+    if SKIP_SCHEMA_MIGRATIONS:
+        return
+    ensure_schema(engine)
+
+@app.on_event("startup")
+async def backfill_workflow_graphs():
+    """把旧的工作流（只有config）拆分到节点表和连线表，并登记已编译工作流的当前版本"""
+    if SKIP_SCHEMA_MIGRATIONS:
+        return
+    db = SessionLocal()
+    try:
+        migrated = WorkflowGraphStore(db).backfill()
+        if migrated:
+            print(f"Migrated {migrated} workflows to normalized node/edge storage")
+        registered = backfill_versions(db)
+        if registered:
+            print(f"Registered versions for {registered} workflows")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def start_retention_job():
+    """启动执行记录归档清理的后台任务"""
+    if os.getenv("RETENTION_ENABLE_INCREMENTAL_VACUUM", "").lower() in ("1", "true", "yes"):
+        db = SessionLocal()
+        try:
+            enable_incremental_vacuum(db)
+        finally:
+            db.close()
+    
+    interval = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+    if interval > 0:
+        app.state.retention_task = asyncio.create_task(retention_loop(interval))
+
+@app.on_event("startup")
+async def start_event_loop_monitor():
+    """启动事件循环延迟监控，结果见/metrics中的event_loop_lag_seconds"""
+    interval = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+    if interval > 0:
+        app.state.loop_lag_task = asyncio.create_task(monitor_event_loop_lag(interval))
+
+@app.on_event("shutdown")
+async def cancel_running_executions():
+    """取消仍在运行的执行，避免执行记录停留在running状态"""
+    await wait_cancelled(execution_tasks.cancel_all())
+
+@app.on_event("shutdown")
+async def close_shared_http_session():
+    await close_http_session()
 
 @app.get("/")
 async def root():
@@ -44,6 +125,12 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics(db: Session = Depends(get_db)):
+    """Prometheus格式的运行指标"""
+    update_execution_gauges(db)
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
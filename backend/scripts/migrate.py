@@ -0,0 +1,34 @@
+"""部署时执行数据库迁移
+
+用法（在backend目录下执行）:
+    python -m scripts.migrate
+
+创建数据库表并补充新增的列，把旧的工作流拆分到节点表和连线表，并登记工作流的当前版本。
+与应用启动时执行的步骤相同；实例以SKIP_SCHEMA_MIGRATIONS=1启动时由部署流程先运行本脚本。
+"""
+import time
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.core.workflow_storage import WorkflowGraphStore
+from app.core.workflow_versions import backfill_versions
+# 导入所有模型以确保表被创建
+import app.models  # noqa: F401
+from app.models.execution_history import ChatMessage  # noqa: F401
+from app.models.retention import RetentionPolicy, ExecutionArchive  # noqa: F401
+
+
+def main():
+    started = time.perf_counter()
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        migrated = WorkflowGraphStore(db).backfill()
+        registered = backfill_versions(db)
+    finally:
+        db.close()
+    print(f"Schema up to date; migrated {migrated} workflows to node/edge storage, "
+          f"registered versions for {registered} workflows ({time.perf_counter() - started:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""本地OTLP/HTTP Collector替身
+
+用法（在backend目录下执行）:
+    python -m scripts.otlp_collector [--port 4318] [--output ./traces/collected.jsonl]
+
+接收 POST /v1/traces 的OTLP/JSON请求，按行写入文件并打印每个trace的span摘要。
+后端配置 TRACING_EXPORTER=otlp 与 OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318 即可发送到这里。
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+def summarize(payload: dict):
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            spans = scope_spans.get("spans", [])
+            for span in sorted(spans, key=lambda s: int(s["startTimeUnixNano"])):
+                duration_ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                print(f"  trace={span['traceId']} span={span['spanId']} parent={span['parentSpanId'] or '-':<16} "
+                      f"{span['name']:<24} {duration_ms:9.2f} ms")
+
+
+def make_handler(output: Path):
+    class CollectorHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_response(404)
+                self.end_headers()
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            with open(output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            summarize(payload)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    return CollectorHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minimal OTLP/HTTP JSON trace collector")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="./traces/collected.jsonl")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(output))
+    print(f"OTLP collector listening on http://{args.host}:{args.port}/v1/traces, writing to {output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""离线重新压缩历史数据
+
+用法（在backend目录下执行）:
+    python -m scripts.recompress_history [--algorithm zlib|zstd|none] [--batch-size 500] [--vacuum]
+
+读取execution_history与chat_messages中的大文本列，按当前压缩配置重新写入。
+旧的明文数据会被压缩，也可以用于在zlib/zstd之间切换或解压回明文。
+"""
+import argparse
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+from app.database.database import SessionLocal, engine
+from app.database.types import configure_compression, get_compression_settings
+from app.models.execution_history import ExecutionHistory, ChatMessage
+
+# 需要重新压缩的模型及列
+COMPRESSED_COLUMNS = {
+    ExecutionHistory: ["output", "variables_snapshot", "agent_prompt", "agent_response", "chat_history"],
+    ChatMessage: ["content"],
+}
+
+
+def database_size_bytes() -> int:
+    """数据库文件占用的字节数（page_count * page_size）"""
+    with engine.connect() as conn:
+        page_count = conn.execute(text("PRAGMA page_count")).scalar()
+        page_size = conn.execute(text("PRAGMA page_size")).scalar()
+    return page_count * page_size
+
+
+def recompress_model(db: Session, model, columns, batch_size: int) -> int:
+    """按主键分批重写一个模型的压缩列，返回处理的行数"""
+    processed = 0
+    last_id = 0
+    while True:
+        rows = db.query(model).filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+        if not rows:
+            break
+        for row in rows:
+            for column in columns:
+                if getattr(row, column) is not None:
+                    # 读取时已解压，标记为修改后按当前配置重新压缩写入
+                    flag_modified(row, column)
+        db.commit()
+        processed += len(rows)
+        last_id = rows[-1].id
+        db.expunge_all()
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompress execution history and chat messages")
+    parser.add_argument("--algorithm", choices=["zlib", "zstd", "none"], default=None,
+                        help="压缩算法，默认使用HISTORY_COMPRESSION环境变量")
+    parser.add_argument("--min-bytes", type=int, default=None, help="小于该字节数的文本不压缩")
+    parser.add_argument("--level", type=int, default=None, help="压缩级别")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="完成后执行VACUUM回收空间")
+    args = parser.parse_args()
+
+    configure_compression(args.algorithm, args.min_bytes, args.level)
+    settings = get_compression_settings()
+    print(f"Recompressing with algorithm={settings.algorithm} min_bytes={settings.min_bytes} level={settings.level}")
+
+    size_before = database_size_bytes()
+    started = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        for model, columns in COMPRESSED_COLUMNS.items():
+            count = recompress_model(db, model, columns, args.batch_size)
+            print(f"  {model.__tablename__}: {count} rows rewritten")
+    finally:
+        db.close()
+
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+
+    size_after = database_size_bytes()
+    print(f"Done in {time.perf_counter() - started:.2f}s, "
+          f"database size {size_before / 1024:.1f} KiB -> {size_after / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# 测试使用临时数据库，避免改动backend/workflow_platform.db
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import pytest
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution_history import ExecutionHistory, ExecutionHistoryStatus
+from app.models.variable import VariableType
+from app.core import codec
+from app.core.variable_manager import VariableManager
+
+SMALL = {"items": [1, 2, 3], "name": "小"}
+LARGE = {"text": "x" * 2000, "nested": {"values": list(range(100))}}
+
+
+def _require(name):
+    if name != "json":
+        pytest.importorskip(name)
+
+
+@pytest.fixture
+def execution_id():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        workflow = Workflow(name="codec", config=json.dumps({"nodes": [], "edges": []}))
+        db.add(workflow)
+        db.commit()
+        execution = Execution(workflow_id=workflow.id)
+        db.add(execution)
+        db.commit()
+        yield execution.id
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("first,second", [("json", "msgpack"), ("msgpack", "json"), ("json", "orjson")])
+def test_rows_stay_readable_after_switching_codec(execution_id, first, second):
+    _require(first)
+    _require(second)
+    db = SessionLocal()
+    manager = VariableManager(db)
+    try:
+        # 每种编码分别写入变量和历史快照（较大的快照会再压缩）
+        for name in (first, second):
+            codec.configure_codec(name)
+            asyncio.run(manager.set_variable(execution_id, f"small_{name}", SMALL, VariableType.JSON, "start"))
+            asyncio.run(manager.set_variable(execution_id, f"large_{name}", LARGE, VariableType.JSON, "start"))
+            for node_id, value in (("small", SMALL), ("large", LARGE)):
+                db.add(ExecutionHistory(execution_id=execution_id, node_id=f"{node_id}_{name}", node_type="start",
+                                        status=ExecutionHistoryStatus.COMPLETED, variables_snapshot=codec.dumps(value)))
+            db.commit()
+        db.expire_all()
+
+        variables = asyncio.run(manager.get_all_variables(execution_id))
+        snapshots = {h.node_id: codec.loads(h.variables_snapshot)
+                     for h in db.query(ExecutionHistory).filter(ExecutionHistory.execution_id == execution_id)}
+        for name in (first, second):
+            assert variables[f"small_{name}"] == SMALL and variables[f"large_{name}"] == LARGE
+            assert snapshots[f"small_{name}"] == SMALL and snapshots[f"large_{name}"] == LARGE
+    finally:
+        codec.configure_codec("json")
+        db.close()
+
+
+def test_msgpack_values_carry_marker():
+    pytest.importorskip("msgpack")
+    try:
+        codec.configure_codec("msgpack")
+        data = codec.dumps(SMALL)
+        assert data.startswith(codec.MSGPACK_MARKER)
+        codec.configure_codec("json")
+        # 解码按格式标记识别，与当前配置无关
+        assert codec.loads(data) == SMALL
+        assert codec.loads(json.dumps(SMALL)) == SMALL
+    finally:
+        codec.configure_codec("json")
@@ -0,0 +1,45 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database.database import Base
+from app.models.meta import Meta, MetaVersion
+from app.core.config_service import ConfigService, bump_version, VERSION_ROW_ID
+
+
+def _sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'config.db'}")
+    Base.metadata.create_all(engine, tables=[Meta.__table__, MetaVersion.__table__])
+    return sessionmaker(bind=engine)
+
+
+def test_bump_version_creates_row_once(tmp_path):
+    Session = _sessions(tmp_path)
+    first, second = Session(), Session()
+    try:
+        # 两个会话都在版本行不存在时开始修改
+        bump_version(first)
+        first.commit()
+        bump_version(second)
+        second.commit()
+        assert second.get(MetaVersion, VERSION_ROW_ID).version == 2
+    finally:
+        first.close()
+        second.close()
+
+
+def test_reads_through_callers_session(tmp_path):
+    Session = _sessions(tmp_path)
+    db = Session()
+    try:
+        db.add(Meta(key="qwen_token", value="from-meta"))
+        bump_version(db)
+        db.commit()
+        service = ConfigService(check_interval=0)
+        assert service.secret("qwen_token", "QwenToken", db=db) == "from-meta"
+
+        db.query(Meta).filter(Meta.key == "qwen_token").update({Meta.value: "changed"})
+        bump_version(db)
+        db.commit()
+        assert service.get("qwen_token", db=db) == "changed"
+        assert service.reloads == 2
+    finally:
+        db.close()
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution import ExecutionStatus
+from app.models.execution_history import ExecutionHistory
+from app.models.variable import Variable
+from app.core.http_client import close_http_session
+from app.core.workflow_engine import WorkflowEngine
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.workflows import _start, _agent, _end, _edge
+
+LATENCY_MS = 500
+
+
+def _slow_agent_workflow(node_timeout=None):
+    agent = _agent("agent", "slow {{ q }}", "answer")
+    if node_timeout:
+        agent["data"]["config"]["timeoutSeconds"] = node_timeout
+    return {
+        "nodes": [_start({"q": "hi"}), agent, _end(), _end("fallback")],
+        "edges": [_edge("start", "agent"), _edge("agent", "end"), _edge("agent", "fallback", "error")],
+    }
+
+
+def _run(monkeypatch, db, config, timeout_seconds=None):
+    monkeypatch.setenv("QwenToken", "mock-token")
+
+    async def main():
+        server = MockLLMServer(MockLLMConfig(latency_ms=LATENCY_MS, jitter_ms=0))
+        await server.start()
+        monkeypatch.setenv("QWEN_BASE_URL", server.base_url)
+        try:
+            workflow = Workflow(name="deadline", config=json.dumps(config))
+            db.add(workflow)
+            db.commit()
+            execution = Execution(workflow_id=workflow.id, timeout_seconds=timeout_seconds)
+            db.add(execution)
+            db.commit()
+            try:
+                await WorkflowEngine(db).execute_workflow(execution.id, {})
+            except Exception:
+                pass
+            return execution
+        finally:
+            await close_http_session()
+            await server.stop()
+
+    execution = asyncio.run(main())
+    db.refresh(execution)
+    visited = [h.node_id for h in db.query(ExecutionHistory)
+               .filter(ExecutionHistory.execution_id == execution.id).order_by(ExecutionHistory.id)]
+    return execution, visited
+
+
+def test_node_timeout_takes_error_edge(monkeypatch):
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        execution, visited = _run(monkeypatch, db, _slow_agent_workflow(node_timeout=0.1))
+        assert execution.status == ExecutionStatus.COMPLETED, execution.error_message
+        assert visited == ["start", "agent", "fallback"]
+        error = db.query(Variable.value).filter(
+            Variable.execution_id == execution.id, Variable.name == "last_error"
+        ).scalar()
+        assert "timed out" in error
+    finally:
+        db.close()
+
+
+def test_execution_deadline_fails_run(monkeypatch):
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        # 执行时限先于节点时限耗尽：执行失败，不走错误分支
+        execution, visited = _run(monkeypatch, db, _slow_agent_workflow(node_timeout=5), timeout_seconds=0.2)
+        assert execution.status == ExecutionStatus.FAILED
+        assert execution.error_message == "Execution deadline exceeded"
+        assert "fallback" not in visited
+    finally:
+        db.close()
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import time
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution import ExecutionStatus
+from app.models.execution_history import ExecutionHistory
+from app.models.variable import Variable
+from app.core.http_client import close_http_session
+from app.core.workflow_engine import WorkflowEngine
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.workflows import _start, _agent, _end, _edge, _node
+
+LATENCY_MS = 200
+
+
+def test_stream_results_runs_each_subgraph_concurrently(monkeypatch):
+    monkeypatch.setenv("QwenToken", "mock-token")
+    ensure_schema(engine)
+    db = SessionLocal()
+    foreach = _node("fe", "foreach", {
+        "listVariable": "docs", "itemVariable": "doc", "resultVariable": "summary",
+        "outputVariable": "summaries", "maxConcurrency": 4, "streamResults": True,
+    })
+    config = {
+        "nodes": [
+            _start({"docs": ["a", "b", "c", "d"]}), foreach,
+            _agent("body", "summarize {{ doc }}", "summary"),
+            _agent("each", "review {{ result }}", "review"),
+            _end(),
+        ],
+        "edges": [
+            _edge("start", "fe"), _edge("fe", "body", "body"), _edge("fe", "each", "each"), _edge("fe", "end", "done"),
+        ],
+    }
+
+    async def main():
+        server = MockLLMServer(MockLLMConfig(latency_ms=LATENCY_MS, jitter_ms=0))
+        await server.start()
+        monkeypatch.setenv("QWEN_BASE_URL", server.base_url)
+        try:
+            workflow = Workflow(name="stream", config=json.dumps(config))
+            db.add(workflow)
+            db.commit()
+            execution = Execution(workflow_id=workflow.id)
+            db.add(execution)
+            db.commit()
+            started = time.perf_counter()
+            await WorkflowEngine(db).execute_workflow(execution.id, {})
+            return execution, time.perf_counter() - started, server.stats.requests
+        finally:
+            await close_http_session()
+            await server.stop()
+
+    try:
+        execution, elapsed, requests = asyncio.run(main())
+        db.refresh(execution)
+        assert execution.status == ExecutionStatus.COMPLETED, execution.error_message
+        assert requests == 8
+        # 串行执行each子图至少需要 (1 + 4) * 延迟
+        assert elapsed < 4 * LATENCY_MS / 1000
+
+        # 每个迭代在自己的会话中写入的历史记录都已提交
+        history = db.query(ExecutionHistory).filter(
+            ExecutionHistory.execution_id == execution.id, ExecutionHistory.parent_node_id == "fe"
+        ).all()
+        assert sorted((h.node_id, h.iteration_index) for h in history) == sorted(
+            [("body", i) for i in range(4)] + [("each", i) for i in range(4)]
+        )
+        summaries = db.query(Variable).filter(
+            Variable.execution_id == execution.id, Variable.name == "summaries"
+        ).one()
+        assert all(json.loads(summaries.value))
+    finally:
+        db.close()
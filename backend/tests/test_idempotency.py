@@ -0,0 +1,89 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException, Response
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow
+from app.models.idempotency import RequestKeyKind
+from app.models.schemas import WorkflowExecuteRequest
+from app.core.idempotency import RequestKeyStore, memo_key
+from app.api import execution as execution_api
+from benchmarks.workflows import _start, _end, _edge
+
+
+class _Tasks:
+    """记录启动的执行，不在后台运行"""
+
+    def __init__(self):
+        self.started = []
+
+    def start(self, execution_id, workflow_id, coroutine):
+        coroutine.close()
+        self.started.append(execution_id)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    ensure_schema(engine)
+    tasks = _Tasks()
+    monkeypatch.setattr(execution_api, "execution_tasks", tasks)
+    db = SessionLocal()
+    workflow = Workflow(name="idempotent", config=json.dumps({
+        "nodes": [_start({}), _end()], "edges": [_edge("start", "end")]
+    }))
+    db.add(workflow)
+    db.commit()
+
+    def execute(body, idempotency_key=None, cache_control=None):
+        response = Response()
+        execution = asyncio.run(execution_api.execute_workflow(
+            workflow.id, WorkflowExecuteRequest(**body), response, db,
+            idempotency_key=idempotency_key, cache_control=cache_control
+        ))
+        return execution.id, response.headers.get("X-Execution-Reused")
+
+    try:
+        yield db, workflow, tasks, execute
+    finally:
+        db.close()
+
+
+def test_same_idempotency_key_returns_same_execution(api):
+    db, workflow, tasks, execute = api
+    first, reused = execute({"variables": {"q": 1}}, idempotency_key="key-1")
+    assert reused is None
+    assert execute({"variables": {"q": 1}}, idempotency_key="key-1") == (first, "idempotency")
+    assert tasks.started == [first]
+
+    with pytest.raises(HTTPException) as error:
+        execute({"variables": {"q": 2}}, idempotency_key="key-1")
+    assert error.value.status_code == 409
+
+
+def test_memoize_reuses_until_ttl_or_bypass(api):
+    db, workflow, tasks, execute = api
+    body = {"variables": {"b": 1, "a": [1, 2]}, "memoize": True}
+    first, _ = execute(body)
+    # 变量顺序不同也命中
+    assert execute({"variables": {"a": [1, 2], "b": 1}, "memoize": True}) == (first, "memo")
+
+    refreshed, reused = execute({**body, "refresh": True})
+    assert refreshed != first and reused is None
+    no_cache, reused = execute(body, cache_control="no-cache")
+    assert no_cache not in (first, refreshed) and reused is None
+    # 绕过后的新执行成为记忆化结果
+    assert execute(body) == (no_cache, "memo")
+
+    # 过期后不再命中
+    key = memo_key(workflow, body["variables"])
+    later = datetime.utcnow() + timedelta(hours=2)
+    keys = RequestKeyStore(db)
+    assert keys.lookup(workflow.id, RequestKeyKind.MEMO, key) is not None
+    assert keys.lookup(workflow.id, RequestKeyKind.MEMO, key, now=later) is None
+
+    execute({"variables": {"z": 1}, "memoize": True, "memo_ttl_seconds": 60})
+    short_key = memo_key(workflow, {"z": 1})
+    assert keys.lookup(workflow.id, RequestKeyKind.MEMO, short_key,
+                       now=datetime.utcnow() + timedelta(seconds=61)) is None
@@ -0,0 +1,56 @@
+import asyncio
+import json
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution import ExecutionStatus
+from app.models.execution_history import ExecutionHistory
+from app.core.http_client import close_http_session
+from app.core.workflow_engine import WorkflowEngine
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.workflows import _start, _agent, _end, _edge
+
+
+def test_node_cache_hits_unchanged_inputs_and_misses_changed(monkeypatch):
+    monkeypatch.setenv("QwenToken", "mock-token")
+    ensure_schema(engine)
+    db = SessionLocal()
+    config = {
+        "nodes": [_start({}), _agent("agent", "summarize {{ doc }}", "summary"), _end()],
+        "edges": [_edge("start", "agent"), _edge("agent", "end")],
+    }
+
+    async def main():
+        server = MockLLMServer(MockLLMConfig(latency_ms=10, jitter_ms=0))
+        await server.start()
+        monkeypatch.setenv("QWEN_BASE_URL", server.base_url)
+        try:
+            workflow = Workflow(name="node-cache", config=json.dumps(config))
+            db.add(workflow)
+            db.commit()
+            runs = []
+            for doc in ("first", "first", "second"):
+                execution = Execution(workflow_id=workflow.id, node_cache=True)
+                db.add(execution)
+                db.commit()
+                await WorkflowEngine(db).execute_workflow(execution.id, {"doc": doc})
+                runs.append((execution, server.stats.requests))
+            return runs
+        finally:
+            await close_http_session()
+            await server.stop()
+
+    try:
+        runs = asyncio.run(main())
+        hits = []
+        for execution, _ in runs:
+            db.refresh(execution)
+            assert execution.status == ExecutionStatus.COMPLETED, execution.error_message
+            hits.append(db.query(ExecutionHistory.cache_hit).filter(
+                ExecutionHistory.execution_id == execution.id, ExecutionHistory.node_id == "agent"
+            ).scalar())
+        # 输入未变化时复用上次的输出，不再请求模型；输入变化时重新执行
+        assert [bool(hit) for hit in hits] == [False, True, False]
+        assert [requests for _, requests in runs] == [1, 1, 2]
+    finally:
+        db.close()
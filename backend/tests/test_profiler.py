@@ -0,0 +1,63 @@
+import asyncio
+import time
+import tracemalloc
+from app.core.profiler import ExecutionProfiler, profile_section, _current_profiler
+
+
+def _busy(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+async def _node(profiler, node_id, work):
+    profiler.start_node(node_id, "agent")
+    await profiler.timed(work())
+    profiler.end_node("success")
+
+
+def test_overlapping_profilers_share_tracemalloc():
+    async def main():
+        first = ExecutionProfiler(1, "execute")
+        second = ExecutionProfiler(2, "execute")
+        first.start()
+        second.start()
+        # 先开始的剖析先结束，仍在剖析的执行可以继续取快照
+        first.finish()
+        assert tracemalloc.is_tracing()
+        second.finish()
+        assert not tracemalloc.is_tracing()
+        assert second.summary["execution_id"] == 2
+
+    asyncio.run(main())
+
+
+def test_concurrent_nodes_keep_separate_timing():
+    async def main():
+        profiler = ExecutionProfiler(1, "execute")
+        token = _current_profiler.set(profiler)
+        profiler.start()
+
+        async def cpu_bound():
+            for _ in range(5):
+                _busy(0.02)
+                await asyncio.sleep(0)
+
+        async def waiting():
+            with profile_section("network"):
+                await asyncio.sleep(0.15)
+
+        await asyncio.gather(
+            asyncio.create_task(_node(profiler, "busy", cpu_bound)),
+            asyncio.create_task(_node(profiler, "idle", waiting)),
+        )
+        profiler.finish()
+        _current_profiler.reset(token)
+        return {node["node_id"]: node for node in profiler.nodes}
+
+    nodes = asyncio.run(main())
+    assert nodes["busy"]["cpu_seconds"] >= 0.08
+    # 另一个节点的CPU时间不计入等待中的节点
+    assert nodes["idle"]["cpu_seconds"] < 0.03
+    assert nodes["idle"]["network_seconds"] >= 0.1
+    assert nodes["busy"]["network_seconds"] == 0.0
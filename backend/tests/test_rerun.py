@@ -0,0 +1,100 @@
+import asyncio
+import json
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution import ExecutionStatus
+from app.models.execution_history import ExecutionHistory
+from app.models.schemas import RerunFromNodeRequest
+from app.models.variable import Variable
+from app.core.http_client import close_http_session
+from app.core.workflow_compiler import compile_workflow
+from app.core.workflow_engine import WorkflowEngine
+from app.api import execution as execution_api
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.workflows import _start, _agent, _end, _edge
+
+
+class _Tasks:
+    """保存启动的执行，由测试自己运行"""
+
+    def __init__(self):
+        self.coroutines = []
+
+    def start(self, execution_id, workflow_id, coroutine):
+        self.coroutines.append(coroutine)
+
+
+def _history(db, execution_id):
+    return db.query(ExecutionHistory).filter(
+        ExecutionHistory.execution_id == execution_id
+    ).order_by(ExecutionHistory.id).all()
+
+
+def _variables(db, execution_id):
+    return {v.name: v.value for v in db.query(Variable).filter(Variable.execution_id == execution_id)}
+
+
+def test_rerun_copies_history_and_applies_overrides(monkeypatch):
+    monkeypatch.setenv("QwenToken", "mock-token")
+    tasks = _Tasks()
+    monkeypatch.setattr(execution_api, "execution_tasks", tasks)
+    ensure_schema(engine)
+    db = SessionLocal()
+    config = {
+        "nodes": [
+            _start({"topic": "cats"}),
+            _agent("draft", "write about {{ topic }}", "draft_text"),
+            _agent("review", "review {{ draft_text }} about {{ topic }}", "review_text"),
+            _end(),
+        ],
+        "edges": [_edge("start", "draft"), _edge("draft", "review"), _edge("review", "end")],
+    }
+
+    async def main():
+        server = MockLLMServer(MockLLMConfig(latency_ms=10, jitter_ms=0))
+        await server.start()
+        monkeypatch.setenv("QWEN_BASE_URL", server.base_url)
+        try:
+            workflow = Workflow(name="rerun", config=json.dumps(config))
+            db.add(workflow)
+            db.commit()
+            compile_workflow(workflow, db)
+            source = Execution(workflow_id=workflow.id, workflow_version=workflow.config_hash)
+            db.add(source)
+            db.commit()
+            await WorkflowEngine(db).execute_workflow(source.id, {})
+            source_requests = server.stats.requests
+
+            rerun = await execution_api.rerun_from_node(
+                source.id, "review", RerunFromNodeRequest(variables={"topic": "dogs"}), db
+            )
+            copied = [(h.node_id, h.status) for h in _history(db, rerun.id)]
+            variables = _variables(db, rerun.id)
+            await tasks.coroutines.pop()
+            return source, rerun, copied, variables, server.stats.requests - source_requests
+        finally:
+            await close_http_session()
+            await server.stop()
+
+    try:
+        source, rerun, copied, variables, rerun_requests = asyncio.run(main())
+        db.refresh(source)
+        db.refresh(rerun)
+        assert source.status == ExecutionStatus.COMPLETED, source.error_message
+        source_history = _history(db, source.id)
+
+        # 起始节点之前的历史原样复制，变量来自快照，请求中的变量覆盖快照
+        assert copied == [(h.node_id, h.status) for h in source_history[:2]]
+        assert variables["topic"] == "dogs"
+        assert variables["draft_text"] == _variables(db, source.id)["draft_text"]
+        assert rerun.rerun_of_execution_id == source.id and rerun.workflow_version == source.workflow_version
+
+        # 只重新执行起始节点及之后的节点
+        assert rerun.status == ExecutionStatus.COMPLETED, rerun.error_message
+        assert [h.node_id for h in _history(db, rerun.id)] == ["start", "draft", "review", "end"]
+        assert rerun_requests == 1
+        review = _history(db, rerun.id)[2]
+        assert "about dogs" in review.agent_prompt
+    finally:
+        db.close()
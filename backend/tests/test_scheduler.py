@@ -0,0 +1,125 @@
+import asyncio
+import time
+from app.core import scheduler as scheduler_module
+from app.core.scheduler import FairScheduler, TenantQuota, LANE_BULK, LANE_INTERACTIVE
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _hold(scheduler, tenant, lane, started, release):
+    async with scheduler.slot(tenant, lane):
+        started.append(tenant)
+        await release.wait()
+
+
+def test_cancel_while_queued_does_not_leak_slot():
+    async def main():
+        scheduler = FairScheduler(max_concurrency=1, quotas={})
+        release = asyncio.Event()
+        started = []
+        running = asyncio.create_task(_hold(scheduler, "workflow:1", LANE_INTERACTIVE, started, release))
+        queued = asyncio.create_task(_hold(scheduler, "workflow:1", LANE_INTERACTIVE, started, release))
+        await asyncio.sleep(0)
+        assert started == ["workflow:1"]
+
+        # 与停止工作流的接口一样，在同一轮事件循环中取消运行中和排队中的执行
+        running.cancel()
+        queued.cancel()
+        results = await asyncio.gather(running, queued, return_exceptions=True)
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+        assert scheduler.stats() == {
+            LANE_INTERACTIVE: {"running": 0, "queued": 0},
+            LANE_BULK: {"running": 0, "queued": 0},
+        }
+
+        # 之后的执行仍能获得名额
+        release.set()
+        await asyncio.wait_for(_hold(scheduler, "workflow:2", LANE_INTERACTIVE, started, release), 1)
+        assert started[-1] == "workflow:2"
+
+    run(main())
+
+
+def test_cancel_queued_waiter_then_release_same_iteration():
+    async def main():
+        scheduler = FairScheduler(max_concurrency=1, quotas={})
+        release = asyncio.Event()
+        started = []
+        running = asyncio.create_task(_hold(scheduler, "a", LANE_INTERACTIVE, started, release))
+        queued = asyncio.create_task(_hold(scheduler, "b", LANE_INTERACTIVE, started, release))
+        later = asyncio.create_task(_hold(scheduler, "c", LANE_INTERACTIVE, started, release))
+        await asyncio.sleep(0)
+
+        queued.cancel()
+        release.set()
+        await asyncio.gather(running, later, queued, return_exceptions=True)
+        assert started == ["a", "c"]
+        assert scheduler.stats()[LANE_INTERACTIVE] == {"running": 0, "queued": 0}
+
+    run(main())
+
+
+def test_bulk_lane_leaves_reserved_slots_for_interactive():
+    async def main():
+        scheduler = FairScheduler(max_concurrency=3, interactive_reserved=1, quotas={})
+        release = asyncio.Event()
+        started = []
+        bulk = [asyncio.create_task(_hold(scheduler, "batch", LANE_BULK, started, release)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()[LANE_BULK] == {"running": 2, "queued": 3}
+
+        interactive = asyncio.create_task(_hold(scheduler, "user", LANE_INTERACTIVE, started, release))
+        await asyncio.sleep(0)
+        assert "user" in started
+        assert scheduler.stats()[LANE_INTERACTIVE]["running"] == 1
+
+        release.set()
+        await asyncio.gather(interactive, *bulk)
+        assert scheduler.stats()[LANE_BULK] == {"running": 0, "queued": 0}
+
+    run(main())
+
+
+def test_weighted_fair_order():
+    async def main():
+        scheduler = FairScheduler(max_concurrency=1, quotas={"a": TenantQuota(weight=3), "b": TenantQuota(weight=1)})
+        order = []
+        gate = asyncio.Event()
+
+        async def job(tenant):
+            async with scheduler.slot(tenant):
+                order.append(tenant)
+                await gate.wait()
+
+        blocker = asyncio.create_task(job("x"))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(job(t)) for t in "aaaa" + "bbbb"]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        # 权重3:1，前4个准入中a占3个
+        assert sorted(order[1:5]) == ["a", "a", "a", "b"]
+
+    run(main())
+
+
+def test_token_quota_delays_admission_until_window_frees(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "TOKEN_WINDOW_SECONDS", 0.2)
+
+    async def main():
+        scheduler = FairScheduler(max_concurrency=0, quotas={"t": TenantQuota(tokens_per_minute=100)})
+        scheduler.charge_tokens(150, tenant="t")
+        admitted = []
+
+        async def job():
+            async with scheduler.slot("t"):
+                admitted.append(time.monotonic())
+
+        started = time.monotonic()
+        await asyncio.wait_for(job(), 2)
+        assert admitted[0] - started >= 0.15
+        assert scheduler.tokens_used("t") == 0
+
+    run(main())
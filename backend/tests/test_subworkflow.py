@@ -0,0 +1,96 @@
+import asyncio
+import json
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution import ExecutionStatus
+from app.models.variable import Variable
+from app.core.workflow_engine import WorkflowEngine
+from benchmarks.workflows import _start, _end, _edge, _node
+
+
+def _subworkflow(node_id, callee_id, output_mapping):
+    return _node(node_id, "subworkflow", {
+        "workflowId": callee_id,
+        "mode": "inline",
+        "inputMapping": {"text": "doc"},
+        "outputMapping": output_mapping,
+        "memoize": True,
+    })
+
+
+def test_memo_hit_with_different_output_mapping_returns_mapped_outputs():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        callee = {
+            "nodes": [_start({"first": "one", "second": "two"}), _end()],
+            "edges": [_edge("start", "end")],
+        }
+        callee_workflow = Workflow(name="callee", config=json.dumps(callee))
+        db.add(callee_workflow)
+        db.commit()
+
+        # 两个节点输入相同，但映射回父执行的子变量不同
+        parent = {
+            "nodes": [
+                _start({"doc": "same input"}),
+                _subworkflow("sub_a", callee_workflow.id, {"parent_first": "first"}),
+                _subworkflow("sub_b", callee_workflow.id, {"parent_second": "second"}),
+                _end(),
+            ],
+            "edges": [_edge("start", "sub_a"), _edge("sub_a", "sub_b"), _edge("sub_b", "end")],
+        }
+        parent_workflow = Workflow(name="parent", config=json.dumps(parent))
+        db.add(parent_workflow)
+        db.commit()
+        execution = Execution(workflow_id=parent_workflow.id)
+        db.add(execution)
+        db.commit()
+
+        asyncio.run(WorkflowEngine(db).execute_workflow(execution.id, {}))
+
+        db.refresh(execution)
+        assert execution.status == ExecutionStatus.COMPLETED, execution.error_message
+        values = {
+            v.name: v.value
+            for v in db.query(Variable).filter(Variable.execution_id == execution.id)
+        }
+        assert values["parent_first"] == "one"
+        assert values["parent_second"] == "two"
+    finally:
+        db.close()
+
+
+def test_indirect_recursion_detected_on_first_return_to_root():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        caller = Workflow(name="a", config="{}")
+        callee = Workflow(name="b", config="{}")
+        db.add_all([caller, callee])
+        db.commit()
+
+        def calls(target):
+            sub = _node("sub", "subworkflow", {"workflowId": target.id, "mode": "child"})
+            return json.dumps({"nodes": [_start({}), sub, _end()], "edges": [_edge("start", "sub"), _edge("sub", "end")]})
+
+        # a -> b -> a
+        caller.config = calls(callee)
+        callee.config = calls(caller)
+        db.commit()
+        execution = Execution(workflow_id=caller.id)
+        db.add(execution)
+        db.commit()
+
+        asyncio.run(WorkflowEngine(db).execute_workflow(execution.id, {}))
+
+        db.refresh(execution)
+        assert execution.status == ExecutionStatus.FAILED
+        children = db.query(Execution).filter(Execution.parent_execution_id == execution.id).all()
+        assert [child.workflow_id for child in children] == [callee.id]
+        assert "Recursive sub-workflow call" in children[0].error_message
+        # 没有再为a创建下一层子执行
+        assert db.query(Execution).filter(Execution.parent_execution_id == children[0].id).count() == 0
+    finally:
+        db.close()
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution_history import ExecutionHistory
+from app.core.http_client import close_http_session
+from app.core.tokens import SummaryFailed, count_tokens, summarize, truncate_middle
+from app.core.workflow_engine import WorkflowEngine
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.workflows import _start, _agent, _end, _edge
+
+TEXT = " ".join(f"word{i}" for i in range(400))
+
+
+def test_truncate_middle_keeps_head_and_tail_within_budget():
+    result = truncate_middle(TEXT, 60)
+    assert count_tokens(result) <= 60
+    assert result.startswith("word0 ") and result.endswith("word399")
+    assert "省略" in result
+
+
+def test_truncate_middle_smaller_than_marker_hard_truncates():
+    for budget in (1, 3, 5):
+        result = truncate_middle(TEXT, budget)
+        assert 0 < count_tokens(result) <= budget
+        assert TEXT.startswith(result)
+
+
+def test_failed_summary_falls_back_to_truncation():
+    calls = []
+
+    async def summarizer(prompt, limit):
+        calls.append(prompt)
+        if len(calls) == 2:
+            raise SummaryFailed("[千问API错误] HTTP 500: boom")
+        return "summary"
+
+    result = asyncio.run(summarize(TEXT * 4, 300, "", summarizer))
+    assert len(calls) == 2
+    assert "HTTP 500" not in result and "summary" not in result
+    assert result == truncate_middle(TEXT * 4, 300, "")
+
+
+def test_agent_summary_errors_are_not_sent_as_prompt(monkeypatch):
+    monkeypatch.setenv("QwenToken", "mock-token")
+    ensure_schema(engine)
+    db = SessionLocal()
+    agent = _agent("agent", "{{ doc }}", "answer")
+    agent["data"]["config"].update({"maxPromptTokens": 300, "truncationStrategy": "summarize"})
+    config = {
+        "nodes": [_start({"doc": TEXT * 4}), agent, _end()],
+        "edges": [_edge("start", "agent"), _edge("agent", "end")],
+    }
+
+    async def main():
+        # 模型调用全部失败：摘要失败后改为截断，提示词中不应出现错误信息
+        server = MockLLMServer(MockLLMConfig(latency_ms=0, jitter_ms=0, failure_rate=1.0))
+        await server.start()
+        monkeypatch.setenv("QWEN_BASE_URL", server.base_url)
+        try:
+            workflow = Workflow(name="summary-fallback", config=json.dumps(config))
+            db.add(workflow)
+            db.commit()
+            execution = Execution(workflow_id=workflow.id)
+            db.add(execution)
+            db.commit()
+            await WorkflowEngine(db).execute_workflow(execution.id, {})
+            return execution
+        finally:
+            await close_http_session()
+            await server.stop()
+
+    try:
+        execution = asyncio.run(main())
+        record = db.query(ExecutionHistory).filter(
+            ExecutionHistory.execution_id == execution.id, ExecutionHistory.node_id == "agent"
+        ).one()
+        assert record.agent_prompt == truncate_middle(TEXT * 4, 300, "qwen-turbo")
+    finally:
+        db.close()
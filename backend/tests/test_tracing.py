@@ -0,0 +1,37 @@
+from app.core.tracing import SpanExporter, Tracer
+
+
+class _Collect(SpanExporter):
+    def __init__(self):
+        self.batches = []
+
+    def export(self, spans):
+        self.batches.append([span.name for span in spans])
+
+
+def test_span_ending_after_root_is_exported_alone():
+    exporter = _Collect()
+    tracer = Tracer(exporter)
+    with tracer.span("root"):
+        with tracer.span("child"):
+            pass
+        late = tracer.start_span("late")
+    tracer.end_span(late)
+
+    assert exporter.batches == [["child", "root"], ["late"]]
+    assert tracer._pending == {} and tracer._open_roots == {}
+
+
+def test_new_root_in_same_trace_collects_children_again():
+    exporter = _Collect()
+    tracer = Tracer(exporter)
+    with tracer.span("execute") as root:
+        with tracer.span("node"):
+            pass
+    # 继续执行沿用原来的trace
+    with tracer.span("continue", trace_id=root.trace_id):
+        with tracer.span("node"):
+            pass
+
+    assert exporter.batches == [["node", "execute"], ["node", "continue"]]
+    assert tracer._pending == {} and tracer._open_roots == {}
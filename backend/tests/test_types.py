@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+from app.database.types import CompressedText, ZLIB_MARKER
+
+LONG = "长文本" * 500
+
+
+def _table():
+    return Table("compressed", MetaData(), Column("id", Integer, primary_key=True), Column("value", CompressedText))
+
+
+def test_sqlite_keeps_text_column_with_mixed_rows(tmp_path):
+    table = _table()
+    engine = create_engine(f"sqlite:///{tmp_path / 'types.db'}")
+    table.metadata.create_all(engine)
+    assert "value TEXT" in str(CreateTable(table).compile(engine))
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [{"id": 1, "value": "short"}, {"id": 2, "value": LONG}])
+        raw = dict(conn.exec_driver_sql("SELECT id, value FROM compressed").all())
+        values = dict(conn.execute(select(table.c.id, table.c.value)).all())
+    assert raw[1] == "short" and raw[2].startswith(ZLIB_MARKER)
+    assert values == {1: "short", 2: LONG}
+
+
+def test_other_dialects_use_binary_column():
+    table = _table()
+    dialect = postgresql.dialect()
+    assert "value BYTEA" in str(CreateTable(table).compile(dialect=dialect))
+    column_type = table.c.value.type
+    # 未压缩的短文本也按二进制写入，读取时还原为文本
+    short = column_type.process_bind_param("short", dialect)
+    assert short == b"short"
+    assert column_type.process_result_value(short, dialect) == "short"
+    compressed = column_type.process_bind_param(LONG, dialect)
+    assert compressed.startswith(ZLIB_MARKER)
+    assert column_type.process_result_value(compressed, dialect) == LONG
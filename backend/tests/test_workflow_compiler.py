@@ -0,0 +1,50 @@
+import asyncio
+import json
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution import ExecutionStatus
+from app.core.workflow_compiler import compile_workflow, errors_of
+from app.core.workflow_engine import WorkflowEngine
+from benchmarks.workflows import _start, _end, _edge, _node
+
+
+def _if_workflow(edges):
+    nodes = [_start({"n": 1}), _node("check", "if", {"condition": "{{ n }} > 5"}), _end()]
+    return Workflow(name="if", config=json.dumps({"nodes": nodes, "edges": edges}))
+
+
+def test_if_without_false_branch_is_a_warning_and_runs():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        workflow = _if_workflow([_edge("start", "check"), _edge("check", "end", "true")])
+        db.add(workflow)
+        db.commit()
+        result = compile_workflow(workflow, db)
+        db.commit()
+        assert errors_of(result.diagnostics) == []
+        assert any(d["code"] == "missing_branch" and d["severity"] == "warning" for d in result.diagnostics)
+
+        # 条件不成立时没有后续节点，执行正常结束
+        execution = Execution(workflow_id=workflow.id, workflow_version=workflow.config_hash)
+        db.add(execution)
+        db.commit()
+        asyncio.run(WorkflowEngine(db).execute_workflow(execution.id, {}))
+        db.refresh(execution)
+        assert execution.status == ExecutionStatus.COMPLETED
+    finally:
+        db.close()
+
+
+def test_if_without_true_branch_is_an_error():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        workflow = _if_workflow([_edge("start", "check"), _edge("check", "end", "false")])
+        db.add(workflow)
+        db.commit()
+        errors = errors_of(compile_workflow(workflow, db).diagnostics)
+        assert [e["code"] for e in errors] == ["missing_branch"]
+    finally:
+        db.close()
@@ -0,0 +1,100 @@
+import asyncio
+import json
+from sqlalchemy import create_engine, inspect, text
+from app.database.database import Base, SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow
+from app.core.workflow_compiler import compile_workflow
+from app.core.workflow_storage import WorkflowGraphStore
+from app.api.workflows import get_workflow
+from benchmarks.workflows import _start, _agent, _end, _edge
+
+
+def _editor_config(x=100):
+    nodes = [_start({"q": "hi"}), _agent("agent", "{{ q }}", "answer"), _end()]
+    for i, node in enumerate(nodes):
+        node["position"] = {"x": x + i * 200, "y": 50}
+        node["width"] = 180
+        node["data"]["color"] = "blue"
+    edges = [_edge("start", "agent"), _edge("agent", "end")]
+    edges[0]["animated"] = True
+    return {"nodes": nodes, "edges": edges, "viewport": {"x": 0, "y": 0, "zoom": 1.5}}
+
+
+def _saved_workflow(db, editor_config):
+    workflow = Workflow(name="layout", config="{}")
+    db.add(workflow)
+    db.flush()
+    WorkflowGraphStore(db).save(workflow, json.dumps(editor_config))
+    compile_workflow(workflow, db)
+    db.commit()
+    return workflow
+
+
+def test_editor_round_trip_keeps_layout():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        document = _editor_config()
+        workflow = _saved_workflow(db, document)
+        db.expire_all()
+        assert json.loads(workflow.editor_config) == document
+        # 可执行配置不含布局
+        assert "position" not in workflow.config and "viewport" not in workflow.config
+    finally:
+        db.close()
+
+
+def test_moving_nodes_keeps_config_hash():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        workflow = _saved_workflow(db, _editor_config(x=100))
+        config, version = workflow.config, workflow.config_hash
+
+        WorkflowGraphStore(db).save(workflow, json.dumps(_editor_config(x=400)))
+        compile_workflow(workflow, db)
+        db.commit()
+        assert workflow.config == config
+        assert workflow.config_hash == version
+        assert json.loads(workflow.editor_config)["nodes"][0]["position"] == {"x": 400, "y": 50}
+    finally:
+        db.close()
+
+
+def test_external_config_write_resyncs_rows():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        workflow = _saved_workflow(db, _editor_config())
+        # 绕过存储直接修改config：改提示词并删除一条连线
+        config = json.loads(workflow.config)
+        config["nodes"][1]["data"]["config"]["prompt"] = "changed"
+        config["edges"] = config["edges"][:1]
+        db.query(Workflow).filter(Workflow.id == workflow.id).update({Workflow.config: json.dumps(config)})
+        db.commit()
+        db.expire_all()
+
+        refreshed = asyncio.run(get_workflow(workflow.id, db))
+        document = json.loads(refreshed.editor_config)
+        agent = document["nodes"][1]
+        assert agent["data"]["config"]["prompt"] == "changed"
+        # 已有的布局保留
+        assert agent["position"] == {"x": 300, "y": 50} and agent["data"]["color"] == "blue"
+        assert document["viewport"] == {"x": 0, "y": 0, "zoom": 1.5}
+        assert len(document["edges"]) == 1 and document["edges"][0]["animated"] is True
+        assert not WorkflowGraphStore(db).is_stale(refreshed)
+    finally:
+        db.close()
+
+
+def test_ensure_schema_creates_indexes_on_existing_tables(tmp_path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(db_engine)
+    with db_engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_nodes_workflow_node"))
+
+    # 列都已存在，索引仍然补上
+    ensure_schema(db_engine)
+    indexes = {index["name"] for index in inspect(db_engine).get_indexes("nodes")}
+    assert "ix_nodes_workflow_node" in indexes
@@ -0,0 +1,55 @@
+import asyncio
+import json
+from app.database.database import SessionLocal, engine
+from app.database.migrations import ensure_schema
+from app.models import Workflow, Execution
+from app.models.execution import ExecutionStatus
+from app.models.execution_history import ExecutionHistory
+from app.core.workflow_compiler import compile_workflow
+from app.core.workflow_engine import WorkflowEngine
+from app.core.workflow_storage import WorkflowGraphStore
+from benchmarks.workflows import _start, _end, _edge, _node
+
+
+def _config(after_pause):
+    return json.dumps({
+        "nodes": [_start({}), _node("pause", "human_control", {}), _end("end_v1"), _end("end_v2")],
+        "edges": [_edge("start", "pause"), _edge("pause", after_pause)],
+    })
+
+
+def test_paused_run_continues_on_pinned_version():
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        workflow = Workflow(name="pinned", config="{}")
+        db.add(workflow)
+        db.flush()
+        WorkflowGraphStore(db).save(workflow, _config("end_v1"))
+        compile_workflow(workflow, db)
+        db.commit()
+        version = workflow.config_hash
+
+        execution = Execution(workflow_id=workflow.id, workflow_version=version)
+        db.add(execution)
+        db.commit()
+        asyncio.run(WorkflowEngine(db).execute_workflow(execution.id, {}))
+        db.refresh(execution)
+        assert execution.status == ExecutionStatus.PAUSED
+
+        # 暂停期间修改工作流：暂停节点之后改为另一个结束节点
+        WorkflowGraphStore(db).save(workflow, _config("end_v2"))
+        compile_workflow(workflow, db)
+        db.commit()
+        assert workflow.config_hash != version
+
+        asyncio.run(WorkflowEngine(db).continue_execution(execution.id, {}))
+        db.refresh(execution)
+        assert execution.status == ExecutionStatus.COMPLETED, execution.error_message
+        assert execution.workflow_version == version
+        visited = [h.node_id for h in db.query(ExecutionHistory).filter(
+            ExecutionHistory.execution_id == execution.id
+        ).order_by(ExecutionHistory.id)]
+        assert "end_v1" in visited and "end_v2" not in visited
+    finally:
+        db.close()
@@ -843,6 +843,26 @@ const ExecutionView: React.FC<ExecutionViewProps> = ({ workflowId, onReturnToEdi
                                   <span className="font-semibold text-gray-800">
                                     {historyItem.node_name || historyItem.node_id} ({historyItem.node_type})
                                   </span>
+                                  {historyItem.child_execution_ids?.length > 0 && (
+                                    <span className="bg-indigo-100 text-indigo-800 px-2 py-0.5 rounded text-xs">
+                                      Child execution #{historyItem.child_execution_ids.join(', #')}
+                                    </span>
+                                  )}
+                                  {historyItem.parent_node_id && historyItem.iteration_index == null && (
+                                    <span className="bg-indigo-100 text-indigo-800 px-2 py-0.5 rounded text-xs">
+                                      in {historyItem.parent_node_id}
+                                    </span>
+                                  )}
+                                  {historyItem.iteration_index != null && (
+                                    <span className="bg-teal-100 text-teal-800 px-2 py-0.5 rounded text-xs">
+                                      {historyItem.parent_node_id} #{historyItem.iteration_index + 1}
+                                    </span>
+                                  )}
+                                  {historyItem.cache_hit && (
+                                    <span className="bg-green-100 text-green-800 px-2 py-0.5 rounded text-xs">
+                                      Cached{historyItem.time_saved ? ` (saved ${historyItem.time_saved.toFixed(1)}s)` : ''}
+                                    </span>
+                                  )}
                                 </div>
                                 <div className="flex items-center space-x-2 text-sm text-gray-500">
                                   <span>{formatDate(historyItem.started_at)}</span>
@@ -897,7 +917,14 @@ const ExecutionView: React.FC<ExecutionViewProps> = ({ workflowId, onReturnToEdi
                               {/* Agent Conversation */}
                               {historyItem.node_type === 'agent' && historyItem.agent_prompt && historyItem.agent_response && (
                                 <div className="mb-3">
-                                  <div className="text-sm font-medium text-gray-700 mb-2">AI Agent Conversation:</div>
+                                  <div className="text-sm font-medium text-gray-700 mb-2">
+                                    AI Agent Conversation:
+                                    {historyItem.prompt_tokens != null && (
+                                      <span className="ml-2 text-xs font-normal text-gray-500">
+                                        {historyItem.prompt_tokens} prompt / {historyItem.completion_tokens} completion tokens
+                                      </span>
+                                    )}
+                                  </div>
                                   <div className="space-y-3">
                                     {/* User Prompt */}
                                     <div className="flex justify-end">
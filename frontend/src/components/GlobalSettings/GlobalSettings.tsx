@@ -9,6 +9,7 @@ interface GlobalSettingsProps {
 const GlobalSettings: React.FC<GlobalSettingsProps> = ({ isOpen, onClose }) => {
   const [settings, setSettings] = useState({
     openai_token: '',
+    qwen_token: '',
     jira_token: '',
     confluence_token: ''
   });
@@ -29,6 +30,7 @@ const GlobalSettings: React.FC<GlobalSettingsProps> = ({ isOpen, onClose }) => {
       const data = await metaApi.getAllMeta();
       setSettings({
         openai_token: data.openai_token || '',
+        qwen_token: data.qwen_token || '',
         jira_token: data.jira_token || '',
         confluence_token: data.confluence_token || ''
       });
@@ -50,6 +52,9 @@ const GlobalSettings: React.FC<GlobalSettingsProps> = ({ isOpen, onClose }) => {
       if (settings.openai_token.trim()) {
         promises.push(metaApi.createOrUpdateMeta('openai_token', settings.openai_token.trim()));
       }
+      if (settings.qwen_token.trim()) {
+        promises.push(metaApi.createOrUpdateMeta('qwen_token', settings.qwen_token.trim()));
+      }
       if (settings.jira_token.trim()) {
         promises.push(metaApi.createOrUpdateMeta('jira_token', settings.jira_token.trim()));
       }
@@ -107,6 +112,19 @@ const GlobalSettings: React.FC<GlobalSettingsProps> = ({ isOpen, onClose }) => {
                 />
               </div>
               
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-2">
+                  Qwen API Key
+                </label>
+                <input
+                  type="password"
+                  value={settings.qwen_token}
+                  onChange={(e) => handleInputChange('qwen_token', e.target.value)}
+                  placeholder="输入千问API Key（未配置时使用QwenToken环境变量）"
+                  className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+                />
+              </div>
+              
               <div>
                 <label className="block text-sm font-medium text-gray-700 mb-2">
                   Jira API Key
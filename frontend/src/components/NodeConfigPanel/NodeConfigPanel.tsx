@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
-import { WorkflowNode, NodeType, Agent } from '../../types/workflow';
-import { agentApi } from '../../services/api';
+import { WorkflowNode, NodeType, Agent, Workflow } from '../../types/workflow';
+import { agentApi, workflowApi } from '../../services/api';
 import { Variable } from '../../utils/variableExtractor';
 import { JiraConfigPanel } from '../NodeTypes/JiraNode';
 
@@ -134,6 +134,7 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
 }) => {
   const [config, setConfig] = useState<any>({});
   const [agents, setAgents] = useState<Agent[]>([]);
+  const [workflows, setWorkflows] = useState<Workflow[]>([]);
   const [loading, setLoading] = useState(false);
   const [clickedVariable, setClickedVariable] = useState<string | null>(null);
   const [startVariables, setStartVariables] = useState<Array<{id: string, name: string, defaultValue: string, description: string}>>([]);
@@ -144,6 +145,9 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
       if (node.type === NodeType.AGENT) {
         loadAgents();
       }
+      if (node.type === NodeType.SUBWORKFLOW) {
+        loadWorkflows();
+      }
       if (node.type === NodeType.START) {
         // Initialize start variables from config
         const existingVariables = node.data.config?.startVariables || [];
@@ -162,6 +166,18 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
     }
   }, [node]);
 
+  const loadWorkflows = async () => {
+    try {
+      setLoading(true);
+      const data = await workflowApi.getWorkflows();
+      setWorkflows(data);
+    } catch (err) {
+      console.error('Failed to load workflow list:', err);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const loadAgents = async () => {
     try {
       setLoading(true);
@@ -505,7 +521,7 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
             placeholder="qwen-turbo"
           />
           <div className="text-xs text-gray-500 mt-1">
-            Using Qwen large model, requires QwenToken environment variable configuration
+            Using Qwen large model, requires a Qwen API Key in global settings or the QwenToken environment variable
           </div>
         </div>
       )}
@@ -558,6 +574,51 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
           placeholder="agent_output"
         />
       </div>
+
+      <div className="grid grid-cols-2 gap-3">
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">
+            Max Prompt Tokens
+          </label>
+          <input
+            type="number"
+            min={1}
+            value={config.maxPromptTokens !== undefined ? config.maxPromptTokens : ''}
+            onChange={(e) => setConfig({ ...config, maxPromptTokens: e.target.value ? parseInt(e.target.value) : undefined })}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+            placeholder="Model limit"
+          />
+        </div>
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">
+            Max Output Tokens
+          </label>
+          <input
+            type="number"
+            min={1}
+            value={config.maxTokens !== undefined ? config.maxTokens : ''}
+            onChange={(e) => setConfig({ ...config, maxTokens: e.target.value ? parseInt(e.target.value) : undefined })}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+            placeholder="2000"
+          />
+        </div>
+      </div>
+
+      <div>
+        <label className="block text-sm font-medium text-gray-700 mb-1">
+          When Prompt Exceeds Budget
+        </label>
+        <select
+          value={config.truncationStrategy !== undefined ? config.truncationStrategy : 'truncate_middle'}
+          onChange={(e) => setConfig({ ...config, truncationStrategy: e.target.value })}
+          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+        >
+          <option value="truncate_middle">Truncate the middle</option>
+          <option value="drop_oldest">Drop oldest sections</option>
+          <option value="summarize">Summarize first</option>
+          <option value="none">Send as is</option>
+        </select>
+      </div>
     </div>
   );
 
@@ -630,6 +691,193 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
     </div>
   );
 
+  const renderForeachNodeConfig = () => (
+    <div className="space-y-4">
+      <div>
+        <label className="block text-sm font-medium text-gray-700 mb-1">
+          List Variable
+        </label>
+        <input
+          type="text"
+          value={config.listVariable !== undefined ? config.listVariable : ''}
+          onChange={(e) => setConfig({ ...config, listVariable: e.target.value })}
+          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          placeholder="items"
+        />
+        <div className="text-xs text-gray-500 mt-1">
+          Name of a variable holding a JSON list. The 'Body' path runs once per element.
+        </div>
+      </div>
+
+      <div className="grid grid-cols-2 gap-4">
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">
+            Item Variable
+          </label>
+          <input
+            type="text"
+            value={config.itemVariable !== undefined ? config.itemVariable : 'item'}
+            onChange={(e) => setConfig({ ...config, itemVariable: e.target.value })}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          />
+        </div>
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">
+            Index Variable
+          </label>
+          <input
+            type="text"
+            value={config.indexVariable !== undefined ? config.indexVariable : 'index'}
+            onChange={(e) => setConfig({ ...config, indexVariable: e.target.value })}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          />
+        </div>
+      </div>
+
+      <div className="grid grid-cols-2 gap-4">
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">
+            Result Variable
+          </label>
+          <input
+            type="text"
+            value={config.resultVariable !== undefined ? config.resultVariable : ''}
+            onChange={(e) => setConfig({ ...config, resultVariable: e.target.value })}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+            placeholder="Last variable written by the body"
+          />
+        </div>
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">
+            Output Variable
+          </label>
+          <input
+            type="text"
+            value={config.outputVariable !== undefined ? config.outputVariable : 'foreach_results'}
+            onChange={(e) => setConfig({ ...config, outputVariable: e.target.value })}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          />
+        </div>
+      </div>
+
+      <div>
+        <label className="block text-sm font-medium text-gray-700 mb-1">
+          Max Concurrency
+        </label>
+        <input
+          type="number"
+          value={config.maxConcurrency !== undefined ? config.maxConcurrency : 4}
+          onChange={(e) => setConfig({ ...config, maxConcurrency: parseInt(e.target.value) })}
+          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          min="1"
+        />
+      </div>
+
+      <div className="space-y-2">
+        <label className="flex items-center">
+          <input
+            type="checkbox"
+            checked={config.continueOnError === true}
+            onChange={(e) => setConfig({ ...config, continueOnError: e.target.checked })}
+            className="mr-2"
+          />
+          Continue on Error (failed items are recorded as {'{"error": ...}'})
+        </label>
+        <label className="flex items-center">
+          <input
+            type="checkbox"
+            checked={config.streamResults === true}
+            onChange={(e) => setConfig({ ...config, streamResults: e.target.checked })}
+            className="mr-2"
+          />
+          Stream Results (update the output variable and run the 'Each' path as items complete)
+        </label>
+      </div>
+    </div>
+  );
+
+  const formatMapping = (mapping: any) =>
+    typeof mapping === 'string' ? mapping : JSON.stringify(mapping || {}, null, 2);
+
+  const renderSubworkflowNodeConfig = () => (
+    <div className="space-y-4">
+      <div>
+        <label className="block text-sm font-medium text-gray-700 mb-1">
+          Workflow
+        </label>
+        <select
+          value={config.workflowId !== undefined ? config.workflowId : ''}
+          onChange={(e) => setConfig({ ...config, workflowId: e.target.value ? parseInt(e.target.value) : undefined })}
+          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          disabled={loading}
+        >
+          <option value="">Select a workflow...</option>
+          {workflows.map((workflow) => (
+            <option key={workflow.id} value={workflow.id}>
+              {workflow.name} (#{workflow.id})
+            </option>
+          ))}
+        </select>
+      </div>
+
+      <div>
+        <label className="block text-sm font-medium text-gray-700 mb-1">
+          Run Mode
+        </label>
+        <select
+          value={config.mode !== undefined ? config.mode : 'child'}
+          onChange={(e) => setConfig({ ...config, mode: e.target.value })}
+          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+        >
+          <option value="child">Child execution (separate variables and history)</option>
+          <option value="inline">Inline (runs inside this execution)</option>
+        </select>
+      </div>
+
+      <div>
+        <label className="block text-sm font-medium text-gray-700 mb-1">
+          Input Mapping
+        </label>
+        <textarea
+          value={formatMapping(config.inputMapping)}
+          onChange={(e) => setConfig({ ...config, inputMapping: e.target.value })}
+          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 font-mono text-sm"
+          rows={4}
+          placeholder='{"text": "document"}'
+        />
+        <div className="text-xs text-gray-500 mt-1">
+          JSON object of sub-workflow variable to variable name in this workflow (or a Jinja2 template)
+        </div>
+      </div>
+
+      <div>
+        <label className="block text-sm font-medium text-gray-700 mb-1">
+          Output Mapping
+        </label>
+        <textarea
+          value={formatMapping(config.outputMapping)}
+          onChange={(e) => setConfig({ ...config, outputMapping: e.target.value })}
+          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 font-mono text-sm"
+          rows={4}
+          placeholder='{"summary": "final_output"}'
+        />
+        <div className="text-xs text-gray-500 mt-1">
+          JSON object of variable name in this workflow to sub-workflow variable. Defaults to the sub-workflow's final_output.
+        </div>
+      </div>
+
+      <label className="flex items-center">
+        <input
+          type="checkbox"
+          checked={config.memoize === true}
+          onChange={(e) => setConfig({ ...config, memoize: e.target.checked })}
+          className="mr-2"
+        />
+        Reuse results for identical inputs
+      </label>
+    </div>
+  );
+
   const renderEndNodeConfig = () => (
     <div className="space-y-4">
       <div>
@@ -706,6 +954,10 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
         return renderHumanControlNodeConfig();
       case NodeType.JIRA:
         return <JiraConfigPanel data={config} onChange={setConfig} />;
+      case NodeType.FOREACH:
+        return renderForeachNodeConfig();
+      case NodeType.SUBWORKFLOW:
+        return renderSubworkflowNodeConfig();
       case NodeType.END:
         return renderEndNodeConfig();
       default:
@@ -729,6 +981,10 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
         return 'Human Control Node';
       case NodeType.JIRA:
         return 'Jira Node';
+      case NodeType.FOREACH:
+        return 'Foreach Node';
+      case NodeType.SUBWORKFLOW:
+        return 'Sub-workflow Node';
       case NodeType.END:
         return 'End Node';
       default:
@@ -763,6 +1019,25 @@ const NodeConfigPanel: React.FC<NodeConfigPanelProps> = ({
           />
         </div>
 
+        {node.type !== NodeType.START && node.type !== NodeType.END && node.type !== NodeType.HUMAN_CONTROL && (
+          <div className="mb-4">
+            <label className="block text-sm font-medium text-gray-700 mb-1">
+              Timeout (seconds)
+            </label>
+            <input
+              type="number"
+              value={config.timeoutSeconds !== undefined ? config.timeoutSeconds : ''}
+              onChange={(e) => setConfig({ ...config, timeoutSeconds: e.target.value ? parseFloat(e.target.value) : undefined })}
+              className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+              min="0"
+              placeholder="No limit"
+            />
+            <div className="text-xs text-gray-500 mt-1">
+              When the node fails or times out, the workflow follows the node's 'Error' path if connected; the message is available as {'{{last_error}}'}.
+            </div>
+          </div>
+        )}
+
         {renderNodeConfig()}
 
         {/* Variable Selector */}
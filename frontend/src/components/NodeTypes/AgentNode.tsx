@@ -13,7 +13,7 @@ const AgentNode: React.FC<AgentNodeProps> = ({ data, selected }) => {
   return (
     <div className={`px-4 py-2 shadow-md rounded-md bg-blue-100 border-2 ${
       selected ? 'border-blue-600' : 'border-blue-300'
-    }`}>
+    } relative`}>
       {/* Target handles - can receive connections */}
       <Handle
         type="target"
@@ -72,6 +72,18 @@ const AgentNode: React.FC<AgentNodeProps> = ({ data, selected }) => {
         className="w-4 h-4 bg-blue-500 border-2 border-white"
         id="top-out"
       />
+      {/* Error endpoint: taken when the node fails or times out */}
+      <div className="absolute bottom-0 right-2">
+        <Handle
+          type="source"
+          position={Position.Bottom}
+          id="error"
+          className="w-3 h-3 bg-red-500 border-2 border-white"
+        />
+        <div className="absolute top-3 left-1/2 transform -translate-x-1/2 text-xs font-bold text-red-600 bg-white px-1 rounded shadow">
+          Error
+        </div>
+      </div>
     </div>
   );
 };
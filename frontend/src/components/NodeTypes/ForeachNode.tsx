@@ -0,0 +1,85 @@
+import React from 'react';
+import { Handle, Position } from 'reactflow';
+
+interface ForeachNodeProps {
+  data: {
+    label: string;
+    config: any;
+  };
+  selected?: boolean;
+}
+
+const ForeachNode: React.FC<ForeachNodeProps> = ({ data, selected }) => {
+  const listVariable = data.config?.listVariable;
+  const maxConcurrency = data.config?.maxConcurrency || 4;
+
+  return (
+    <div className={`px-4 py-2 shadow-md rounded-md bg-teal-100 border-2 ${
+      selected ? 'border-teal-600' : 'border-teal-300'
+    } relative min-w-[180px]`}>
+      {/* Target handles - can receive connections */}
+      <Handle
+        type="target"
+        position={Position.Top}
+        className="w-4 h-4 bg-teal-500 border-2 border-white"
+        id="top"
+      />
+      <Handle
+        type="target"
+        position={Position.Left}
+        className="w-4 h-4 bg-teal-500 border-2 border-white"
+        id="left"
+      />
+
+      <div className="flex items-center">
+        <div className="ml-2">
+          <div className="text-lg font-bold text-teal-800">{data.label}</div>
+          <div className="text-sm text-teal-600">
+            {listVariable ? `Each of ${listVariable} (x${maxConcurrency})` : 'Foreach Loop'}
+          </div>
+        </div>
+      </div>
+
+      {/* Body endpoint: runs once per element */}
+      <div className="absolute bottom-0 left-1/4 transform -translate-x-1/2">
+        <Handle
+          type="source"
+          position={Position.Bottom}
+          id="body"
+          className="w-4 h-4 bg-teal-500 border-2 border-white"
+        />
+        <div className="absolute top-4 left-1/2 transform -translate-x-1/2 text-xs font-bold text-teal-600 bg-white px-1 rounded shadow">
+          Body
+        </div>
+      </div>
+
+      {/* Each endpoint: runs as each element completes (stream mode) */}
+      <div className="absolute bottom-0 left-1/2 transform -translate-x-1/2">
+        <Handle
+          type="source"
+          position={Position.Bottom}
+          id="each"
+          className="w-4 h-4 bg-blue-500 border-2 border-white"
+        />
+        <div className="absolute top-4 left-1/2 transform -translate-x-1/2 text-xs font-bold text-blue-600 bg-white px-1 rounded shadow">
+          Each
+        </div>
+      </div>
+
+      {/* Done endpoint: continues after all elements complete */}
+      <div className="absolute bottom-0 right-1/4 transform translate-x-1/2">
+        <Handle
+          type="source"
+          position={Position.Bottom}
+          id="done"
+          className="w-4 h-4 bg-green-500 border-2 border-white"
+        />
+        <div className="absolute top-4 left-1/2 transform -translate-x-1/2 text-xs font-bold text-green-600 bg-white px-1 rounded shadow">
+          Done
+        </div>
+      </div>
+    </div>
+  );
+};
+
+export default ForeachNode;
@@ -18,7 +18,7 @@ const JiraNode: React.FC<JiraNodeProps> = ({ data, selected }) => {
   return (
     <div className={`px-4 py-2 shadow-md rounded-md bg-white border-2 min-w-[200px] ${
       selected ? 'border-blue-500' : 'border-gray-300'
-    }`}>
+    } relative`}>
       <Handle type="target" position={Position.Top} />
       
       <div className="flex items-center space-x-2">
@@ -34,6 +34,19 @@ const JiraNode: React.FC<JiraNodeProps> = ({ data, selected }) => {
       </div>
       
       <Handle type="source" position={Position.Bottom} />
+
+      {/* Error endpoint: taken when the node fails or times out */}
+      <div className="absolute bottom-0 right-2">
+        <Handle
+          type="source"
+          position={Position.Bottom}
+          id="error"
+          className="w-3 h-3 bg-red-500 border-2 border-white"
+        />
+        <div className="absolute top-3 left-1/2 transform -translate-x-1/2 text-xs font-bold text-red-600 bg-white px-1 rounded shadow">
+          Error
+        </div>
+      </div>
     </div>
   );
 };
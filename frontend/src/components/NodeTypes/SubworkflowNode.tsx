@@ -0,0 +1,44 @@
+import React from 'react';
+import { Handle, Position } from 'reactflow';
+
+interface SubworkflowNodeProps {
+  data: {
+    label: string;
+    config: any;
+  };
+  selected?: boolean;
+}
+
+const SubworkflowNode: React.FC<SubworkflowNodeProps> = ({ data, selected }) => {
+  const workflowId = data.config?.workflowId;
+  const mode = data.config?.mode || 'child';
+
+  return (
+    <div className={`px-4 py-2 shadow-md rounded-md bg-indigo-100 border-2 ${
+      selected ? 'border-indigo-600' : 'border-indigo-300'
+    }`}>
+      <Handle
+        type="target"
+        position={Position.Top}
+        className="w-4 h-4 bg-indigo-500 border-2 border-white"
+      />
+
+      <div className="flex items-center">
+        <div className="ml-2">
+          <div className="text-lg font-bold text-indigo-800">{data.label}</div>
+          <div className="text-sm text-indigo-600">
+            {workflowId ? `Workflow #${workflowId} (${mode})` : 'Sub-workflow'}
+          </div>
+        </div>
+      </div>
+
+      <Handle
+        type="source"
+        position={Position.Bottom}
+        className="w-4 h-4 bg-indigo-500 border-2 border-white"
+      />
+    </div>
+  );
+};
+
+export default SubworkflowNode;
@@ -21,6 +21,8 @@ import AgentNode from './NodeTypes/AgentNode';
 import IfNode from './NodeTypes/IfNode';
 import HumanControlNode from './NodeTypes/HumanControlNode';
 import JiraNode from './NodeTypes/JiraNode';
+import ForeachNode from './NodeTypes/ForeachNode';
+import SubworkflowNode from './NodeTypes/SubworkflowNode';
 import EndNode from './NodeTypes/EndNode';
 import NodeConfigPanel from './NodeConfigPanel/NodeConfigPanel';
 import VariablePanel from './VariablePanel/VariablePanel';
@@ -34,6 +36,8 @@ const nodeTypes: NodeTypes = {
   if: IfNode,
   human_control: HumanControlNode,
   jira: JiraNode,
+  foreach: ForeachNode,
+  subworkflow: SubworkflowNode,
   end: EndNode,
 };
 
@@ -151,6 +155,10 @@ const WorkflowEditor: React.FC<WorkflowEditorProps> = ({ workflow, onSave, onVie
         return 'Human Control';
       case NodeType.JIRA:
         return 'Jira';
+      case NodeType.FOREACH:
+        return 'Foreach';
+      case NodeType.SUBWORKFLOW:
+        return 'Sub-workflow';
       case NodeType.END:
         return 'End';
       default:
@@ -180,6 +188,23 @@ const WorkflowEditor: React.FC<WorkflowEditorProps> = ({ workflow, onSave, onVie
           jiraKeys: '',
           outputVariable: 'jira_output'
         };
+      case NodeType.FOREACH:
+        return {
+          listVariable: '',
+          itemVariable: 'item',
+          indexVariable: 'index',
+          outputVariable: 'foreach_results',
+          maxConcurrency: 4,
+          continueOnError: false,
+          streamResults: false
+        };
+      case NodeType.SUBWORKFLOW:
+        return {
+          mode: 'child',
+          inputMapping: {},
+          outputMapping: {},
+          memoize: false
+        };
       case NodeType.END:
         return { outputFormat: 'json', successCode: 200 };
       default:
@@ -260,7 +285,16 @@ const WorkflowEditor: React.FC<WorkflowEditorProps> = ({ workflow, onSave, onVie
         onSave(updatedWorkflow);
       }
 
-      alert('Workflow saved successfully!');
+      const diagnostics = updatedWorkflow.diagnostics || [];
+      if (diagnostics.length > 0) {
+        const lines = diagnostics.map(d =>
+          `[${d.severity}] ${d.node_id ? `${d.node_id}: ` : ''}${d.message}`
+        );
+        const hasErrors = diagnostics.some(d => d.severity === 'error');
+        alert(`Workflow saved${hasErrors ? ', but it cannot run until these errors are fixed' : ' with warnings'}:\n\n${lines.join('\n')}`);
+      } else {
+        alert('Workflow saved successfully!');
+      }
     } catch (err) {
       alert('Failed to save workflow');
       console.error('Failed to save workflow:', err);
@@ -516,6 +550,24 @@ const WorkflowEditor: React.FC<WorkflowEditorProps> = ({ workflow, onSave, onVie
             </svg>
             Jira
           </button>
+          <button
+            onClick={() => addNode(NodeType.FOREACH)}
+            className="inline-flex items-center px-2 py-1 text-xs font-medium text-teal-800 bg-teal-100 border border-teal-200 rounded-md hover:bg-teal-200 transition-colors"
+          >
+            <svg className="w-3 h-3 mr-1" fill="currentColor" viewBox="0 0 20 20">
+              <path fillRule="evenodd" d="M4 2a1 1 0 011 1v2.101a7.002 7.002 0 0111.601 2.566 1 1 0 11-1.885.666A5.002 5.002 0 005.999 7H9a1 1 0 010 2H4a1 1 0 01-1-1V3a1 1 0 011-1zm.008 9.057a1 1 0 011.276.61A5.002 5.002 0 0014.001 13H11a1 1 0 110-2h5a1 1 0 011 1v5a1 1 0 11-2 0v-2.101a7.002 7.002 0 01-11.601-2.566 1 1 0 01.61-1.276z" clipRule="evenodd"/>
+            </svg>
+            Foreach
+          </button>
+          <button
+            onClick={() => addNode(NodeType.SUBWORKFLOW)}
+            className="inline-flex items-center px-2 py-1 text-xs font-medium text-indigo-800 bg-indigo-100 border border-indigo-200 rounded-md hover:bg-indigo-200 transition-colors"
+          >
+            <svg className="w-3 h-3 mr-1" fill="currentColor" viewBox="0 0 20 20">
+              <path d="M7 3a1 1 0 000 2h6a1 1 0 100-2H7zM4 7a1 1 0 011-1h10a1 1 0 110 2H5a1 1 0 01-1-1zM2 11a2 2 0 012-2h12a2 2 0 012 2v4a2 2 0 01-2 2H4a2 2 0 01-2-2v-4z"/>
+            </svg>
+            Sub-workflow
+          </button>
           <button
             onClick={() => addNode(NodeType.END)}
             className="inline-flex items-center px-2 py-1 text-xs font-medium text-red-800 bg-red-100 border border-red-200 rounded-md hover:bg-red-200 transition-colors"
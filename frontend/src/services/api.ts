@@ -7,7 +7,8 @@ import {
   UpdateWorkflowRequest,
   CreateAgentRequest,
   ExecuteWorkflowRequest,
-  ContinueExecutionRequest
+  ContinueExecutionRequest,
+  RerunFromNodeRequest
 } from '../types/workflow';
 
 // Create axios instance
@@ -29,6 +30,16 @@ export const workflowApi = {
     return response.data;
   },
 
+  // Find workflows containing a node type or using a model
+  searchWorkflows: async (query: {node_type?: string, model_type?: string, model_name?: string}): Promise<Workflow[]> => {
+    const params = new URLSearchParams();
+    Object.entries(query).forEach(([key, value]) => {
+      if (value) params.append(key, value);
+    });
+    const response = await api.get(`/workflows/search?${params.toString()}`);
+    return response.data;
+  },
+
   // Create workflow
   createWorkflow: async (data: CreateWorkflowRequest): Promise<Workflow> => {
     const response = await api.post('/workflows', data);
@@ -178,11 +189,23 @@ export const executionApi = {
     return response.data;
   },
 
+  // Re-run from a node, starting from the variable snapshot recorded when it ran
+  rerunExecutionFrom: async (id: number, nodeId: string, data: RerunFromNodeRequest = {}): Promise<Execution> => {
+    const response = await api.post(`/executions/${id}/rerun-from/${encodeURIComponent(nodeId)}`, data);
+    return response.data;
+  },
+
   // Stop execution
   stopExecution: async (id: number): Promise<void> => {
     await api.post(`/executions/${id}/stop`);
   },
 
+  // Stop all unfinished executions of a workflow
+  stopWorkflowExecutions: async (workflowId: number): Promise<{message: string, cancelled_execution_ids: number[]}> => {
+    const response = await api.post(`/executions/stop?workflow_id=${workflowId}`);
+    return response.data;
+  },
+
   // Delete execution record
   deleteExecution: async (id: number): Promise<void> => {
     await api.delete(`/executions/${id}`);
@@ -200,6 +223,46 @@ export const executionApi = {
     return response.data;
   },
 
+  // Chat with Qwen, streaming the reply (abort the signal to cancel)
+  chatWithQwenStream: async (
+    id: number,
+    message: string,
+    onDelta: (delta: string) => void,
+    signal?: AbortSignal
+  ): Promise<{reply: string, success: boolean}> => {
+    const response = await fetch(`${api.defaults.baseURL}/executions/${id}/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ message }),
+      signal,
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Chat request failed: HTTP ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop() || '';
+      for (const raw of events) {
+        const eventLine = raw.split('\n').find((line) => line.startsWith('event:'));
+        const dataLine = raw.split('\n').find((line) => line.startsWith('data:'));
+        if (!dataLine) continue;
+        const data = JSON.parse(dataLine.slice(5));
+        const event = eventLine ? eventLine.slice(6).trim() : 'message';
+        if (event === 'done') return data;
+        if (event === 'error') throw new Error(data.detail);
+        onDelta(data.delta);
+      }
+    }
+    throw new Error('Chat stream ended unexpectedly');
+  },
+
   // Get execution history
   getExecutionHistory: async (id: number): Promise<{execution_id: number, history: any[]}> => {
     const response = await api.get(`/executions/${id}/history`);
@@ -12,6 +12,8 @@ export enum NodeType {
   IF = 'if',
   HUMAN_CONTROL = 'human_control',
   JIRA = 'jira',
+  FOREACH = 'foreach',
+  SUBWORKFLOW = 'subworkflow',
   END = 'end'
 }
 
@@ -34,6 +36,14 @@ export enum VariableType {
 }
 
 // Workflow interface
+export interface WorkflowDiagnostic {
+  severity: 'error' | 'warning'; // errors block execution
+  code: string;
+  message: string;
+  node_id?: string;
+  edge_id?: string;
+}
+
 export interface Workflow {
   id: number;
   name: string;
@@ -42,6 +52,9 @@ export interface Workflow {
   status: WorkflowStatus;
   created_at: string;
   updated_at: string;
+  compiled_at?: string;
+  diagnostics?: WorkflowDiagnostic[]; // from save-time compilation
+  version?: string; // content hash of the current immutable version
 }
 
 // Workflow node interface
@@ -86,6 +99,14 @@ export interface Execution {
   current_node?: string;
   variables?: string; // JSON string
   error_message?: string;
+  parent_execution_id?: number; // set for sub-workflow child executions
+  parent_node_id?: string;
+  timeout_seconds?: number;
+  node_cache?: boolean;
+  rerun_of_execution_id?: number; // set for executions re-run from a node snapshot
+  rerun_from_node_id?: string;
+  workflow_version?: string;
+  lane?: ExecutionLane;
 }
 
 // Workflow config interface
@@ -123,10 +144,26 @@ export interface CreateAgentRequest {
   config: string;
 }
 
+// interactive runs are admitted first; bulk runs use the remaining capacity
+export type ExecutionLane = 'interactive' | 'bulk';
+
 export interface ExecuteWorkflowRequest {
   variables?: Record<string, any>;
+  timeout_seconds?: number; // execution deadline per run, excluding time spent paused
+  memoize?: boolean; // reuse a running or completed execution with the same workflow version and inputs
+  memo_ttl_seconds?: number;
+  refresh?: boolean; // bypass memoised results and run again
+  node_cache?: boolean; // restore unchanged nodes (same config and inputs) from the node result cache
+  lane?: ExecutionLane;
 }
 
 export interface ContinueExecutionRequest {
   variables?: Record<string, any>;
+}
+
+export interface RerunFromNodeRequest {
+  variables?: Record<string, any>; // overrides applied on top of the snapshot
+  timeout_seconds?: number;
+  node_cache?: boolean;
+  lane?: ExecutionLane; // defaults to the source execution's lane
 } 
\ No newline at end of file